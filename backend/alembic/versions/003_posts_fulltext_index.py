@@ -0,0 +1,31 @@
+"""posts fulltext index
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '003'
+down_revision: Union[str, None] = '002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # FULLTEXT is MySQL-only; other databases use the in-process search index.
+    # The ngram parser makes Chinese text searchable.
+    if op.get_bind().dialect.name == 'mysql':
+        op.execute(
+            'CREATE FULLTEXT INDEX ft_posts_search ON posts (title, excerpt, content) WITH PARSER ngram'
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'mysql':
+        op.drop_index('ft_posts_search', table_name='posts')
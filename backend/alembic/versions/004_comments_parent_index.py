@@ -0,0 +1,25 @@
+"""comments parent_id index
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_comments_parent_id'), 'comments', ['parent_id'])
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_comments_parent_id'), table_name='comments')
@@ -0,0 +1,74 @@
+"""comments materialized path and depth
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '005'
+down_revision: Union[str, None] = '004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+PATH_SEGMENT_WIDTH = 8
+BASE36 = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def path_segment(comment_id: int) -> str:
+    # Must match app.models.comment.path_segment
+    digits = ''
+    while comment_id:
+        comment_id, remainder = divmod(comment_id, 36)
+        digits = BASE36[remainder] + digits
+    return digits.rjust(PATH_SEGMENT_WIDTH, '0') + '/'
+
+
+def backfill(connection) -> None:
+    """Fill path/depth in batches, top-down: a row is ready once its parent has a path."""
+    select_ready = sa.text(
+        "SELECT c.id, p.path AS parent_path, p.depth AS parent_depth "
+        "FROM comments c LEFT JOIN comments p ON p.id = c.parent_id "
+        "WHERE c.path IS NULL AND (c.parent_id IS NULL OR p.path IS NOT NULL) "
+        "ORDER BY c.id LIMIT :limit"
+    )
+    update = sa.text("UPDATE comments SET path = :path, depth = :depth WHERE id = :id")
+
+    while True:
+        rows = connection.execute(select_ready, {"limit": BATCH_SIZE}).all()
+        if not rows:
+            break
+        connection.execute(
+            update,
+            [
+                {
+                    "id": row.id,
+                    "path": (row.parent_path or '') + path_segment(row.id),
+                    "depth": row.parent_depth + 1 if row.parent_path is not None else 0,
+                }
+                for row in rows
+            ],
+        )
+
+
+def upgrade() -> None:
+    op.add_column('comments', sa.Column('path', sa.String(length=255), nullable=True))
+    op.add_column('comments', sa.Column('depth', sa.Integer(), nullable=False, server_default='0'))
+
+    backfill(op.get_bind())
+
+    op.alter_column('comments', 'path', existing_type=sa.String(length=255), nullable=False)
+    op.create_index('ix_comments_post_id_path', 'comments', ['post_id', 'path'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comments_post_id_path', table_name='comments')
+    op.drop_column('comments', 'depth')
+    op.drop_column('comments', 'path')
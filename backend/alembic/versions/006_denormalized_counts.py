@@ -0,0 +1,46 @@
+"""denormalized comment and post counts
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '006'
+down_revision: Union[str, None] = '005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('comment_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('categories', sa.Column('post_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('tags', sa.Column('post_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Initial values; afterwards run `python -m scripts.reconcile_counts` to recompute
+    op.execute(
+        "UPDATE posts SET comment_count = "
+        "(SELECT COUNT(*) FROM comments WHERE comments.post_id = posts.id)"
+    )
+    op.execute(
+        "UPDATE categories SET post_count = "
+        "(SELECT COUNT(*) FROM post_categories JOIN posts ON posts.id = post_categories.post_id "
+        "WHERE post_categories.category_id = categories.id AND posts.status = 'published')"
+    )
+    op.execute(
+        "UPDATE tags SET post_count = "
+        "(SELECT COUNT(*) FROM post_tags JOIN posts ON posts.id = post_tags.post_id "
+        "WHERE post_tags.tag_id = tags.id AND posts.status = 'published')"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('tags', 'post_count')
+    op.drop_column('categories', 'post_count')
+    op.drop_column('posts', 'comment_count')
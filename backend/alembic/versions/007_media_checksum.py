@@ -0,0 +1,29 @@
+"""media checksum
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '007'
+down_revision: Union[str, None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows stay NULL until their files are rehashed
+    op.add_column('media', sa.Column('checksum', sa.String(length=64), nullable=True))
+    op.create_index('ix_media_checksum', 'media', ['checksum'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_media_checksum', table_name='media')
+    op.drop_column('media', 'checksum')
@@ -0,0 +1,44 @@
+"""media variants
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '008'
+down_revision: Union[str, None] = '007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'media_variants',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('digest', sa.String(length=64), nullable=False),
+        sa.Column('width', sa.Integer(), nullable=False),
+        sa.Column('rendered_width', sa.Integer(), nullable=False),
+        sa.Column('height', sa.Integer(), nullable=False),
+        sa.Column('format', sa.String(length=10), nullable=False),
+        sa.Column('mimetype', sa.String(length=100), nullable=False),
+        sa.Column('filepath', sa.String(length=255), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('digest', 'width', 'format', name='uq_media_variants_digest_width_format'),
+    )
+    op.create_index(op.f('ix_media_variants_id'), 'media_variants', ['id'])
+    op.create_index(op.f('ix_media_variants_digest'), 'media_variants', ['digest'])
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_media_variants_digest'), table_name='media_variants')
+    op.drop_index(op.f('ix_media_variants_id'), table_name='media_variants')
+    op.drop_table('media_variants')
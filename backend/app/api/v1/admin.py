@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, Query, status
+from typing import Literal
+from app.core.deps import require_role
+from app.core.sql_metrics import sql_metrics
+from app.models.user import User
+from app.schemas.admin import SQLMetricsResponse
+
+router = APIRouter()
+
+
+@router.get("/sql", response_model=SQLMetricsResponse)
+def get_sql_metrics(
+    limit: int = Query(50, ge=1, le=500, description="Statements to return"),
+    sort: Literal["total_ms", "mean_ms", "max_ms", "p99_ms", "count"] = Query("total_ms"),
+    current_user: User = Depends(require_role("admin")),
+):
+    return sql_metrics.report(limit, sort)
+
+
+@router.delete("/sql", status_code=status.HTTP_204_NO_CONTENT)
+def reset_sql_metrics(current_user: User = Depends(require_role("admin"))):
+    sql_metrics.reset()
+    return None
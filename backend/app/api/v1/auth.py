@@ -1,12 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from typing import Optional
+import asyncio
+import time
 from app.core.database import get_db
-from app.core.deps import get_current_user
+from app.core.config import settings
+from app.core.deps import get_current_user, oauth2_scheme
+from app.core.replicas import not_a_write
+from app.core.revocation import revocation_store
 from app.core.security import (
-    verify_password,
-    get_password_hash,
+    password_hasher,
     create_access_token,
     create_refresh_token,
     decode_token,
@@ -17,8 +22,14 @@ from app.schemas.user import UserCreate, UserResponse, LoginRequest, TokenRespon
 router = APIRouter()
 
 
-@router.post("/register", response_model=TokenResponse)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+def _max_token_lifetime() -> float:
+    return max(
+        settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600,
+    )
+
+
+def _check_available(db: Session, user_data: UserCreate) -> None:
     # Check if username exists
     if db.query(User).filter(User.username == user_data.username).first():
         raise HTTPException(
@@ -33,17 +44,15 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
             detail="Email already registered",
         )
 
-    # Create new user
-    user = User(
-        username=user_data.username,
-        email=user_data.email,
-        password_hash=get_password_hash(user_data.password),
-    )
 
+def _save_user(db: Session, user: User) -> User:
     db.add(user)
     db.commit()
     db.refresh(user)
+    return user
+
 
+def _token_response(user: User) -> TokenResponse:
     # Generate tokens
     access_token = create_access_token(data={"sub": user.id})
     refresh_token = create_refresh_token(data={"sub": user.id})
@@ -55,43 +64,84 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
 
 
+# register and login wait for bcrypt without holding a threadpool thread; their
+# queries run in the threadpool so the sync session never blocks the loop
+
+@router.post("/register", response_model=TokenResponse)
+async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+    await run_in_threadpool(_check_available, db, user_data)
+
+    # Create new user
+    user = User(
+        username=user_data.username,
+        email=user_data.email,
+        password_hash=await asyncio.wrap_future(password_hasher.hash(user_data.password)),
+    )
+    user = await run_in_threadpool(_save_user, db, user)
+
+    return _token_response(user)
+
+
+def _find_user(db: Session, username: str) -> Optional[User]:
+    return db.query(User).filter(User.username == username).first()
+
+
 @router.post("/login", response_model=TokenResponse)
-def login(
+@not_a_write
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db),
 ):
     # Find user by username
-    user = db.query(User).filter(User.username == form_data.username).first()
+    user = await run_in_threadpool(_find_user, db, form_data.username)
 
     # Verify password
-    if not user or not verify_password(form_data.password, user.password_hash):
+    verified, new_hash = (False, None)
+    if user and user.password_hash:
+        verified, new_hash = await asyncio.wrap_future(
+            password_hasher.verify_and_update(form_data.password, user.password_hash)
+        )
+
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # Generate tokens
-    access_token = create_access_token(data={"sub": user.id})
-    refresh_token = create_refresh_token(data={"sub": user.id})
+    # Rehash with the current cost factor
+    if new_hash:
+        user.password_hash = new_hash
+        user = await run_in_threadpool(_save_user, db, user)
 
-    return TokenResponse(
-        access_token=access_token,
-        refresh_token=refresh_token,
-        user=UserResponse.model_validate(user),
-    )
+    return _token_response(user)
 
 
 @router.post("/refresh", response_model=TokenResponse)
+@not_a_write
 def refresh_token(refresh_token: str, db: Session = Depends(get_db)):
     payload = decode_token(refresh_token)
 
-    if not payload or payload.get("type") != "refresh":
+    if (
+        not payload
+        or payload.get("type") != "refresh"
+        or not payload.get("jti")
+        or payload.get("iat", 0) < revocation_store.user_cutoff(payload.get("sub"))
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid refresh token",
         )
 
+    # Rotate: each refresh token is single-use. A second use means it leaked,
+    # so every session of that user is revoked.
+    if not revocation_store.revoke(payload["jti"], payload["exp"]):
+        revocation_store.revoke_user(payload["sub"], until=time.time() + _max_token_lifetime())
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token reuse detected",
+        )
+
     user_id = payload.get("sub")
     user = db.query(User).filter(User.id == user_id).first()
 
@@ -118,7 +168,16 @@ def get_current_user_info(current_user: User = Depends(get_current_user)):
 
 
 @router.post("/logout")
-def logout():
-    # In a stateless JWT setup, logout is handled client-side by removing the token
-    # For server-side token invalidation, you would implement a blacklist
+@not_a_write
+def logout(
+    refresh_token: Optional[str] = None,
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_user),
+):
+    # Revoke the access token and, if given, the refresh token of this session
+    for value in (token, refresh_token):
+        payload = decode_token(value) if value else None
+        if payload and payload.get("sub") == str(current_user.id) and payload.get("jti"):
+            revocation_store.revoke(payload["jti"], payload["exp"])
+
     return {"message": "Successfully logged out"}
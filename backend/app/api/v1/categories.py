@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from typing import List
 from app.core.database import get_db
 from app.core.deps import require_role
+from app.core.query_budget import query_budget
 from app.models.user import User
 from app.models.category import Category
 from app.schemas.category import CategoryCreate, CategoryUpdate, CategoryResponse
+from app.services.post_cache import invalidate_posts, posts_for_category
+from app.services.taxonomy import category_cache
 import slugify
 
 router = APIRouter()
@@ -17,22 +20,24 @@ def generate_slug(name: str) -> str:
 
 
 @router.get("", response_model=List[CategoryResponse])
-def list_categories(db: Session = Depends(get_db)):
-    categories = db.query(Category).order_by(Category.name).all()
-    return [CategoryResponse.model_validate(cat) for cat in categories]
+@query_budget(0)
+def list_categories():
+    # Served from the in-process snapshot; no database access
+    return Response(content=category_cache.get().body, media_type="application/json")
 
 
 @router.get("/{category_id}", response_model=CategoryResponse)
-def get_category(category_id: int, db: Session = Depends(get_db)):
-    category = db.query(Category).filter(Category.id == category_id).first()
+@query_budget(0)
+def get_category(category_id: int):
+    body = category_cache.get().item_bodies.get(category_id)
 
-    if not category:
+    if body is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Category not found",
         )
 
-    return CategoryResponse.model_validate(category)
+    return Response(content=body, media_type="application/json")
 
 
 @router.post("", response_model=CategoryResponse, status_code=status.HTTP_201_CREATED)
@@ -60,6 +65,7 @@ def create_category(
     db.add(category)
     db.commit()
     db.refresh(category)
+    category_cache.invalidate()
 
     return CategoryResponse.model_validate(category)
 
@@ -89,6 +95,8 @@ def update_category(
 
     db.commit()
     db.refresh(category)
+    invalidate_posts(posts_for_category(db, category.id))
+    category_cache.invalidate()
 
     return CategoryResponse.model_validate(category)
 
@@ -107,7 +115,10 @@ def delete_category(
             detail="Category not found",
         )
 
+    posts = posts_for_category(db, category.id)
     db.delete(category)
     db.commit()
+    invalidate_posts(posts)
+    category_cache.invalidate()
 
     return None
@@ -1,36 +1,125 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import and_, func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from typing import Optional
 from app.core.database import get_db
+from app.core.replicas import get_read_db
 from app.core.deps import get_current_user
+from app.core.projection import project
+from app.core.query_budget import query_budget
 from app.models.user import User
-from app.models.comment import Comment
-from app.schemas.comment import CommentCreate, CommentResponse
+from app.models.comment import Comment, MAX_COMMENT_DEPTH, path_segment
+from app.schemas.comment import CommentCreate, CommentResponse, CommentSubtreeResponse, CommentTreeResponse
+from app.services.counters import adjust_comment_count
+from app.services.post_cache import invalidate_post
 
 router = APIRouter()
 
+# Sorts after every character used in path segments
+PATH_UPPER_BOUND = "~"
 
-@router.get("/post/{post_id}", response_model=list[CommentResponse])
-def list_post_comments(post_id: int, db: Session = Depends(get_db)):
-    comments = (
-        db.query(Comment)
-        .filter(Comment.post_id == post_id, Comment.parent_id.is_(None))
-        .order_by(Comment.created_at.desc())
-        .all()
+
+def subtree_filter(comment: Comment, after: Optional[str] = None):
+    """Index range covering the descendants of ``comment`` (excluding itself)."""
+    return and_(
+        Comment.post_id == comment.post_id,
+        Comment.path > (after or comment.path),
+        Comment.path < comment.path + PATH_UPPER_BOUND,
+    )
+
+
+@router.get("/post/{post_id}", response_model=list[CommentTreeResponse])
+@query_budget(1)
+async def list_post_comments(
+    post_id: int,
+    page: int = Query(1, ge=1),
+    size: Optional[int] = Query(None, ge=1, le=200, description="Top-level comments per page"),
+    max_depth: Optional[int] = Query(None, ge=0, description="Deepest reply level to include (0 = top level only)"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    # Page of top-level comments, newest first
+    roots = (
+        select(Comment.id)
+        .where(Comment.post_id == post_id, Comment.parent_id.is_(None))
+        .order_by(Comment.created_at.desc(), Comment.id.desc())
+    )
+    if size is not None:
+        roots = roots.limit(size).offset((page - 1) * size)
+    roots = roots.subquery()
+
+    # Walk down from those roots in a single recursive query
+    thread = (
+        select(Comment.id.label("id"), literal(0).label("depth"))
+        .join(roots, roots.c.id == Comment.id)
+        .cte("thread", recursive=True)
     )
+    children = select(Comment.id, thread.c.depth + 1).join(thread, Comment.parent_id == thread.c.id)
+    if max_depth is not None:
+        children = children.where(thread.c.depth < max_depth)
+    thread = thread.union_all(children)
+
+    comments = (
+        await db.scalars(
+            select(Comment)
+            .join(thread, thread.c.id == Comment.id)
+            .order_by(Comment.created_at.asc(), Comment.id.asc())
+        )
+    ).all()
+
+    # Assemble the tree in one pass; replies stay oldest first
+    fields = CommentResponse.model_fields
+    nodes = {comment.id: CommentTreeResponse.model_validate(project(comment, fields)) for comment in comments}
+    top_level = []
+    for comment in comments:
+        node = nodes[comment.id]
+        if comment.parent_id is None:
+            top_level.append(node)
+        else:
+            nodes[comment.parent_id].replies.append(node)
+
+    top_level.reverse()
+    return top_level
+
+
+@router.get("/{comment_id}/replies", response_model=CommentSubtreeResponse)
+@query_budget(2)
+async def list_comment_replies(
+    comment_id: int,
+    after: Optional[str] = Query(None, description="Cursor from a previous next_cursor"),
+    size: int = Query(20, ge=1, le=100),
+    max_depth: Optional[int] = Query(None, ge=1, description="Deepest level below this comment to include"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    comment = await db.get(Comment, comment_id)
+
+    if not comment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Comment not found",
+        )
 
-    # Recursively load replies
-    def load_replies(comment: Comment) -> dict:
-        data = CommentResponse.model_validate(comment).model_dump()
-        replies = (
-            db.query(Comment)
-            .filter(Comment.parent_id == comment.id)
-            .order_by(Comment.created_at.asc())
-            .all()
+    if after is not None and not after.startswith(comment.path):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
         )
-        data["replies"] = [load_replies(reply) for reply in replies]
-        return data
 
-    return [load_replies(comment) for comment in comments]
+    # Depth-first thread order is path order, so this is one range scan
+    query = select(Comment).where(subtree_filter(comment, after))
+    if max_depth is not None:
+        query = query.where(Comment.depth <= comment.depth + max_depth)
+    replies = (await db.scalars(query.order_by(Comment.path).limit(size + 1))).all()
+
+    next_cursor = None
+    if len(replies) > size:
+        replies = replies[:size]
+        next_cursor = replies[-1].path
+
+    return CommentSubtreeResponse(
+        items=[CommentResponse.model_validate(project(reply, CommentResponse.model_fields)) for reply in replies],
+        next_cursor=next_cursor,
+    )
 
 
 @router.post("", response_model=CommentResponse, status_code=status.HTTP_201_CREATED)
@@ -49,6 +138,7 @@ def create_comment(
         )
 
     # If parent_id is specified, verify it exists and belongs to the same post
+    parent = None
     if comment_data.parent_id:
         parent = db.query(Comment).filter(Comment.id == comment_data.parent_id).first()
         if not parent or parent.post_id != comment_data.post_id:
@@ -56,17 +146,28 @@ def create_comment(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid parent comment",
             )
+        if parent.depth + 1 >= MAX_COMMENT_DEPTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Reply nesting is too deep",
+            )
 
     comment = Comment(
         post_id=comment_data.post_id,
         user_id=current_user.id,
         content=comment_data.content,
         parent_id=comment_data.parent_id,
+        depth=parent.depth + 1 if parent else 0,
     )
 
+    # The path ends with the comment's own id, so it is set after the insert
     db.add(comment)
+    db.flush()
+    comment.path = (parent.path if parent else "") + path_segment(comment.id)
+    adjust_comment_count(db, comment.post_id, 1)
     db.commit()
     db.refresh(comment)
+    invalidate_post(comment.post_id)
 
     return CommentResponse.model_validate(comment)
 
@@ -92,7 +193,20 @@ def delete_comment(
             detail="Not authorized to delete this comment",
         )
 
+    # Replies are kept: the non-cascading replies relationship clears their
+    # parent_id, so they become top-level comments. Their subtrees move up
+    # with them, so paths and depths are rebased to match.
+    post_id = comment.post_id
+    db.query(Comment).filter(subtree_filter(comment)).update(
+        {
+            Comment.path: func.substr(Comment.path, len(comment.path) + 1),
+            Comment.depth: Comment.depth - (comment.depth + 1),
+        },
+        synchronize_session=False,
+    )
     db.delete(comment)
+    adjust_comment_count(db, post_id, -1)
     db.commit()
+    invalidate_post(post_id)
 
     return None
@@ -1,83 +1,77 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status, UploadFile, File, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, load_only
 from pathlib import Path
 from typing import Optional
-import uuid
+import re
 from app.core.database import get_db
 from app.core.deps import get_current_user
 from app.models.user import User
-from app.models.media import Media
-from app.schemas.media import MediaResponse, MediaListResponse
-from app.core.config import settings
+from app.models.media import Media, MediaVariant
+from app.schemas.media import MediaResponse, MediaListItem, MediaListResponse, MediaVariantResponse
+from app.core.file_serving import serve_file
+from app.core.projection import parse_fields, project
+from app.services.image_variants import variant_pipeline
+from app.services.media_storage import acquire_blob, blob_path, discard_temp, release_blob, remove_released, store_upload
 
 router = APIRouter()
 
-# Allowed MIME types
-ALLOWED_MIME_TYPES = {
-    "image/jpeg": "jpg",
-    "image/png": "png",
-    "image/gif": "gif",
-    "image/webp": "webp",
-}
+DIGEST_RE = re.compile(r"[0-9a-f]{64}")
+
+# Variants are re-rendered when encoding settings change, so they are not immutable
+VARIANT_CACHE_CONTROL = "public, max-age=86400"
+
+
+def _save_media(db: Session, media: Media) -> MediaResponse:
+    db.add(media)
+    db.commit()
+    db.refresh(media)
+    return MediaResponse.model_validate(media)
 
 
 @router.post("/upload", response_model=MediaResponse, status_code=status.HTTP_201_CREATED)
 async def upload_media(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    # Validate file size
-    content = await file.read()
-    if len(content) > settings.MAX_UPLOAD_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"File size exceeds maximum allowed size of {settings.MAX_UPLOAD_SIZE} bytes",
-        )
-
-    # Validate file type
-    if file.content_type not in ALLOWED_MIME_TYPES:
-        raise HTTPException(
-            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
-            detail=f"Unsupported file type. Allowed types: {', '.join(ALLOWED_MIME_TYPES.keys())}",
-        )
-
-    # Generate unique filename
-    file_extension = ALLOWED_MIME_TYPES[file.content_type]
-    unique_filename = f"{uuid.uuid4()}.{file_extension}"
-
-    # Create upload directory if it doesn't exist
-    upload_path = Path(settings.UPLOAD_DIR)
-    upload_path.mkdir(parents=True, exist_ok=True)
-
-    # Save file
-    file_path = upload_path / unique_filename
-    with open(file_path, "wb") as f:
-        f.write(content)
+    stored = await store_upload(file)
+    try:
+        filepath = await acquire_blob(db, stored.checksum, stored.size, stored.temp_path)
+    except BaseException:
+        await discard_temp(stored.temp_path)
+        raise
 
     # Create media record
     media = Media(
         filename=file.filename,
-        filepath=str(file_path),
-        mimetype=file.content_type,
-        size=len(content),
+        filepath=str(filepath),
+        mimetype=stored.mimetype,
+        size=stored.size,
+        checksum=stored.checksum,
         user_id=current_user.id,
     )
+    response = await run_in_threadpool(_save_media, db, media)
 
-    db.add(media)
-    db.commit()
-    db.refresh(media)
+    # Derivatives are rendered after the response is sent
+    background_tasks.add_task(variant_pipeline.generate_all, response.id)
 
-    return MediaResponse.model_validate(media)
+    return response
+
+
+MEDIA_LIST_FIELDS = tuple(MediaListItem.model_fields)
 
 
-@router.get("/list", response_model=MediaListResponse)
+@router.get("/list", response_model=MediaListResponse, response_model_exclude_unset=True)
 def list_media(
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
+    selected = parse_fields(fields, MEDIA_LIST_FIELDS, MEDIA_LIST_FIELDS)
     query = db.query(Media)
 
     # Get total count
@@ -85,12 +79,18 @@ def list_media(
 
     # Paginate
     offset = (page - 1) * size
-    media_items = query.order_by(Media.created_at.desc()).offset(offset).limit(size).all()
+    media_items = (
+        query.options(load_only(*(getattr(Media, name) for name in selected)))
+        .order_by(Media.created_at.desc())
+        .offset(offset)
+        .limit(size)
+        .all()
+    )
 
     pages = (total + size - 1) // size
 
     return MediaListResponse(
-        items=[MediaResponse.model_validate(media) for media in media_items],
+        items=[MediaListItem.model_validate(project(media, selected)) for media in media_items],
         total=total,
         page=page,
         size=size,
@@ -115,6 +115,118 @@ def get_media(
     return MediaResponse.model_validate(media)
 
 
+def _find_media(db: Session, condition) -> Optional[Media]:
+    return db.query(Media).filter(condition).first()
+
+
+async def _load_variant(db: Session, condition, width: int, format: Optional[str]):
+    fmt = format or (variant_pipeline.formats[0] if variant_pipeline.formats else None)
+    if width not in variant_pipeline.widths or fmt not in variant_pipeline.formats:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Variant not available",
+        )
+
+    media = await run_in_threadpool(_find_media, db, condition)
+
+    if not media:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Media not found",
+        )
+
+    # Variants are keyed by content; uploads older than checksums need scripts.rehash_media
+    if media.checksum is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Variant not available",
+        )
+
+    return await variant_pipeline.get_variant(db, media, width, fmt)
+
+
+@router.get("/{media_id}/variants/{width}", response_model=MediaVariantResponse)
+async def get_media_variant(
+    media_id: int,
+    width: int,
+    format: Optional[str] = Query(None, description="Variant format, defaults to the first configured one"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    variant = await _load_variant(db, Media.id == media_id, width, format)
+    return MediaVariantResponse.model_validate(variant)
+
+
+def _serve_variant(request: Request, variant: MediaVariant):
+    etag = variant_pipeline.etag(variant)
+    return serve_file(request, Path(variant.filepath), variant.mimetype, etag, VARIANT_CACHE_CONTROL)
+
+
+# File downloads are public: they back <img> tags on published pages.
+
+@router.get("/blobs/{digest}")
+@router.head("/blobs/{digest}", include_in_schema=False)
+def download_blob(digest: str, request: Request, db: Session = Depends(get_db)):
+    row = None
+    if DIGEST_RE.fullmatch(digest):
+        row = db.query(Media.mimetype).filter(Media.checksum == digest).first()
+
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Media not found",
+        )
+
+    return serve_file(request, blob_path(digest), row.mimetype, f'"{digest}"')
+
+
+@router.get("/{media_id}/file")
+@router.head("/{media_id}/file", include_in_schema=False)
+def download_media(media_id: int, request: Request, db: Session = Depends(get_db)):
+    media = db.query(Media).filter(Media.id == media_id).first()
+
+    if not media:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Media not found",
+        )
+
+    etag = f'"{media.checksum}"' if media.checksum else None
+    return serve_file(request, Path(media.filepath), media.mimetype, etag)
+
+
+@router.get("/blobs/{digest}/variants/{width}/file")
+@router.head("/blobs/{digest}/variants/{width}/file", include_in_schema=False)
+async def download_blob_variant(
+    digest: str,
+    width: int,
+    request: Request,
+    format: Optional[str] = Query(None, description="Variant format, defaults to the first configured one"),
+    db: Session = Depends(get_db),
+):
+    if not DIGEST_RE.fullmatch(digest):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Media not found",
+        )
+
+    variant = await _load_variant(db, Media.checksum == digest, width, format)
+    return _serve_variant(request, variant)
+
+
+@router.get("/{media_id}/variants/{width}/file")
+@router.head("/{media_id}/variants/{width}/file", include_in_schema=False)
+async def download_media_variant(
+    media_id: int,
+    width: int,
+    request: Request,
+    format: Optional[str] = Query(None, description="Variant format, defaults to the first configured one"),
+    db: Session = Depends(get_db),
+):
+    variant = await _load_variant(db, Media.id == media_id, width, format)
+    return _serve_variant(request, variant)
+
+
 @router.delete("/{media_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_media(
     media_id: int,
@@ -136,14 +248,17 @@ def delete_media(
             detail="Not authorized to delete this media",
         )
 
-    # Delete file from filesystem
-    from pathlib import Path
-    file_path = Path(media.filepath)
-    if file_path.exists():
-        file_path.unlink()
+    # Delete the file and variants once no other media shares them
+    checksum = media.checksum
+    orphan = release_blob(db, media)
 
     # Delete database record
     db.delete(media)
     db.commit()
 
+    if orphan is not None:
+        remove_released(db, orphan)
+    if checksum is not None:
+        variant_pipeline.remove_variants(db, checksum)
+
     return None
@@ -1,86 +1,317 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import Optional, List
-from app.core.database import get_db
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only, selectinload
+from typing import Literal, Optional, List
+from app.core.config import settings
+from app.core.database import get_async_db, get_db
+from app.core.pagination import CountCache, encode_cursor, decode_cursor, cursor_bind_value
+from app.core.projection import parse_fields, project
+from app.core.query_budget import query_budget
+from app.core.replicas import get_read_db
 from app.core.deps import get_current_user, require_role
 from app.models.user import User
 from app.models.post import Post, PostStatus
-from app.schemas.post import PostCreate, PostUpdate, PostResponse, PostListResponse
+from app.schemas.post import (
+    PostCreate,
+    PostUpdate,
+    PostResponse,
+    PostListItem,
+    PostListResponse,
+    PostSearchHit,
+    PostSearchResponse,
+)
+from app.services.counters import sync_taxonomy_counts
+from app.services.post_cache import cache_post, get_cached_post, invalidate_post
+from app.services.search import highlight, search_index
+from app.services.suggest import suggest_index
+from app.services.taxonomy import category_cache, invalidate_taxonomy, tag_cache
+from app.services.taxonomy_index import IdBitmap, taxonomy_index
+from app.services.view_counter import view_counter
 import slugify
 
 router = APIRouter()
 
+# Cached post totals per status, shared by all list requests in this process
+post_count_cache = CountCache(ttl=settings.POST_COUNT_CACHE_TTL)
+
 
 def generate_slug(title: str) -> str:
     """Generate a URL slug from a title."""
     return slugify.slugify(title)
 
 
-@router.get("", response_model=PostListResponse)
-def list_posts(
+# Load author and taxonomy for a whole page in one extra query each
+POST_RELATIONS = (
+    selectinload(Post.author),
+    selectinload(Post.categories),
+    selectinload(Post.tags),
+)
+
+
+# Fields selectable with fields= on the listing; content is opt-in
+POST_LIST_FIELDS = tuple(PostListItem.model_fields)
+POST_LIST_DEFAULT_FIELDS = tuple(name for name in POST_LIST_FIELDS if name != "content")
+
+# Relationship loaded for each relationship-backed list field
+POST_LIST_RELATIONS = {
+    "author": Post.author,
+    "categories": Post.categories,
+    "category_ids": Post.categories,
+    "tags": Post.tags,
+    "tag_ids": Post.tags,
+}
+
+
+def _list_options(fields: List[str]) -> list:
+    """Loader options that fetch only the columns and relationships in ``fields``."""
+    # id and created_at are always needed for the keyset cursor
+    columns = {"id", "created_at"}
+    columns.update(name for name in fields if name not in POST_LIST_RELATIONS)
+    if "author" in fields:
+        columns.add("author_id")
+
+    options = [load_only(*(getattr(Post, name) for name in sorted(columns)))]
+    relations = {POST_LIST_RELATIONS[name] for name in fields if name in POST_LIST_RELATIONS}
+    options.extend(selectinload(relation) for relation in relations)
+    return options
+
+
+def _record_view(data: dict) -> JSONResponse:
+    """Count a view of a serialized post and return it as the response.
+
+    The counter flushes to the database in batches, so views recorded in
+    memory but not yet flushed are added to the stored count.
+    """
+    view_counter.increment(data["id"])
+    data["view_count"] = (data["view_count"] or 0) + view_counter.pending_for(data["id"])
+    return JSONResponse(data)
+
+
+@router.get("", response_model=PostListResponse, response_model_exclude_unset=True)
+@query_budget(5)
+async def list_posts(
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=100),
-    status: Optional[PostStatus] = None,
-    db: Session = Depends(get_db),
+    post_status: Optional[PostStatus] = Query(None, alias="status"),
+    after: Optional[str] = Query(None, description="Opaque cursor from a previous next_cursor"),
+    include_total: bool = Query(True, description="Include the (cached) total count"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    tag: List[str] = Query([], description="Tag slug; repeat to filter by several"),
+    category: List[str] = Query([], description="Category slug; repeat to filter by several"),
+    mode: Literal["all", "any"] = Query("all", description="Match all or any of the given tags and categories"),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    query = db.query(Post)
+    selected = parse_fields(fields, POST_LIST_FIELDS, POST_LIST_DEFAULT_FIELDS)
 
     # Filter by status if specified (only show published posts to non-authenticated users)
-    if status:
-        query = query.filter(Post.status == status)
+    post_status = post_status or PostStatus.PUBLISHED
+
+    if tag or category:
+        if post_status != PostStatus.PUBLISHED:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Tag and category filters only apply to published posts",
+            )
+        # Resolving may reload the taxonomy snapshots or bitmaps over the sync
+        # engine, so it runs off the event loop
+        matches = await run_in_threadpool(_match_taxonomy, tag, category, mode == "all")
+        return await db.run_sync(_list_posts_by_taxonomy, matches, page, size, after, include_total, selected)
+
+    query = select(Post).where(Post.status == post_status)
+
+    # Get total count (approximate: cached for a few seconds per status)
+    total = None
+    if include_total:
+        total = post_count_cache.get(post_status)
+        if total is None:
+            total = await db.scalar(select(func.count()).select_from(Post).where(Post.status == post_status))
+            post_count_cache.set(post_status, total)
+
+    offset = 0
+    if after is not None:
+        # Keyset mode: seek past the cursor through the (status, created_at, id) index
+        position = decode_cursor(after)
+        if position is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor",
+            )
+        created_at, last_id = position
+        created_at = cursor_bind_value(db, created_at)
+        query = query.where(
+            or_(
+                Post.created_at < created_at,
+                and_(Post.created_at == created_at, Post.id < last_id),
+            )
+        )
+        page = None
     else:
-        query = query.filter(Post.status == PostStatus.PUBLISHED)
+        offset = (page - 1) * size
+
+    # Fetch one extra row to know whether there is a next page
+    posts = (
+        await db.scalars(
+            query.options(*_list_options(selected))
+            .order_by(Post.created_at.desc(), Post.id.desc())
+            .offset(offset)
+            .limit(size + 1)
+        )
+    ).all()
+    next_cursor = None
+    if len(posts) > size:
+        posts = posts[:size]
+        next_cursor = encode_cursor(posts[-1].created_at, posts[-1].id)
+
+    pages = (total + size - 1) // size if total is not None else None
+
+    return PostListResponse(
+        items=[PostListItem.model_validate(project(post, selected)) for post in posts],
+        total=total,
+        page=page,
+        size=size,
+        pages=pages,
+        next_cursor=next_cursor,
+    )
 
-    # Get total count
-    total = query.count()
 
-    # Paginate
-    offset = (page - 1) * size
-    posts = query.order_by(Post.created_at.desc()).offset(offset).limit(size).all()
+def _resolve_slugs(cache, slugs: List[str], match_all: bool) -> List[int]:
+    by_slug = cache.get().by_slug
+    ids = [by_slug[slug]["id"] for slug in slugs if slug in by_slug]
+    if match_all and len(ids) < len(slugs):
+        # An unknown slug matches nothing
+        ids.append(-1)
+    return ids
 
-    pages = (total + size - 1) // size
+
+def _match_taxonomy(tag_slugs: List[str], category_slugs: List[str], match_all: bool) -> IdBitmap:
+    """Published post ids in all (``match_all``) or any of the given tags and categories."""
+    return taxonomy_index.select(
+        _resolve_slugs(category_cache, category_slugs, match_all),
+        _resolve_slugs(tag_cache, tag_slugs, match_all),
+        match_all,
+    )
+
+
+def _list_posts_by_taxonomy(
+    db: Session,
+    matches: IdBitmap,
+    page: int,
+    size: int,
+    after: Optional[str],
+    include_total: bool,
+    selected: List[str],
+) -> PostListResponse:
+    """A page of the posts in ``matches``, from _match_taxonomy.
+
+    Ids come out of the bitmaps newest first; post ids grow with created_at,
+    so this matches the unfiltered listing order. Only the page of rows is
+    then loaded from the database. Runs on the sync side of an async session
+    (``AsyncSession.run_sync``), which only touches the database through it.
+    """
+
+    below, skip = None, (page - 1) * size
+    if after is not None:
+        position = decode_cursor(after)
+        if position is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor",
+            )
+        below, skip, page = position[1], 0, None
+
+    # One extra id tells whether there is a next page
+    page_ids = matches.top(size + 1, below=below, skip=skip)
+    posts = []
+    if page_ids:
+        rows = db.query(Post).options(*_list_options(selected)).filter(Post.id.in_(page_ids[:size])).all()
+        posts = sorted(rows, key=lambda post: post.id, reverse=True)
+    next_cursor = None
+    if len(page_ids) > size and posts:
+        next_cursor = encode_cursor(posts[-1].created_at, posts[-1].id)
+
+    total = len(matches) if include_total else None
+    pages = (total + size - 1) // size if total is not None else None
 
     return PostListResponse(
-        items=[PostResponse.model_validate(post) for post in posts],
+        items=[PostListItem.model_validate(project(post, selected)) for post in posts],
         total=total,
         page=page,
         size=size,
         pages=pages,
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/search", response_model=PostSearchResponse)
+@query_budget(2)
+async def search_posts(
+    q: str = Query(..., min_length=1, max_length=200),
+    page: int = Query(1, ge=1),
+    size: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db),
+):
+    hits, total = await db.run_sync(
+        lambda session: search_index.search(session, q, limit=size, offset=(page - 1) * size)
+    )
+
+    return PostSearchResponse(
+        items=[
+            PostSearchHit(
+                id=hit.post.id,
+                title=hit.post.title,
+                slug=hit.post.slug,
+                excerpt=hit.post.excerpt,
+                created_at=hit.post.created_at,
+                score=round(hit.score, 4),
+                snippet=highlight(hit.post.content, q),
+            )
+            for hit in hits
+        ],
+        total=total,
+        page=page,
+        size=size,
     )
 
 
 @router.get("/{post_id}", response_model=PostResponse)
-def get_post(post_id: int, db: Session = Depends(get_db)):
-    post = db.query(Post).filter(Post.id == post_id).first()
+@query_budget(4)
+async def get_post(post_id: int, db: AsyncSession = Depends(get_read_db)):
+    data = get_cached_post(post_id=post_id)
 
-    if not post:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Post not found",
-        )
+    if data is None:
+        post = await db.scalar(select(Post).options(*POST_RELATIONS).where(Post.id == post_id))
 
-    # Increment view count
-    post.view_count += 1
-    db.commit()
+        if not post:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Post not found",
+            )
 
-    return PostResponse.model_validate(post)
+        data = cache_post(PostResponse.model_validate(post))
+
+    return _record_view(data)
 
 
 @router.get("/slug/{slug}", response_model=PostResponse)
-def get_post_by_slug(slug: str, db: Session = Depends(get_db)):
-    post = db.query(Post).filter(Post.slug == slug).first()
+@query_budget(4)
+async def get_post_by_slug(slug: str, db: AsyncSession = Depends(get_read_db)):
+    data = get_cached_post(slug=slug)
 
-    if not post:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Post not found",
-        )
+    if data is None:
+        post = await db.scalar(select(Post).options(*POST_RELATIONS).where(Post.slug == slug))
 
-    # Increment view count
-    post.view_count += 1
-    db.commit()
+        if not post:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Post not found",
+            )
 
-    return PostResponse.model_validate(post)
+        data = cache_post(PostResponse.model_validate(post))
+
+    return _record_view(data)
 
 
 @router.post("", response_model=PostResponse, status_code=status.HTTP_201_CREATED)
@@ -109,8 +340,7 @@ def create_post(
     )
 
     db.add(post)
-    db.commit()
-    db.refresh(post)
+    db.flush()
 
     # Add categories and tags
     if post_data.category_ids:
@@ -127,8 +357,22 @@ def create_post(
                 post_tags.insert().values(post_id=post.id, tag_id=tag_id)
             )
 
+    counts_changed = sync_taxonomy_counts(
+        db,
+        was_published=False,
+        is_published=post.status == PostStatus.PUBLISHED,
+        old_category_ids=[],
+        new_category_ids=post_data.category_ids or [],
+        old_tag_ids=[],
+        new_tag_ids=post_data.tag_ids or [],
+    )
     db.commit()
     db.refresh(post)
+    post_count_cache.invalidate()
+    invalidate_taxonomy(counts_changed)
+    search_index.index_post(post)
+    taxonomy_index.index_post(post)
+    suggest_index.index_post(post)
 
     return PostResponse.model_validate(post)
 
@@ -155,6 +399,11 @@ def update_post(
             detail="Not authorized to update this post",
         )
 
+    old_slug = post.slug
+    was_published = post.status == PostStatus.PUBLISHED
+    old_category_ids = post.category_ids
+    old_tag_ids = post.tag_ids
+
     # Update fields
     if post_data.title:
         post.title = post_data.title
@@ -190,8 +439,24 @@ def update_post(
                 post_tags.insert().values(post_id=post_id, tag_id=tag_id)
             )
 
+    # Keep published-post counts on tags and categories in step
+    counts_changed = sync_taxonomy_counts(
+        db,
+        was_published=was_published,
+        is_published=post.status == PostStatus.PUBLISHED,
+        old_category_ids=old_category_ids,
+        new_category_ids=old_category_ids if post_data.category_ids is None else post_data.category_ids,
+        old_tag_ids=old_tag_ids,
+        new_tag_ids=old_tag_ids if post_data.tag_ids is None else post_data.tag_ids,
+    )
     db.commit()
     db.refresh(post)
+    post_count_cache.invalidate()
+    invalidate_taxonomy(counts_changed)
+    invalidate_post(post.id, old_slug, post.slug)
+    search_index.index_post(post)
+    taxonomy_index.index_post(post)
+    suggest_index.index_post(post)
 
     return PostResponse.model_validate(post)
 
@@ -217,7 +482,23 @@ def delete_post(
             detail="Not authorized to delete this post",
         )
 
+    slug = post.slug
+    counts_changed = sync_taxonomy_counts(
+        db,
+        was_published=post.status == PostStatus.PUBLISHED,
+        is_published=False,
+        old_category_ids=post.category_ids,
+        new_category_ids=[],
+        old_tag_ids=post.tag_ids,
+        new_tag_ids=[],
+    )
     db.delete(post)
     db.commit()
+    post_count_cache.invalidate()
+    invalidate_taxonomy(counts_changed)
+    invalidate_post(post_id, slug)
+    search_index.remove_post(post_id)
+    taxonomy_index.remove_post(post_id)
+    suggest_index.remove_post(post_id)
 
     return None
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List, Literal
+from app.core.database import get_db
+from app.core.query_budget import query_budget
+from app.schemas.suggest import SuggestResponse
+from app.services.suggest import MAX_SUGGESTIONS, suggest_index
+
+router = APIRouter()
+
+
+@router.get("", response_model=SuggestResponse, response_model_exclude_unset=True)
+@query_budget(1)
+def suggest(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(5, ge=1, le=MAX_SUGGESTIONS, description="Suggestions per kind"),
+    types: List[Literal["tag", "category", "post"]] = Query(
+        ["tag", "category", "post"], description="Kinds to suggest; repeat for several"
+    ),
+    db: Session = Depends(get_db),
+):
+    return SuggestResponse.model_validate(suggest_index.suggest(db, q, limit, types))
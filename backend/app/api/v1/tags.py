@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from typing import List
 from app.core.database import get_db
 from app.core.deps import require_role
+from app.core.query_budget import query_budget
 from app.models.user import User
 from app.models.tag import Tag
 from app.schemas.tag import TagCreate, TagUpdate, TagResponse
+from app.services.post_cache import invalidate_posts, posts_for_tag
+from app.services.taxonomy import tag_cache
 import slugify
 
 router = APIRouter()
@@ -17,22 +20,24 @@ def generate_slug(name: str) -> str:
 
 
 @router.get("", response_model=List[TagResponse])
-def list_tags(db: Session = Depends(get_db)):
-    tags = db.query(Tag).order_by(Tag.name).all()
-    return [TagResponse.model_validate(tag) for tag in tags]
+@query_budget(0)
+def list_tags():
+    # Served from the in-process snapshot; no database access
+    return Response(content=tag_cache.get().body, media_type="application/json")
 
 
 @router.get("/{tag_id}", response_model=TagResponse)
-def get_tag(tag_id: int, db: Session = Depends(get_db)):
-    tag = db.query(Tag).filter(Tag.id == tag_id).first()
+@query_budget(0)
+def get_tag(tag_id: int):
+    body = tag_cache.get().item_bodies.get(tag_id)
 
-    if not tag:
+    if body is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Tag not found",
         )
 
-    return TagResponse.model_validate(tag)
+    return Response(content=body, media_type="application/json")
 
 
 @router.post("", response_model=TagResponse, status_code=status.HTTP_201_CREATED)
@@ -59,6 +64,7 @@ def create_tag(
     db.add(tag)
     db.commit()
     db.refresh(tag)
+    tag_cache.invalidate()
 
     return TagResponse.model_validate(tag)
 
@@ -85,6 +91,8 @@ def update_tag(
 
     db.commit()
     db.refresh(tag)
+    invalidate_posts(posts_for_tag(db, tag.id))
+    tag_cache.invalidate()
 
     return TagResponse.model_validate(tag)
 
@@ -103,7 +111,10 @@ def delete_tag(
             detail="Tag not found",
         )
 
+    posts = posts_for_tag(db, tag.id)
     db.delete(tag)
     db.commit()
+    invalidate_posts(posts)
+    tag_cache.invalidate()
 
     return None
@@ -0,0 +1,62 @@
+import time
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from .cache import LRUCache
+from .config import settings
+from .security import decode_token
+from app.models.user import User
+
+# Verified token -> decoded payload, so repeated requests skip the HMAC check
+token_cache = LRUCache(max_size=settings.AUTH_CACHE_MAX_SIZE, ttl=settings.AUTH_CACHE_TTL)
+
+# User id ("sub") -> detached User, so repeated requests skip the users query
+user_cache = LRUCache(max_size=settings.AUTH_CACHE_MAX_SIZE, ttl=settings.AUTH_CACHE_TTL)
+
+
+def verify_token(token: str) -> Optional[dict]:
+    """Decode and verify a JWT, memoizing the result until the token expires."""
+    payload = token_cache.get(token)
+    now = time.time()
+
+    if payload is None:
+        payload = decode_token(token)
+        if payload is None:
+            return None
+        ttl = min(settings.AUTH_CACHE_TTL, payload.get("exp", now) - now)
+        if ttl > 0:
+            token_cache.set(token, payload, ttl=ttl)
+    elif payload.get("exp", now) <= now:
+        token_cache.delete(token)
+        return None
+
+    return payload
+
+
+def get_user(db: Session, user_id) -> Optional[User]:
+    """Load a user by id through the principal cache.
+
+    Cached users are detached from any session: column attributes can be
+    read freely, but relationships are not loaded.
+    """
+    key = str(user_id)
+    user = user_cache.get(key)
+    if user is None:
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is None:
+            return None
+        db.expunge(user)
+        user_cache.set(key, user)
+    return user
+
+
+def invalidate_user(user_id) -> None:
+    user_cache.delete(str(user_id))
+
+
+# Drop cached principals whenever a user row changes (e.g. role) or is deleted
+# through the ORM. Bulk query updates bypass these hooks and rely on the TTL.
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target: User) -> None:
+    invalidate_user(target.id)
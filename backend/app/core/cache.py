@@ -0,0 +1,173 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class CacheBackend:
+    """Minimal key/value cache interface used by the API layer."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class LRUCache(CacheBackend):
+    """In-process LRU cache with a per-entry TTL and a maximum entry count."""
+
+    def __init__(self, max_size: int, ttl: float):
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        data = super().stats()
+        data["size"] = len(self._entries)
+        return data
+
+
+class SharedCache(CacheBackend):
+    """Cache stored in a shared server so every worker sees the same entries.
+
+    ``client`` only needs the redis-py ``get``/``set(ex=)``/``delete`` subset,
+    so a ``LocalSharedClient`` can stand in for Redis in tests. Expiry and
+    eviction are handled by the server; only hits and misses are counted here.
+    """
+
+    def __init__(self, client, ttl: float, prefix: str = "myblog:"):
+        super().__init__()
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.client.set(self.prefix + key, value, ex=max(1, int(self.ttl if ttl is None else ttl)))
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+
+
+class LocalSharedClient:
+    """In-process stand-in for the subset of the Redis client SharedCache uses."""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[Optional[float], Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(name)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[name]
+                return None
+            return value
+
+    def set(self, name: str, value: Any, ex: Optional[float] = None, nx: bool = False) -> bool:
+        with self._lock:
+            if nx and self._live(name):
+                return False
+            self._data[name] = (time.monotonic() + ex if ex else None, value)
+        return True
+
+    def _live(self, name: str) -> bool:
+        entry = self._data.get(name)
+        return entry is not None and (entry[0] is None or entry[0] > time.monotonic())
+
+    def incr(self, name: str) -> int:
+        with self._lock:
+            expires_at, value = self._data[name] if self._live(name) else (None, 0)
+            value = int(value) + 1
+            self._data[name] = (expires_at, value)
+            return value
+
+    def delete(self, *names: str) -> int:
+        with self._lock:
+            return sum(self._data.pop(name, None) is not None for name in names)
+
+    def scan_iter(self, match: str = "*"):
+        prefix = match.rstrip("*")
+        with self._lock:
+            keys = [key for key in self._data if key.startswith(prefix)]
+        return iter(keys)
+
+
+def build_cache(backend: str, max_size: int, ttl: float, url: str = "", prefix: str = "myblog:") -> CacheBackend:
+    """Create the cache configured by ``backend`` ("memory", "redis" or "local")."""
+    if backend == "memory":
+        return LRUCache(max_size=max_size, ttl=ttl)
+    if backend == "local":
+        return SharedCache(LocalSharedClient(), ttl=ttl, prefix=prefix)
+    if backend == "redis":
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from exc
+        return SharedCache(redis.Redis.from_url(url), ttl=ttl, prefix=prefix)
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -2,8 +2,9 @@ from typing import Generator, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from .auth_cache import get_user, verify_token
 from .database import get_db
-from .security import decode_token
+from .revocation import revocation_store
 from app.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
@@ -19,15 +20,18 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    payload = decode_token(token)
-    if payload is None:
+    payload = verify_token(token)
+    if payload is None or payload.get("type") != "access":
+        raise credentials_exception
+
+    if revocation_store.is_token_revoked(payload):
         raise credentials_exception
 
     user_id: Optional[int] = payload.get("sub")
     if user_id is None:
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == user_id).first()
+    user = get_user(db, user_id)
     if user is None:
         raise credentials_exception
 
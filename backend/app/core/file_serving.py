@@ -0,0 +1,188 @@
+import os
+import stat
+from email.utils import formatdate
+from pathlib import Path
+from typing import Optional, Tuple
+import anyio
+from fastapi import HTTPException, Request, status
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+from app.core.config import settings
+
+# Cache-Control for URLs whose bytes never change
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Read size when the server offers no zero-copy extension (uvicorn offers none)
+CHUNK_SIZE = 256 * 1024
+
+
+class RangeFileResponse(Response):
+    """Send a file, or one byte range of it, without buffering it in Python.
+
+    Uses the ASGI ``http.response.zerocopysend`` extension (``sendfile``) or
+    ``http.response.pathsend`` when the server offers them, and otherwise
+    streams ``CHUNK_SIZE`` reads from a worker thread. Uvicorn advertises
+    neither, so under uvicorn every body takes the streaming path; production
+    deployments should set ``MEDIA_ACCEL_REDIRECT`` and let nginx send the
+    file (see SETUP.md).
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        start: int,
+        length: int,
+        status_code: int,
+        headers: dict,
+        media_type: str,
+        send_body: bool = True,
+    ):
+        self.path = path
+        self.start = start
+        self.length = length
+        self.send_body = send_body
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(headers)
+        self.headers["content-length"] = str(length)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if not self.send_body or self.length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopysend" in extensions:
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "offset": self.start,
+                    "count": self.length,
+                    "more_body": False,
+                })
+            return
+        if "http.response.pathsend" in extensions and self.status_code == status.HTTP_200_OK:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+            return
+
+        remaining = self.length
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            while remaining:
+                chunk = await file.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining:
+            # File shrank underneath us; close the body so the client sees a short read
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires."""
+    if header.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == bare for candidate in header.split(","))
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single ``bytes=`` range into ``(start, end)`` inclusive.
+
+    Returns None for headers that should be ignored (other units, several
+    ranges, malformed), so the whole file is sent. Raises 416 when the range
+    lies outside the file.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # Suffix range: the final N bytes
+            start = max(size - int(last), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def serve_file(
+    request: Request,
+    path: Path,
+    media_type: str,
+    etag: Optional[str] = None,
+    cache_control: str = IMMUTABLE_CACHE_CONTROL,
+) -> Response:
+    """Build the response for a GET/HEAD of a stored file.
+
+    ``etag`` should be the quoted content digest; without one a weak ETag is
+    derived from size and mtime. Answers ``If-None-Match`` with 304 and a
+    single ``Range`` (honouring ``If-Range``) with 206; everything else gets
+    the whole file. With ``MEDIA_ACCEL_REDIRECT`` set, the body is handed to
+    the fronting nginx through ``X-Accel-Redirect`` instead.
+    """
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        stat_result = None
+    if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found",
+        )
+
+    if etag is None:
+        # No stored digest: fall back to a weak validator from the file's metadata
+        etag = f'W/"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+    headers = {
+        "etag": etag,
+        "cache-control": cache_control,
+        "accept-ranges": "bytes",
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if settings.MEDIA_ACCEL_REDIRECT:
+        relative = path.resolve().relative_to(Path(settings.UPLOAD_DIR).resolve())
+        headers["x-accel-redirect"] = f"{settings.MEDIA_ACCEL_REDIRECT.rstrip('/')}/{relative.as_posix()}"
+        return Response(headers=headers, media_type=media_type)
+
+    size = stat_result.st_size
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # If-Range needs a strong match; a changed file must be sent whole
+    if range_header and (if_range is None or (if_range.strip() == etag and not etag.startswith("W/"))):
+        byte_range = parse_range(range_header, size)
+
+    send_body = request.method != "HEAD"
+    if byte_range is None:
+        return RangeFileResponse(path, 0, size, status.HTTP_200_OK, headers, media_type, send_body)
+
+    start, end = byte_range
+    headers["content-range"] = f"bytes {start}-{end}/{size}"
+    return RangeFileResponse(
+        path, start, end - start + 1, status.HTTP_206_PARTIAL_CONTENT, headers, media_type, send_body
+    )
@@ -0,0 +1,283 @@
+import bisect
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from .sql_metrics import BUCKETS_MS, sql_metrics
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds of the request latency (seconds) and response size (bytes) buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Route label for requests that matched no route, so unknown paths cannot add series
+UNMATCHED = "<unmatched>"
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Exposition:
+    """Accumulates metric families in the Prometheus text format."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def family(self, name: str, kind: str, help_text: str) -> None:
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value: float, labels: Optional[Dict[str, object]] = None) -> None:
+        if labels:
+            rendered = ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+            self.lines.append(f"{name}{{{rendered}}} {_number(value)}")
+        else:
+            self.lines.append(f"{name} {_number(value)}")
+
+    def histogram(
+        self,
+        name: str,
+        bounds: Sequence[float],
+        counts: Sequence[int],
+        total: float,
+        labels: Optional[Dict[str, object]] = None,
+    ) -> None:
+        """One histogram series from per-bucket ``counts``; the last count is above every bound."""
+        labels = labels or {}
+        cumulative = 0
+        for bound, bucket in zip((*bounds, math.inf), counts):
+            cumulative += bucket
+            self.sample(f"{name}_bucket", cumulative, {**labels, "le": _number(bound)})
+        self.sample(f"{name}_sum", total, labels)
+        self.sample(f"{name}_count", cumulative, labels)
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+class _RouteSeries:
+    __slots__ = ("latency", "latency_sum", "size", "size_sum", "statuses")
+
+    def __init__(self):
+        self.latency = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.size = [0] * (len(SIZE_BUCKETS) + 1)
+        self.size_sum = 0
+        self.statuses: Dict[int, int] = {}
+
+    def merge(self, other: "_RouteSeries") -> None:
+        self.latency = [a + b for a, b in zip(self.latency, other.latency)]
+        self.latency_sum += other.latency_sum
+        self.size = [a + b for a, b in zip(self.size, other.size)]
+        self.size_sum += other.size_sum
+        for status, count in list(other.statuses.items()):
+            self.statuses[status] = self.statuses.get(status, 0) + count
+
+
+class RequestMetrics:
+    """Request counts, latency and response size per method and route template.
+
+    Each thread records into a shard of its own, so recording takes no lock;
+    a scrape sums the shards and may see a request in one series a moment
+    before another, which Prometheus tolerates. ``in_flight`` is only
+    touched by the middleware on the event loop thread.
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self._local = threading.local()
+        self._shards: List[Dict[Tuple[str, str], _RouteSeries]] = []
+        self._shards_lock = threading.Lock()
+
+    def _new_shard(self) -> Dict[Tuple[str, str], _RouteSeries]:
+        shard: Dict[Tuple[str, str], _RouteSeries] = {}
+        with self._shards_lock:
+            self._shards.append(shard)
+        self._local.shard = shard
+        return shard
+
+    def observe(self, method: str, route: str, status: int, seconds: float, size: int) -> None:
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        series = shard.get((method, route))
+        if series is None:
+            series = shard[(method, route)] = _RouteSeries()
+        series.latency[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        series.latency_sum += seconds
+        series.size[bisect.bisect_left(SIZE_BUCKETS, size)] += 1
+        series.size_sum += size
+        series.statuses[status] = series.statuses.get(status, 0) + 1
+
+    def merged(self) -> Dict[Tuple[str, str], _RouteSeries]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        merged: Dict[Tuple[str, str], _RouteSeries] = {}
+        for shard in shards:
+            for key, series in list(shard.items()):
+                merged.setdefault(key, _RouteSeries()).merge(series)
+        return merged
+
+    def collect(self, out: Exposition) -> None:
+        series = sorted(self.merged().items())
+
+        out.family("http_requests_total", "counter", "HTTP requests by method, route template and status.")
+        for (method, route), data in series:
+            for status, count in sorted(data.statuses.items()):
+                out.sample("http_requests_total", count, {"method": method, "route": route, "status": status})
+
+        out.family("http_request_duration_seconds", "histogram", "Time from receiving a request to finishing its response.")
+        for (method, route), data in series:
+            out.histogram(
+                "http_request_duration_seconds", LATENCY_BUCKETS, data.latency, data.latency_sum,
+                {"method": method, "route": route},
+            )
+
+        out.family("http_response_size_bytes", "histogram", "Response body size.")
+        for (method, route), data in series:
+            out.histogram(
+                "http_response_size_bytes", SIZE_BUCKETS, data.size, data.size_sum,
+                {"method": method, "route": route},
+            )
+
+        out.family("http_requests_in_flight", "gauge", "Requests being handled right now.")
+        out.sample("http_requests_in_flight", self.in_flight)
+
+
+def collect_sql(out: Exposition) -> None:
+    """Statement totals and connection pool gauges from sql_metrics."""
+    count, total_ms = sql_metrics.totals()
+    out.family("db_statements_total", "counter", "SQL statements run.")
+    out.sample("db_statements_total", count)
+    out.family("db_statement_seconds_total", "counter", "Time spent running SQL statements.")
+    out.sample("db_statement_seconds_total", total_ms / 1000)
+
+    pools = [(name, engine.pool) for name, engine in sql_metrics.engines.items()]
+    out.family("db_pool_size", "gauge", "Connections the pool keeps open.")
+    for name, pool in pools:
+        if hasattr(pool, "size"):
+            out.sample("db_pool_size", pool.size(), {"engine": name})
+    out.family("db_pool_connections", "gauge", "Pool connections by state.")
+    for name, pool in pools:
+        if hasattr(pool, "checkedout"):
+            out.sample("db_pool_connections", pool.checkedout(), {"engine": name, "state": "checked_out"})
+            out.sample("db_pool_connections", pool.checkedin(), {"engine": name, "state": "checked_in"})
+            out.sample("db_pool_connections", max(pool.overflow(), 0), {"engine": name, "state": "overflow"})
+    out.family("db_pool_checkout_wait_seconds", "histogram", "Time to get a connection from the pool.")
+    seconds = tuple(bound / 1000 for bound in BUCKETS_MS)
+    for name, pool in pools:
+        wait = getattr(pool, "checkout_wait", None)
+        if wait is not None:
+            counts, _, total_ms = wait.snapshot()
+            out.histogram("db_pool_checkout_wait_seconds", seconds, counts, total_ms / 1000, {"engine": name})
+
+
+class MetricsRegistry:
+    """Everything /metrics reports, gathered from its sources at scrape time."""
+
+    def __init__(self):
+        self.requests = RequestMetrics()
+        self._caches: Dict[str, object] = {}
+        self._values: List[Tuple[str, str, str, Callable[[], float]]] = []
+        self._collectors: List[Callable[[Exposition], None]] = [self.requests.collect, collect_sql]
+
+    def add_cache(self, name: str, cache) -> None:
+        """Report a cache's ``hits``/``misses`` (and ``evictions`` if it has them)."""
+        self._caches[name] = cache
+
+    def add_value(self, name: str, kind: str, help_text: str, read: Callable[[], float]) -> None:
+        """Report an unlabelled counter or gauge read from ``read`` on each scrape."""
+        self._values.append((name, kind, help_text, read))
+
+    def add_collector(self, collect: Callable[[Exposition], None]) -> None:
+        self._collectors.append(collect)
+
+    def _collect_caches(self, out: Exposition) -> None:
+        caches = sorted(self._caches.items())
+        for metric, attribute, help_text in (
+            ("cache_hits_total", "hits", "Cache lookups that found an entry."),
+            ("cache_misses_total", "misses", "Cache lookups that found nothing."),
+            ("cache_evictions_total", "evictions", "Entries dropped for size or expiry."),
+        ):
+            out.family(metric, "counter", help_text)
+            for name, cache in caches:
+                if hasattr(cache, attribute):
+                    out.sample(metric, getattr(cache, attribute), {"cache": name})
+        out.family("cache_hit_ratio", "gauge", "Hits over lookups since start.")
+        for name, cache in caches:
+            lookups = cache.hits + cache.misses
+            out.sample("cache_hit_ratio", cache.hits / lookups if lookups else 0, {"cache": name})
+
+    def render(self) -> str:
+        out = Exposition()
+        for collect in self._collectors:
+            collect(out)
+        self._collect_caches(out)
+        for name, kind, help_text, read in self._values:
+            out.family(name, kind, help_text)
+            out.sample(name, read())
+        return out.text()
+
+
+class RequestMetricsMiddleware:
+    """Records every HTTP request into ``registry.requests``.
+
+    Add it last so it wraps the other middleware. The route label is the
+    matched route's path template; the size is the Content-Length header,
+    or the body bytes sent when there is none.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.requests = registry.requests
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        declared_size: Optional[int] = None
+        sent_size = 0
+
+        async def send_and_measure(message):
+            nonlocal status, declared_size, sent_size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name.lower() == b"content-length":
+                        declared_size = int(value)
+                        break
+            elif message["type"] == "http.response.body":
+                sent_size += len(message.get("body", b""))
+            await send(message)
+
+        self.requests.in_flight += 1
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            self.requests.in_flight -= 1
+            route = scope.get("route")
+            self.requests.observe(
+                scope["method"],
+                route.path if route is not None else UNMATCHED,
+                status,
+                time.perf_counter() - started,
+                declared_size if declared_size is not None else sent_size,
+            )
+
+
+metrics_registry = MetricsRegistry()
@@ -0,0 +1,80 @@
+import base64
+import binascii
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Hashable, Optional, Tuple, Union
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    """Encode a (created_at, id) keyset position as an opaque URL-safe token."""
+    raw = json.dumps([created_at.isoformat(), item_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[datetime, int]]:
+    """Decode a token produced by encode_cursor. Returns None if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(item_id)
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        return None
+
+
+def cursor_bind_value(db: Union[Session, AsyncSession], created_at: datetime) -> Union[datetime, str]:
+    """Return the cursor timestamp in a form comparable with the stored column.
+
+    SQLite keeps DATETIME as text and ``CURRENT_TIMESTAMP`` omits fractional
+    seconds, while SQLAlchemy binds datetimes with microseconds; comparing the
+    two as strings would never match rows created in the same second.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return created_at.isoformat(sep=" ")
+    return created_at
+
+
+class CountCache:
+    """Short-lived cache for expensive COUNT(*) results.
+
+    Totals shown next to a paginated listing do not need to be exact to the
+    row, so they are recomputed at most once per ``ttl`` seconds per key and
+    dropped explicitly when a write changes them.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[Hashable, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        return None
+
+    def set(self, key: Hashable, value: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], int]) -> int:
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
@@ -0,0 +1,26 @@
+from typing import Iterable, List, Optional, Sequence
+from fastapi import HTTPException, status
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str], default: Sequence[str]) -> List[str]:
+    """Parse a comma-separated ``fields=`` query parameter.
+
+    Returns ``default`` when nothing was requested and raises a 400 for names
+    outside ``allowed``.
+    """
+    if not fields:
+        return list(default)
+
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed fields: {', '.join(allowed)}",
+        )
+    return list(dict.fromkeys(requested))
+
+
+def project(obj, fields: Iterable[str]) -> dict:
+    """Read only the selected attributes, so deferred columns are never loaded."""
+    return {name: getattr(obj, name) for name in fields}
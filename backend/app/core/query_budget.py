@@ -0,0 +1,175 @@
+import json
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional, Tuple, Union
+from starlette.datastructures import MutableHeaders
+from .sql_metrics import sql_metrics
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUDGET_MODES = ("off", "warn", "raise")
+
+
+class QueryLog:
+    """Statements run for one request, or inside one ``capture_queries`` block."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, shape: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[shape] += 1
+
+    def most_repeated(self) -> Tuple[Optional[str], int]:
+        """The statement shape run most often and how many times it ran."""
+        if not self.shapes:
+            return None, 0
+        return self.shapes.most_common(1)[0]
+
+
+# Marks code inside untracked_queries()
+_UNTRACKED = object()
+
+# Log of the request being handled; copied into threadpool workers and
+# SQLAlchemy's async greenlets along with the rest of the context
+_request_log: ContextVar[Union[QueryLog, object, None]] = ContextVar("request_query_log", default=None)
+
+
+def _record_for_request(shape: str, seconds: float) -> None:
+    log = _request_log.get()
+    if isinstance(log, QueryLog):
+        log.record(shape, seconds)
+
+
+sql_metrics.add_statement_listener(_record_for_request)
+
+
+def query_budget(limit: int):
+    """Declare the most queries a route may run per request; apply below the route decorator."""
+
+    def decorate(endpoint):
+        endpoint.query_budget = limit
+        return endpoint
+
+    return decorate
+
+
+@contextmanager
+def capture_queries() -> Iterator[QueryLog]:
+    """Collect every statement any instrumented engine runs inside the block.
+
+    Unlike the per-request log this is not tied to a context, so it also sees
+    the queries a TestClient's server thread runs; like it, it skips
+    untracked_queries() blocks. Tests use it through the ``max_queries``
+    fixture in tests/conftest.py::
+
+        with max_queries(3):
+            client.get("/api/v1/posts")
+    """
+    log = QueryLog()
+
+    def record(shape: str, seconds: float) -> None:
+        if _request_log.get() is not _UNTRACKED:
+            log.record(shape, seconds)
+
+    sql_metrics.add_statement_listener(record)
+    try:
+        yield log
+    finally:
+        sql_metrics.remove_statement_listener(record)
+
+
+@contextmanager
+def untracked_queries() -> Iterator[None]:
+    """Leave the statements run inside the block out of the current request's log.
+
+    For one-off loads of in-process snapshots and indexes, which would
+    otherwise charge a worker's warm-up to whichever request triggered it.
+    """
+    token = _request_log.set(_UNTRACKED)
+    try:
+        yield
+    finally:
+        _request_log.reset(token)
+
+
+class QueryBudgetMiddleware:
+    """Counts each request's queries and reports them in a Server-Timing header.
+
+    A request that runs more queries than its route's ``@query_budget`` (or
+    ``default_budget`` for routes without one) is logged, as is one that runs
+    the same statement shape ``repeat_threshold`` times or more, the usual
+    sign of an N+1. In "raise" mode, meant for tests, a budget overrun
+    replaces the response with a 500 that says which route went over.
+    """
+
+    def __init__(self, app, mode: str = "warn", default_budget: int = 0, repeat_threshold: int = 5):
+        if mode not in QUERY_BUDGET_MODES:
+            raise ValueError(f"Unknown query budget mode: {mode}")
+        self.app = app
+        self.mode = mode
+        self.default_budget = default_budget
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.mode == "off":
+            await self.app(scope, receive, send)
+            return
+
+        log = QueryLog()
+        token = _request_log.set(log)
+        replaced = False
+
+        async def send_with_timing(message):
+            nonlocal replaced
+            if replaced:
+                return
+            if message["type"] == "http.response.start":
+                overrun = self._check(scope, log)
+                if overrun is not None and self.mode == "raise":
+                    replaced = True
+                    body = json.dumps({"detail": overrun}).encode()
+                    await send({
+                        "type": "http.response.start",
+                        "status": 500,
+                        "headers": [
+                            (b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode()),
+                        ],
+                    })
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                MutableHeaders(scope=message).append("server-timing", self._server_timing(log))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_log.reset(token)
+
+    def _check(self, scope, log: QueryLog) -> Optional[str]:
+        """Log repeated statements and return a description of a budget overrun, if any."""
+        route = scope.get("route")
+        name = f"{scope['method']} {getattr(route, 'path', scope['path'])}"
+        shape, repeats = log.most_repeated()
+        if repeats >= self.repeat_threshold:
+            logger.warning("Possible N+1 in %s: the same statement ran %d times: %s", name, repeats, shape[:500])
+
+        budget = getattr(getattr(route, "endpoint", None), "query_budget", None)
+        if budget is None:
+            budget = self.default_budget or None
+        if budget is not None and log.count > budget:
+            message = f"{name} ran {log.count} queries, over its budget of {budget}"
+            logger.warning(message)
+            return message
+        return None
+
+    @staticmethod
+    def _server_timing(log: QueryLog) -> str:
+        _, repeats = log.most_repeated()
+        return f'db;dur={log.seconds * 1000:.3f};desc="{log.count} queries, max {repeats}x same statement"'
@@ -0,0 +1,284 @@
+import asyncio
+import itertools
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, List, Optional
+from fastapi import Request
+from sqlalchemy.engine import Connection, make_url
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.datastructures import MutableHeaders
+from .config import settings
+from .database import AsyncSessionLocal, async_database_url, pool_options
+from .sql_metrics import sql_metrics
+
+logger = logging.getLogger(__name__)
+
+# Cookie holding the time (epoch seconds) until which a client reads from the primary
+STICKY_COOKIE = "read_primary_until"
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+BALANCING_STRATEGIES = ("round_robin", "least_connections")
+
+
+def replication_lag(connection: Connection) -> Optional[float]:
+    """Seconds the database behind ``connection`` trails its source.
+
+    Backends without replication status (such as SQLite files standing in for
+    replicas) report no lag. Returns None when the server is not replicating.
+    """
+    if connection.dialect.name != "mysql":
+        return 0.0
+    for statement, column in (
+        ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+        ("SHOW SLAVE STATUS", "Seconds_Behind_Master"),  # MySQL before 8.0.22
+    ):
+        try:
+            row = connection.exec_driver_sql(statement).mappings().first()
+        except DBAPIError:
+            continue
+        if row is None or row[column] is None:
+            return None
+        return float(row[column])
+    return None
+
+
+class Replica:
+    """A read replica: its async engine and the state seen by the last check."""
+
+    def __init__(self, url: str):
+        async_url = async_database_url(url)
+        self.name = make_url(url).render_as_string(hide_password=True)
+        self.engine = create_async_engine(
+            async_url,
+            pool_pre_ping=True,
+            pool_recycle=3600,
+            echo=settings.SQL_ECHO,
+            **pool_options(async_url),
+        )
+        sql_metrics.instrument(self.engine.sync_engine, f"replica {self.name}")
+        self.sessions = async_sessionmaker(self.engine, autoflush=False, expire_on_commit=False)
+        self.healthy = True  # until the first check says otherwise
+        self.lag: Optional[float] = None
+        self.active = 0  # sessions currently open
+
+
+class ReplicaRouter:
+    """Chooses the database for read-only requests.
+
+    Reads go to a healthy replica, picked round-robin or by fewest open
+    sessions. A background check marks replicas unhealthy when they stop
+    answering or trail the primary by more than ``max_lag`` seconds, and a
+    connection error during a request takes the replica out until the next
+    check passes. A replica that cannot be reached when the session opens
+    sends that request to the primary as well; with no healthy replica,
+    reads use the primary.
+
+    For ``sticky_seconds`` after a successful write, the writing client
+    reads from the primary (through a cookie, so across workers); everyone
+    else keeps reading from the replicas.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        balancing: str = "round_robin",
+        sticky_seconds: float = 5.0,
+        max_lag: float = 5.0,
+        check_interval: float = 5.0,
+        lag_probe: Callable[[Connection], Optional[float]] = replication_lag,
+    ):
+        if balancing not in BALANCING_STRATEGIES:
+            raise ValueError(f"Unknown replica balancing strategy: {balancing}")
+        self.replicas = [Replica(url) for url in urls]
+        self.balancing = balancing
+        self.sticky_seconds = sticky_seconds
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag_probe = lag_probe
+        self._turn = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    def choose(self) -> Optional[Replica]:
+        """Pick a healthy replica, or None to read from the primary."""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        start = next(self._turn) % len(healthy)
+        if self.balancing == "round_robin":
+            return healthy[start]
+        # Rotate first so ties do not always land on the same replica
+        rotated = healthy[start:] + healthy[:start]
+        return min(rotated, key=lambda replica: replica.active)
+
+    def is_sticky(self, request: Request) -> bool:
+        """Whether this client wrote recently enough that it must read from the primary."""
+        value = request.cookies.get(STICKY_COOKIE)
+        if value is None:
+            return False
+        try:
+            return float(value) > time.time()
+        except ValueError:
+            return False
+
+    def record_write(self) -> str:
+        """Set-Cookie value that keeps the writing client on the primary for ``sticky_seconds``."""
+        until = time.time() + self.sticky_seconds
+        return (
+            f"{STICKY_COOKIE}={until:.3f}; Max-Age={math.ceil(self.sticky_seconds)}; "
+            "Path=/; HttpOnly; SameSite=Lax"
+        )
+
+    @asynccontextmanager
+    async def session(self, request: Request):
+        """Open an AsyncSession on the database chosen for ``request``."""
+        replica = None
+        if self.replicas and not self.is_sticky(request):
+            replica = self.choose()
+        if replica is None:
+            async with AsyncSessionLocal() as db:
+                yield db
+            return
+
+        replica.active += 1
+        try:
+            async with replica.sessions() as db:
+                try:
+                    # Connect before handing the session out, so a replica that
+                    # is down sends this request to the primary too
+                    await db.connection()
+                except OperationalError:
+                    self._take_out(replica)
+                else:
+                    try:
+                        yield db
+                    except OperationalError:
+                        # Mid-request failures cannot be retried elsewhere
+                        self._take_out(replica)
+                        raise
+                    return
+        finally:
+            replica.active -= 1
+
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    @staticmethod
+    def _take_out(replica: Replica) -> None:
+        replica.healthy = False
+        logger.warning("Read replica %s failed; using the primary until it passes a check", replica.name)
+
+    async def check(self) -> None:
+        """Refresh the health and lag of every replica."""
+        for replica in self.replicas:
+            try:
+                lag = await asyncio.wait_for(self._probe(replica), self.check_interval)
+            except Exception as exc:
+                lag, healthy, reason = None, False, f"unreachable ({exc.__class__.__name__})"
+            else:
+                healthy = lag is not None and lag <= self.max_lag
+                reason = "not replicating" if lag is None else f"{lag:g}s behind"
+            if healthy != replica.healthy:
+                if healthy:
+                    logger.info("Read replica %s is back in rotation", replica.name)
+                else:
+                    logger.warning("Read replica %s taken out of rotation: %s", replica.name, reason)
+            replica.healthy, replica.lag = healthy, lag
+
+    async def _probe(self, replica: Replica) -> Optional[float]:
+        async with replica.engine.connect() as connection:
+            return await connection.run_sync(self.lag_probe)
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self.check_interval)
+
+    def start(self) -> None:
+        """Start the periodic check; call from inside the running event loop."""
+        if self.replicas and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def collect(self, out) -> None:
+        """Write replica health and lag to a metrics ``Exposition``."""
+        out.family("db_replica_healthy", "gauge", "1 while the read replica is in rotation.")
+        for replica in self.replicas:
+            out.sample("db_replica_healthy", int(replica.healthy), {"replica": replica.name})
+        out.family("db_replica_lag_seconds", "gauge", "Replication lag seen by the last check.")
+        for replica in self.replicas:
+            if replica.lag is not None:
+                out.sample("db_replica_lag_seconds", replica.lag, {"replica": replica.name})
+
+    def stats(self) -> List[dict]:
+        return [
+            {"name": replica.name, "healthy": replica.healthy, "lag": replica.lag, "active": replica.active}
+            for replica in self.replicas
+        ]
+
+
+def not_a_write(endpoint):
+    """Mark an unsafe route that changes nothing its client reads back, such as login.
+
+    Apply below the route decorator; a success then does not pin the client's
+    reads to the primary.
+    """
+    endpoint.read_your_writes = False
+    return endpoint
+
+
+class ReadYourWritesMiddleware:
+    """Marks clients whose unsafe request succeeded so their reads stick to the primary.
+
+    Only that client is marked, through a cookie; other clients keep reading
+    from the replicas.
+    """
+
+    def __init__(self, app, router: ReplicaRouter):
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or not self.router.replicas:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400 and self._is_write(scope):
+                MutableHeaders(scope=message).append("set-cookie", self.router.record_write())
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+    @staticmethod
+    def _is_write(scope) -> bool:
+        endpoint = getattr(scope.get("route"), "endpoint", None)
+        return getattr(endpoint, "read_your_writes", True)
+
+
+replica_router = ReplicaRouter(
+    settings.DATABASE_REPLICA_URLS,
+    balancing=settings.REPLICA_BALANCING,
+    sticky_seconds=settings.REPLICA_STICKY_SECONDS,
+    max_lag=settings.REPLICA_MAX_LAG,
+    check_interval=settings.REPLICA_CHECK_INTERVAL,
+)
+
+
+async def get_read_db(request: Request):
+    """Session for read-only handlers: a replica when one is usable, else the primary."""
+    async with replica_router.session(request) as db:
+        yield db
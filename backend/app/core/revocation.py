@@ -0,0 +1,133 @@
+import heapq
+import threading
+import time
+from typing import Dict, List, Tuple
+from .cache import LocalSharedClient
+from .config import settings
+
+
+class RevocationStore:
+    """Tracks revoked token ids (``jti``) and per-user revocation cutoffs.
+
+    Entries only need to outlive the tokens they revoke, so each one is
+    stored with that token's expiry and dropped afterwards.
+    """
+
+    def revoke(self, jti: str, expires_at: float) -> bool:
+        """Revoke a token id. Returns False if it was already revoked."""
+        raise NotImplementedError
+
+    def is_revoked(self, jti: str) -> bool:
+        raise NotImplementedError
+
+    def revoke_user(self, user_id: str, until: float) -> None:
+        """Revoke every token for ``user_id`` issued before now."""
+        raise NotImplementedError
+
+    def user_cutoff(self, user_id: str) -> float:
+        """Tokens for ``user_id`` issued before this timestamp are revoked."""
+        raise NotImplementedError
+
+    def is_token_revoked(self, payload: dict) -> bool:
+        jti = payload.get("jti")
+        if jti and self.is_revoked(jti):
+            return True
+        cutoff = self.user_cutoff(str(payload.get("sub")))
+        return bool(cutoff) and payload.get("iat", 0) < cutoff
+
+
+class InMemoryRevocationStore(RevocationStore):
+    """Per-process store: dict lookups plus an expiry heap for pruning."""
+
+    def __init__(self):
+        # jti as 16 raw bytes -> expiry
+        self._revoked: Dict[bytes, float] = {}
+        self._user_cutoffs: Dict[str, Tuple[float, float]] = {}
+        self._expiry_heap: List[Tuple[float, bytes]] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(jti: str) -> bytes:
+        try:
+            return bytes.fromhex(jti)
+        except ValueError:
+            return jti.encode()
+
+    def _prune(self, now: float) -> None:
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            _, key = heapq.heappop(self._expiry_heap)
+            self._revoked.pop(key, None)
+
+    def revoke(self, jti: str, expires_at: float) -> bool:
+        key = self._key(jti)
+        with self._lock:
+            self._prune(time.time())
+            if key in self._revoked:
+                return False
+            self._revoked[key] = expires_at
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+            return True
+
+    def is_revoked(self, jti: str) -> bool:
+        expires_at = self._revoked.get(self._key(jti))
+        return expires_at is not None and expires_at > time.time()
+
+    def revoke_user(self, user_id: str, until: float) -> None:
+        with self._lock:
+            self._user_cutoffs[user_id] = (time.time(), until)
+
+    def user_cutoff(self, user_id: str) -> float:
+        entry = self._user_cutoffs.get(user_id)
+        if entry is None:
+            return 0.0
+        cutoff, until = entry
+        if until <= time.time():
+            with self._lock:
+                self._user_cutoffs.pop(user_id, None)
+            return 0.0
+        return cutoff
+
+
+class SharedRevocationStore(RevocationStore):
+    """Store kept in a Redis-compatible server so all workers share it."""
+
+    def __init__(self, client, prefix: str = "myblog:revoked:"):
+        self.client = client
+        self.prefix = prefix
+
+    @staticmethod
+    def _ttl(until: float) -> int:
+        return max(1, int(until - time.time()) + 1)
+
+    def revoke(self, jti: str, expires_at: float) -> bool:
+        return bool(self.client.set(f"{self.prefix}jti:{jti}", 1, ex=self._ttl(expires_at), nx=True))
+
+    def is_revoked(self, jti: str) -> bool:
+        return self.client.get(f"{self.prefix}jti:{jti}") is not None
+
+    def revoke_user(self, user_id: str, until: float) -> None:
+        self.client.set(f"{self.prefix}user:{user_id}", repr(time.time()), ex=self._ttl(until))
+
+    def user_cutoff(self, user_id: str) -> float:
+        value = self.client.get(f"{self.prefix}user:{user_id}")
+        if value is None:
+            return 0.0
+        return float(value.decode() if isinstance(value, bytes) else value)
+
+
+def build_revocation_store(backend: str, url: str = "") -> RevocationStore:
+    """Create the store configured by REVOCATION_BACKEND ("memory", "redis" or "local")."""
+    if backend == "memory":
+        return InMemoryRevocationStore()
+    if backend == "local":
+        return SharedRevocationStore(LocalSharedClient())
+    if backend == "redis":
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("REVOCATION_BACKEND=redis requires the 'redis' package") from exc
+        return SharedRevocationStore(redis.Redis.from_url(url))
+    raise ValueError(f"Unknown revocation backend: {backend}")
+
+
+revocation_store = build_revocation_store(settings.REVOCATION_BACKEND, settings.CACHE_URL)
@@ -1,22 +1,140 @@
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from .config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes made with a different cost are flagged by verify_and_update and
+# transparently rehashed on the next successful login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash/verify operations are already queued."""
+
+
+class LatencyStats:
+    """Count, total and max duration of one kind of operation."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "count": self.count,
+                "avg_ms": round(self.total_seconds / self.count * 1000, 3) if self.count else 0.0,
+                "max_ms": round(self.max_seconds * 1000, 3),
+            }
+
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated, bounded thread pool.
+
+    bcrypt releases the GIL, so a small thread pool gives real parallelism
+    without tying up the request threadpool. At most ``workers + max_pending``
+    operations are admitted at once; callers beyond that get
+    PasswordHasherBusy immediately instead of queueing. Each operation
+    returns a future: async callers await it through ``asyncio.wrap_future``
+    and scripts call ``result()``.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hasher")
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.latency = {"hash": LatencyStats(), "verify": LatencyStats(), "queue_wait": LatencyStats()}
+
+    def _run(self, operation: str, func, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy()
+
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            self.latency["queue_wait"].observe(started - submitted)
+            try:
+                return func(*args)
+            finally:
+                self.latency[operation].observe(time.perf_counter() - started)
+                self._slots.release()
+
+        try:
+            future = self._executor.submit(timed)
+        except BaseException:
+            self._slots.release()
+            raise
+        # A future cancelled while queued (its caller went away) never runs timed()
+        future.add_done_callback(lambda done: done.cancelled() and self._slots.release())
+        return future
+
+    def hash(self, password: str) -> "Future[str]":
+        return self._run("hash", pwd_context.hash, password)
+
+    def verify(self, plain_password: str, hashed_password: str) -> "Future[bool]":
+        return self._run("verify", pwd_context.verify, plain_password, hashed_password)
+
+    def verify_and_update(self, plain_password: str, hashed_password: str) -> "Future[Tuple[bool, Optional[str]]]":
+        return self._run("verify", pwd_context.verify_and_update, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        data = {name: stats.snapshot() for name, stats in self.latency.items()}
+        with self._lock:
+            data["rejected"] = self.rejected
+        return data
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
+
+
+# Blocking helpers for scripts; request handlers await the hasher's futures instead
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.verify(plain_password, hashed_password).result()
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password; also return a new hash if the stored one uses an outdated cost."""
+    return password_hasher.verify_and_update(plain_password, hashed_password).result()
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_hasher.hash(password).result()
 
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+def _prepare_claims(data: dict) -> dict:
     to_encode = data.copy()
+    # JWT requires the subject claim to be a string
+    if "sub" in to_encode:
+        to_encode["sub"] = str(to_encode["sub"])
+    # Unique id for revocation; sub-second iat so a user-wide revocation
+    # does not also reject tokens issued right after it
+    to_encode.update({"jti": uuid.uuid4().hex, "iat": time.time()})
+    return to_encode
+
+
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    to_encode = _prepare_claims(data)
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
@@ -28,7 +146,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 
 def create_refresh_token(data: dict) -> str:
-    to_encode = data.copy()
+    to_encode = _prepare_claims(data)
     expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({"exp": expire, "type": "refresh"})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
@@ -0,0 +1,287 @@
+import bisect
+import logging
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in milliseconds; the last bucket is open-ended
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Seconds before the same slow statement is EXPLAINed again
+EXPLAIN_INTERVAL = 60.0
+
+# Statements longer than this are cut in the slow-query log
+MAX_LOGGED_SQL = 2000
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|(?<![:\w]):\w+")
+_IN_LIST = re.compile(r"\bIN \(\?(?:, \?)*\)", re.IGNORECASE)
+_VALUES_ROWS = re.compile(r"(\([^()]*\))(?:, \1)+")
+
+
+def normalize_sql(statement: str) -> str:
+    """Reduce a statement to its shape: literals and IN lists become placeholders."""
+    sql = _WHITESPACE.sub(" ", statement).strip()
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _VALUES_ROWS.sub(r"\1, ...", sql)
+
+
+class Histogram:
+    """Latency histogram over fixed buckets, safe to update from any thread."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000
+        index = bisect.bisect_left(BUCKETS_MS, ms)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += ms
+            if ms > self.max:
+                self.max = ms
+
+    def _quantile(self, counts: List[int], count: int, q: float) -> float:
+        # Upper bound of the bucket holding the quantile, capped by the observed max
+        rank = q * count
+        seen = 0
+        for index, bucket in enumerate(counts):
+            seen += bucket
+            if seen >= rank and bucket:
+                bound = BUCKETS_MS[index] if index < len(BUCKETS_MS) else self.max
+                return round(min(bound, self.max), 3)
+        return round(self.max, 3)
+
+    def snapshot(self) -> Tuple[List[int], int, float]:
+        """Per-bucket counts (the last is above every bound), count and total ms."""
+        with self._lock:
+            return list(self.counts), self.count, self.total
+
+    def summary(self) -> dict:
+        with self._lock:
+            counts, count, total, peak = list(self.counts), self.count, self.total, self.max
+        bounds = [str(bound) for bound in BUCKETS_MS] + ["+Inf"]
+        return {
+            "count": count,
+            "total_ms": round(total, 3),
+            "mean_ms": round(total / count, 3) if count else 0.0,
+            "max_ms": round(peak, 3),
+            "p50_ms": self._quantile(counts, count, 0.5),
+            "p95_ms": self._quantile(counts, count, 0.95),
+            "p99_ms": self._quantile(counts, count, 0.99),
+            "buckets": {bound: bucket for bound, bucket in zip(bounds, counts) if bucket},
+        }
+
+
+class _TimedCheckout:
+    """Pool mixin recording how long each checkout took to get a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_wait = Histogram()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.checkout_wait.observe(time.perf_counter() - started)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def _explain_prefix(dialect_name: str) -> Optional[str]:
+    if dialect_name == "sqlite":
+        return "EXPLAIN QUERY PLAN "
+    if dialect_name == "mysql":
+        return "EXPLAIN "
+    return None
+
+
+class SQLMetrics:
+    """Per-statement latency histograms, slow-query log and pool gauges.
+
+    ``instrument`` hooks an engine's cursor events. Every statement is timed
+    into a histogram keyed by its normalized SQL (at most ``max_statements``
+    shapes; later ones are counted under "<other>"). Statements slower than
+    ``slow_threshold_ms`` are logged and kept in a ring buffer together with
+    the EXPLAIN plan of SELECTs, taken at most once per EXPLAIN_INTERVAL per
+    statement shape on the connection that ran it.
+    """
+
+    OTHER = "<other>"
+
+    def __init__(self, slow_threshold_ms: float, max_statements: int, slow_log_size: int):
+        self.slow_threshold_ms = slow_threshold_ms
+        self.max_statements = max_statements
+        self._statements: Dict[str, Histogram] = {}
+        self._slow: Deque[dict] = deque(maxlen=slow_log_size)
+        self._explained: Dict[str, float] = {}
+        self._engines: Dict[str, Engine] = {}
+        self._shapes: Dict[str, str] = {}
+        self._listeners: List[Callable[[str, float], None]] = []
+        self._lock = threading.Lock()
+
+    def instrument(self, engine: Engine, name: str) -> None:
+        """Time every statement run by ``engine`` (the ``sync_engine`` of an async engine)."""
+        self._engines[name] = engine
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._make_after_execute(name))
+
+    @property
+    def engines(self) -> Dict[str, Engine]:
+        return dict(self._engines)
+
+    def totals(self) -> Tuple[int, float]:
+        """Statements run and their total time in ms, across every shape."""
+        with self._lock:
+            histograms = list(self._statements.values())
+        count = total = 0
+        for histogram in histograms:
+            count += histogram.count
+            total += histogram.total
+        return count, total
+
+    def add_statement_listener(self, callback: Callable[[str, float], None]) -> None:
+        """Register a callback that receives (normalized SQL, seconds) for every statement."""
+        self._listeners.append(callback)
+
+    def remove_statement_listener(self, callback: Callable[[str, float], None]) -> None:
+        self._listeners.remove(callback)
+
+    def shape(self, statement: str) -> str:
+        shape = self._shapes.get(statement)
+        if shape is None:
+            shape = normalize_sql(statement)
+            if len(self._shapes) >= 4 * self.max_statements:
+                self._shapes.clear()
+            self._shapes[statement] = shape
+        return shape
+
+    @staticmethod
+    def _before_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        # On the statement's own execution context, so a statement that raises
+        # (and never reaches after_cursor_execute) leaves nothing behind
+        context._sql_metrics_started = time.perf_counter()
+
+    def _make_after_execute(self, engine_name: str):
+        def after_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+            elapsed = time.perf_counter() - context._sql_metrics_started
+            shape = self.shape(statement)
+            histogram = self._statements.get(shape)
+            if histogram is None:
+                with self._lock:
+                    key = shape if len(self._statements) < self.max_statements else self.OTHER
+                    histogram = self._statements.setdefault(key, Histogram())
+            histogram.observe(elapsed)
+            for callback in self._listeners:
+                callback(shape, elapsed)
+            if elapsed * 1000 >= self.slow_threshold_ms:
+                self._record_slow(conn, engine_name, statement, shape, parameters, executemany, elapsed)
+
+        return after_execute
+
+    def _record_slow(self, conn, engine_name, statement, shape, parameters, executemany, elapsed) -> None:
+        duration_ms = round(elapsed * 1000, 3)
+        logger.warning("Slow query (%.1f ms on %s): %s", duration_ms, engine_name, shape[:MAX_LOGGED_SQL])
+        plan = None
+        if not executemany and shape.split(" ", 1)[0].upper() in ("SELECT", "WITH"):
+            now = time.monotonic()
+            with self._lock:
+                due = self._explained.get(shape, 0.0) <= now
+                if due:
+                    self._explained[shape] = now + EXPLAIN_INTERVAL
+            if due:
+                plan = self._explain(conn, statement, parameters)
+        self._slow.append({
+            "sql": shape[:MAX_LOGGED_SQL],
+            "duration_ms": duration_ms,
+            "engine": engine_name,
+            "at": datetime.now(timezone.utc),
+            "plan": plan,
+        })
+
+    @staticmethod
+    def _explain(conn, statement, parameters) -> Optional[List[dict]]:
+        prefix = _explain_prefix(conn.dialect.name)
+        if prefix is None:
+            return None
+        # A separate DBAPI cursor: the statement's own cursor may still hold rows,
+        # and no engine events fire for it
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except Exception as exc:
+            logger.info("Could not EXPLAIN slow query: %s", exc)
+            return None
+        finally:
+            cursor.close()
+
+    def pool_stats(self) -> List[dict]:
+        stats = []
+        for name, engine in self._engines.items():
+            pool = engine.pool
+            wait = getattr(pool, "checkout_wait", None)
+            stats.append({
+                "engine": name,
+                "pool": type(pool).__name__,
+                "size": pool.size() if hasattr(pool, "size") else None,
+                "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+                "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+                # QueuePool counts up from -pool_size until the pool is full
+                "overflow": max(pool.overflow(), 0) if hasattr(pool, "overflow") else None,
+                "checkout_wait": wait.summary() if wait is not None else None,
+            })
+        return stats
+
+    def report(self, limit: int, sort: str = "total_ms") -> dict:
+        with self._lock:
+            statements = list(self._statements.items())
+        rows = [dict(histogram.summary(), sql=sql) for sql, histogram in statements]
+        rows.sort(key=lambda row: row[sort], reverse=True)
+        return {
+            "slow_query_ms": self.slow_threshold_ms,
+            "statements": rows[:limit],
+            "slow_queries": list(reversed(self._slow)),
+            "pools": self.pool_stats(),
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._statements.clear()
+            self._slow.clear()
+            self._explained.clear()
+
+
+sql_metrics = SQLMetrics(
+    slow_threshold_ms=settings.SLOW_QUERY_MS,
+    max_statements=settings.SQL_METRICS_MAX_STATEMENTS,
+    slow_log_size=settings.SLOW_QUERY_LOG_SIZE,
+)
@@ -1 +1,24 @@
-# This file already exists - models init
+from sqlalchemy import Table, Column, Integer, ForeignKey
+from ..core.database import Base
+
+# Association tables
+post_categories = Table(
+    "post_categories",
+    Base.metadata,
+    Column("post_id", Integer, ForeignKey("posts.id"), primary_key=True),
+    Column("category_id", Integer, ForeignKey("categories.id"), primary_key=True),
+)
+
+post_tags = Table(
+    "post_tags",
+    Base.metadata,
+    Column("post_id", Integer, ForeignKey("posts.id"), primary_key=True),
+    Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True),
+)
+
+from .user import User, UserRole  # noqa: E402
+from .post import Post, PostStatus  # noqa: E402
+from .category import Category  # noqa: E402
+from .tag import Tag  # noqa: E402
+from .comment import Comment  # noqa: E402
+from .media import Media, MediaBlob, MediaVariant  # noqa: E402
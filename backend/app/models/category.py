@@ -9,6 +9,7 @@ class Category(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     name = Column(String(50), nullable=False, unique=True)
     slug = Column(String(50), unique=True, nullable=False, index=True)
+    post_count = Column(Integer, nullable=False, default=0)  # published posts only
     description = Column(Text, nullable=True)
 
     # Relationships
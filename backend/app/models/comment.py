@@ -1,17 +1,40 @@
-from sqlalchemy import Column, Integer, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..core.database import Base
 
+# Materialized path: one fixed-width base-36 segment per ancestor, e.g.
+# "0000001b/0000002f/". Fixed width keeps lexicographic order equal to
+# (depth-first, oldest-first) thread order.
+PATH_SEGMENT_WIDTH = 8
+PATH_MAX_LENGTH = 255
+MAX_COMMENT_DEPTH = PATH_MAX_LENGTH // (PATH_SEGMENT_WIDTH + 1)
+
+_BASE36 = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def path_segment(comment_id: int) -> str:
+    digits = ""
+    while comment_id:
+        comment_id, remainder = divmod(comment_id, 36)
+        digits = _BASE36[remainder] + digits
+    return digits.rjust(PATH_SEGMENT_WIDTH, "0") + "/"
+
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        # Subtree reads are a range scan on path within one post
+        Index("ix_comments_post_id_path", "post_id", "path"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     post_id = Column(Integer, ForeignKey("posts.id"), nullable=False, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
     content = Column(Text, nullable=False)
-    parent_id = Column(Integer, ForeignKey("comments.id"), nullable=True)
+    parent_id = Column(Integer, ForeignKey("comments.id"), nullable=True, index=True)
+    path = Column(String(PATH_MAX_LENGTH), nullable=False, default="")
+    depth = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..core.database import Base
@@ -12,11 +12,56 @@ class Media(Base):
     filepath = Column(String(255), nullable=False)
     mimetype = Column(String(100), nullable=False)
     size = Column(Integer, nullable=False)
+    checksum = Column(String(64), nullable=True, index=True)  # SHA-256 hex digest
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     # Relationships
     uploader = relationship("User", back_populates="media")
+    # Shared with every other upload of the same content
+    variants = relationship(
+        "MediaVariant",
+        primaryjoin="foreign(MediaVariant.digest) == Media.checksum",
+        viewonly=True,
+        order_by="(MediaVariant.format, MediaVariant.width)",
+    )
 
     def __repr__(self):
         return f"<Media(id={self.id}, filename={self.filename})>"
+
+
+class MediaBlob(Base):
+    """Content-addressed file shared by every Media row with the same digest."""
+
+    __tablename__ = "media_blobs"
+
+    digest = Column(String(64), primary_key=True)  # SHA-256 hex digest
+    size = Column(Integer, nullable=False)
+    refcount = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<MediaBlob(digest={self.digest}, refcount={self.refcount})>"
+
+
+class MediaVariant(Base):
+    """A resized, re-encoded derivative of an image, keyed by its content digest."""
+
+    __tablename__ = "media_variants"
+    __table_args__ = (
+        UniqueConstraint("digest", "width", "format", name="uq_media_variants_digest_width_format"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    digest = Column(String(64), nullable=False, index=True)  # SHA-256 hex digest of the source
+    width = Column(Integer, nullable=False)  # requested width; the image is never upscaled
+    rendered_width = Column(Integer, nullable=False)  # actual pixel width, below width for narrow originals
+    height = Column(Integer, nullable=False)
+    format = Column(String(10), nullable=False)
+    mimetype = Column(String(100), nullable=False)
+    filepath = Column(String(255), nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<MediaVariant(id={self.id}, digest={self.digest}, width={self.width}, format={self.format})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Enum, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..core.database import Base
@@ -12,6 +12,10 @@ class PostStatus(str, enum.Enum):
 
 class Post(Base):
     __tablename__ = "posts"
+    __table_args__ = (
+        # Serves the listing: status filter + keyset seek on (created_at, id)
+        Index("ix_posts_status_created_at_id", "status", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     title = Column(String(255), nullable=False)
@@ -22,6 +26,7 @@ class Post(Base):
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     cover_image = Column(String(255), nullable=True)
     view_count = Column(Integer, default=0)
+    comment_count = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
@@ -31,5 +36,13 @@ class Post(Base):
     tags = relationship("Tag", secondary="post_tags", back_populates="posts")
     comments = relationship("Comment", back_populates="post", cascade="all, delete-orphan")
 
+    @property
+    def category_ids(self):
+        return [category.id for category in self.categories]
+
+    @property
+    def tag_ids(self):
+        return [tag.id for tag in self.tags]
+
     def __repr__(self):
         return f"<Post(id={self.id}, title={self.title}, status={self.status})>"
@@ -0,0 +1,43 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+
+
+class TimingStats(BaseModel):
+    count: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    buckets: Dict[str, int]  # bucket upper bound in ms -> observations in that bucket
+
+
+class StatementStats(TimingStats):
+    sql: str
+
+
+class SlowQuery(BaseModel):
+    sql: str
+    duration_ms: float
+    engine: str
+    at: datetime
+    plan: Optional[List[Dict[str, Any]]] = None
+
+
+class PoolStats(BaseModel):
+    engine: str
+    pool: str
+    size: Optional[int] = None
+    checked_out: Optional[int] = None
+    checked_in: Optional[int] = None
+    overflow: Optional[int] = None
+    checkout_wait: Optional[TimingStats] = None
+
+
+class SQLMetricsResponse(BaseModel):
+    slow_query_ms: float
+    statements: List[StatementStats]
+    slow_queries: List[SlowQuery]
+    pools: List[PoolStats]
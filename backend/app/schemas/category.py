@@ -19,6 +19,16 @@ class CategoryUpdate(BaseModel):
 class CategoryResponse(CategoryBase):
     id: int
     slug: str
+    post_count: int = 0
+
+    class Config:
+        from_attributes = True
+
+
+class CategorySummary(BaseModel):
+    id: int
+    name: str
+    slug: str
 
     class Config:
         from_attributes = True
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -17,8 +17,18 @@ class CommentResponse(CommentBase):
     post_id: int
     user_id: Optional[int] = None
     parent_id: Optional[int] = None
+    depth: int = 0
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class CommentTreeResponse(CommentResponse):
+    replies: List["CommentTreeResponse"] = []
+
+
+class CommentSubtreeResponse(BaseModel):
+    items: List[CommentResponse]
+    next_cursor: Optional[str] = None
@@ -1,5 +1,33 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, computed_field
+from typing import Optional
 from datetime import datetime
+from app.core.config import settings
+
+
+def media_url(media_id: int, checksum: Optional[str] = None) -> str:
+    """Public URL of an original; content-addressed when the digest is known."""
+    if checksum:
+        return f"{settings.API_V1_PREFIX}/media/blobs/{checksum}"
+    return f"{settings.API_V1_PREFIX}/media/{media_id}/file"
+
+
+class MediaVariantResponse(BaseModel):
+    digest: str
+    width: int
+    rendered_width: int
+    height: int
+    format: str
+    mimetype: str
+    filepath: str
+    size: int
+
+    @computed_field
+    @property
+    def url(self) -> str:
+        return f"{settings.API_V1_PREFIX}/media/blobs/{self.digest}/variants/{self.width}/file?format={self.format}"
+
+    class Config:
+        from_attributes = True
 
 
 class MediaResponse(BaseModel):
@@ -8,15 +36,52 @@ class MediaResponse(BaseModel):
     filepath: str
     mimetype: str
     size: int
+    checksum: Optional[str] = None
     user_id: int
     created_at: datetime
+    variants: list[MediaVariantResponse] = []
+
+    @computed_field
+    @property
+    def url(self) -> str:
+        return media_url(self.id, self.checksum)
+
+    @computed_field
+    @property
+    def srcset(self) -> dict[str, str]:
+        """``srcset`` attribute value per variant format.
+
+        Descriptors use the rendered width: buckets wider than the original
+        all hold the same unscaled image, so only the first of them is listed.
+        """
+        candidates: dict[str, dict[int, str]] = {}
+        for variant in self.variants:
+            entries = candidates.setdefault(variant.format, {})
+            entries.setdefault(variant.rendered_width, f"{variant.url} {variant.rendered_width}w")
+        return {fmt: ", ".join(entries.values()) for fmt, entries in candidates.items()}
+
+    class Config:
+        from_attributes = True
+
+
+class MediaListItem(BaseModel):
+    """Media row in listings; every field is optional for ``fields=`` selection."""
+
+    id: Optional[int] = None
+    filename: Optional[str] = None
+    filepath: Optional[str] = None
+    mimetype: Optional[str] = None
+    size: Optional[int] = None
+    checksum: Optional[str] = None
+    user_id: Optional[int] = None
+    created_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
 
 class MediaListResponse(BaseModel):
-    items: list[MediaResponse]
+    items: list[MediaListItem]
     total: int
     page: int
     size: int
@@ -2,6 +2,9 @@ from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
 from app.models.post import PostStatus
+from app.schemas.category import CategorySummary
+from app.schemas.tag import TagSummary
+from app.schemas.user import UserSummary
 
 
 class PostBase(BaseModel):
@@ -22,8 +25,8 @@ class PostUpdate(BaseModel):
     content: Optional[str] = None
     status: Optional[PostStatus] = None
     excerpt: Optional[str] = None
-    category_ids: Optional[List[int]] = []
-    tag_ids: Optional[List[int]] = []
+    category_ids: Optional[List[int]] = None
+    tag_ids: Optional[List[int]] = None
 
 
 class PostResponse(PostBase):
@@ -32,16 +35,66 @@ class PostResponse(PostBase):
     author_id: int
     cover_image: Optional[str] = None
     view_count: int
+    comment_count: int = 0
     created_at: datetime
     updated_at: datetime
+    author: Optional[UserSummary] = None
+    categories: List[CategorySummary] = []
+    tags: List[TagSummary] = []
 
     class Config:
         from_attributes = True
 
 
-class PostListResponse(BaseModel):
-    items: List[PostResponse]
+class PostListItem(BaseModel):
+    """Post as shown in listings: metadata only unless fields= asks for content.
+
+    Every field is optional so that a ``fields=`` selection can omit it.
+    """
+
+    id: Optional[int] = None
+    title: Optional[str] = None
+    slug: Optional[str] = None
+    excerpt: Optional[str] = None
+    content: Optional[str] = None
+    status: Optional[PostStatus] = None
+    author_id: Optional[int] = None
+    cover_image: Optional[str] = None
+    view_count: Optional[int] = None
+    comment_count: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    author: Optional[UserSummary] = None
+    categories: Optional[List[CategorySummary]] = None
+    tags: Optional[List[TagSummary]] = None
+    category_ids: Optional[List[int]] = None
+    tag_ids: Optional[List[int]] = None
+
+    class Config:
+        from_attributes = True
+
+
+class PostSearchHit(BaseModel):
+    id: int
+    title: str
+    slug: str
+    excerpt: Optional[str] = None
+    created_at: datetime
+    score: float
+    snippet: str
+
+
+class PostSearchResponse(BaseModel):
+    items: List[PostSearchHit]
     total: int
     page: int
     size: int
-    pages: int
+
+
+class PostListResponse(BaseModel):
+    items: List[PostListItem]
+    total: Optional[int] = None
+    page: Optional[int] = None
+    size: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None
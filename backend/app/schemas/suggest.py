@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import List
+
+
+class SuggestionItem(BaseModel):
+    id: int
+    text: str
+    slug: str
+    popularity: int
+
+    class Config:
+        from_attributes = True
+
+
+class SuggestResponse(BaseModel):
+    tags: List[SuggestionItem] = []
+    categories: List[SuggestionItem] = []
+    posts: List[SuggestionItem] = []
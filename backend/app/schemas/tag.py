@@ -16,6 +16,16 @@ class TagUpdate(BaseModel):
 class TagResponse(TagBase):
     id: int
     slug: str
+    post_count: int = 0
+
+    class Config:
+        from_attributes = True
+
+
+class TagSummary(BaseModel):
+    id: int
+    name: str
+    slug: str
 
     class Config:
         from_attributes = True
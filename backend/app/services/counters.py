@@ -0,0 +1,95 @@
+from typing import Iterable, Set
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from app.models import Category, Comment, Post, PostStatus, Tag, post_categories, post_tags
+
+# Rows per statement when recomputing counters in bulk
+RECONCILE_BATCH_SIZE = 10000
+
+
+def adjust_comment_count(db: Session, post_id: int, delta: int) -> None:
+    """Add ``delta`` to posts.comment_count in the caller's transaction."""
+    if delta:
+        db.execute(
+            update(Post)
+            .where(Post.id == post_id)
+            # A counter change is not an edit: keep updated_at from its onupdate
+            .values(comment_count=Post.comment_count + delta, updated_at=Post.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def _adjust_post_counts(db: Session, model, ids: Iterable[int], delta: int) -> bool:
+    ids = list(ids)
+    if ids and delta:
+        db.execute(
+            update(model)
+            .where(model.id.in_(ids))
+            .values(post_count=model.post_count + delta)
+            .execution_options(synchronize_session=False)
+        )
+        return True
+    return False
+
+
+def sync_taxonomy_counts(
+    db: Session,
+    was_published: bool,
+    is_published: bool,
+    old_category_ids: Iterable[int],
+    new_category_ids: Iterable[int],
+    old_tag_ids: Iterable[int],
+    new_tag_ids: Iterable[int],
+) -> Set[type]:
+    """Update tag/category post counts after a post's status or taxonomy changed.
+
+    Counts only include published posts, so a post contributes to its old
+    taxonomy if it was published and to its new taxonomy if it is now.
+    Returns the models whose counts changed.
+    """
+    changed = set()
+    for model, old_ids, new_ids in (
+        (Category, old_category_ids, new_category_ids),
+        (Tag, old_tag_ids, new_tag_ids),
+    ):
+        before = set(old_ids) if was_published else set()
+        after = set(new_ids) if is_published else set()
+        removed = _adjust_post_counts(db, model, before - after, -1)
+        added = _adjust_post_counts(db, model, after - before, 1)
+        if removed or added:
+            changed.add(model)
+    return changed
+
+
+def _reconcile_in_batches(db: Session, model, value) -> None:
+    max_id = db.query(func.max(model.id)).scalar() or 0
+    for start in range(0, max_id + 1, RECONCILE_BATCH_SIZE):
+        db.execute(
+            update(model)
+            .where(model.id >= start, model.id < start + RECONCILE_BATCH_SIZE)
+            .values(**value)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+
+def reconcile_counts(db: Session) -> None:
+    """Recompute every denormalized counter from the source tables."""
+    _reconcile_in_batches(db, Post, {
+        "comment_count": select(func.count(Comment.id))
+        .where(Comment.post_id == Post.id)
+        .scalar_subquery(),
+        "updated_at": Post.updated_at,
+    })
+    _reconcile_in_batches(db, Category, {
+        "post_count": select(func.count(post_categories.c.post_id))
+        .join(Post, Post.id == post_categories.c.post_id)
+        .where(post_categories.c.category_id == Category.id, Post.status == PostStatus.PUBLISHED)
+        .scalar_subquery(),
+    })
+    _reconcile_in_batches(db, Tag, {
+        "post_count": select(func.count(post_tags.c.post_id))
+        .join(Post, Post.id == post_tags.c.post_id)
+        .where(post_tags.c.tag_id == Tag.id, Post.status == PostStatus.PUBLISHED)
+        .scalar_subquery(),
+    })
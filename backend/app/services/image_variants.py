@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import aiofiles.os
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image, ImageOps
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.media import Media, MediaVariant
+
+logger = logging.getLogger(__name__)
+
+VARIANT_MIME_TYPES = {
+    "webp": "image/webp",
+    "avif": "image/avif",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+}
+
+# EXIF orientations that swap width and height
+_ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+# Bump whenever render_variant changes its output for the same settings
+ENCODER_REVISION = 1
+
+
+def supported_formats(formats: Iterable[str]) -> List[str]:
+    """Keep only the formats this Pillow build can encode."""
+    extensions = Image.registered_extensions()
+    supported = []
+    for fmt in formats:
+        name = extensions.get(f".{fmt}")
+        if name in Image.SAVE and fmt in VARIANT_MIME_TYPES:
+            supported.append(fmt)
+        else:
+            logger.warning("Image variant format %r is not supported by Pillow, skipping", fmt)
+    return supported
+
+
+def render_variant(source: str, dest: str, width: int, fmt: str, quality: int) -> Tuple[int, int]:
+    """Resize ``source`` to at most ``width`` pixels wide and encode it as ``fmt``.
+
+    Runs in a worker process. ``thumbnail`` lets JPEG decoding downscale while
+    reading, and the file is written under a temporary name and renamed so a
+    half-written variant is never served. Returns ``(width, height, size)``
+    of the result, which is narrower than ``width`` for smaller originals.
+    """
+    with Image.open(source) as image:
+        # Bound the dimension that becomes the width once EXIF rotation is applied
+        if image.getexif().get(0x0112) in _ROTATED_ORIENTATIONS:
+            image.thumbnail((image.width, width))
+        else:
+            image.thumbnail((width, image.height))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        temp_path = f"{dest}.part"
+        image.save(temp_path, format=Image.registered_extensions()[f".{fmt}"], quality=quality)
+        os.replace(temp_path, dest)
+        return image.width, image.height, os.path.getsize(dest)
+
+
+class VariantPipeline:
+    """Produces resized WebP/AVIF derivatives of uploaded images.
+
+    Variants are keyed by the content digest, so uploads that share a blob
+    share one variant set. Encoding is CPU-bound, so it runs in a process
+    pool rather than on the event loop, and the bookkeeping queries run in
+    the threadpool. Uploads schedule every configured width and format in
+    the background; any variant that is missing (not generated yet, or its
+    file was removed from the disk cache) is rendered on first request.
+    Concurrent requests for the same variant share one render. Changing the
+    quality (or ``ENCODER_REVISION``) moves variants to new file names, so
+    each is re-rendered on its next request and gets a new ETag.
+    """
+
+    def __init__(self, widths: Iterable[int], formats: Iterable[str], quality: int, workers: int):
+        self.widths = sorted(set(widths))
+        self.formats = supported_formats(formats)
+        self.quality = quality
+        self.workers = workers
+        # Part of every variant's file name and ETag, so new settings mean new bytes and validators
+        self.encoding = f"r{ENCODER_REVISION}q{quality}"
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[Tuple[str, int, str], asyncio.Future] = {}
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that runs threads (view counter, hasher pool) is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    @staticmethod
+    def variant_dir(digest: str) -> Path:
+        # Sharded like the blobs themselves
+        return Path(settings.UPLOAD_DIR) / "variants" / digest[:2] / digest[2:4] / digest
+
+    def variant_path(self, digest: str, width: int, fmt: str) -> Path:
+        return self.variant_dir(digest) / f"{width}.{self.encoding}.{fmt}"
+
+    def etag(self, variant: MediaVariant) -> str:
+        return f'"{variant.digest}-{variant.width}.{self.encoding}.{variant.format}"'
+
+    async def _render(self, digest: str, source: str, width: int, fmt: str) -> Tuple[str, int, int, int]:
+        key = (digest, width, fmt)
+        dest = str(self.variant_path(digest, width, fmt))
+        future = self._inflight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._pool(), render_variant, source, dest, width, fmt, self.quality)
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        rendered_width, height, size = await asyncio.shield(future)
+        return dest, rendered_width, height, size
+
+    @staticmethod
+    def _source(db: Session, media_id: int):
+        return db.query(Media.checksum, Media.filepath).filter(Media.id == media_id).first()
+
+    @staticmethod
+    def _find(db: Session, digest: str, width: int, fmt: str) -> Optional[MediaVariant]:
+        return (
+            db.query(MediaVariant)
+            .filter(MediaVariant.digest == digest, MediaVariant.width == width, MediaVariant.format == fmt)
+            .first()
+        )
+
+    def _record(
+        self, db: Session, digest: str, width: int, fmt: str, filepath: str, rendered_width: int, height: int, size: int
+    ) -> MediaVariant:
+        variant = self._find(db, digest, width, fmt)
+        if variant is None:
+            variant = MediaVariant(digest=digest, width=width, format=fmt, mimetype=VARIANT_MIME_TYPES[fmt])
+            db.add(variant)
+        variant.rendered_width = rendered_width
+        variant.height = height
+        variant.filepath = filepath
+        variant.size = size
+        try:
+            db.commit()
+            # Loaded here so callers on the event loop never trigger a refresh
+            db.refresh(variant)
+        except IntegrityError:
+            # Another worker recorded the same variant first; theirs points at the same file
+            db.rollback()
+            variant = self._find(db, digest, width, fmt)
+        return variant
+
+    async def get_variant(self, db: Session, media: Media, width: int, fmt: str) -> MediaVariant:
+        """Return the variant of ``media``'s content, rendering it first if it is not on disk.
+
+        A variant rendered with other encoder settings is rendered again.
+        """
+        variant = await run_in_threadpool(self._find, db, media.checksum, width, fmt)
+        if (
+            variant is not None
+            and variant.filepath == str(self.variant_path(media.checksum, width, fmt))
+            and await aiofiles.os.path.exists(variant.filepath)
+        ):
+            return variant
+        rendered = await self._render(media.checksum, media.filepath, width, fmt)
+        return await run_in_threadpool(self._record, db, media.checksum, width, fmt, *rendered)
+
+    async def generate_all(self, media_id: int) -> None:
+        """Render every configured width and format; run after the upload response."""
+        db = SessionLocal()
+        try:
+            row = await run_in_threadpool(self._source, db, media_id)
+            if row is None or row.checksum is None:
+                return
+            jobs = [(width, fmt) for fmt in self.formats for width in self.widths]
+            results = await asyncio.gather(
+                *(self._render(row.checksum, row.filepath, width, fmt) for width, fmt in jobs),
+                return_exceptions=True,
+            )
+            for (width, fmt), result in zip(jobs, results):
+                if isinstance(result, BaseException):
+                    logger.error("Failed to render %s@%d for media %d: %s", fmt, width, media_id, result)
+                    continue
+                await run_in_threadpool(self._record, db, row.checksum, width, fmt, *result)
+        finally:
+            await run_in_threadpool(db.close)
+
+    def remove_variants(self, db: Session, digest: str) -> None:
+        """Delete the variants of ``digest`` once no media has that content any more."""
+        if db.query(Media.id).filter(Media.checksum == digest).first() is not None:
+            return
+        db.query(MediaVariant).filter(MediaVariant.digest == digest).delete(synchronize_session=False)
+        db.commit()
+        shutil.rmtree(self.variant_dir(digest), ignore_errors=True)
+
+
+variant_pipeline = VariantPipeline(
+    widths=settings.MEDIA_VARIANT_WIDTHS,
+    formats=settings.MEDIA_VARIANT_FORMATS,
+    quality=settings.MEDIA_VARIANT_QUALITY,
+    workers=settings.MEDIA_VARIANT_WORKERS,
+)
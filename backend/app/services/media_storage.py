@@ -0,0 +1,276 @@
+import hashlib
+import logging
+import os
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.media import Media, MediaBlob
+
+logger = logging.getLogger(__name__)
+
+# Read size for streaming uploads to disk
+CHUNK_SIZE = 64 * 1024
+
+# Media rows per commit when moving pre-existing files into blobs
+MIGRATE_BATCH_SIZE = 500
+
+# Leading bytes of each accepted format; WebP is a RIFF container, checked separately
+MAGIC_NUMBERS = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+# Allowed MIME types
+ALLOWED_MIME_TYPES = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/gif": "gif",
+    "image/webp": "webp",
+}
+
+
+@dataclass
+class StoredUpload:
+    temp_path: Path
+    mimetype: str
+    size: int
+    checksum: str
+
+
+def sniff_mimetype(head: bytes) -> Optional[str]:
+    """Identify an image from its first bytes, ignoring the client's Content-Type."""
+    for magic, mimetype in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return mimetype
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def blob_path(digest: str) -> Path:
+    """Location of a blob: two levels of 256-way sharding keep directories small."""
+    return Path(settings.UPLOAD_DIR) / "blobs" / digest[:2] / digest[2:4] / digest
+
+
+def temp_dir() -> Path:
+    # Inside UPLOAD_DIR so the final rename never crosses filesystems
+    return Path(settings.UPLOAD_DIR) / "tmp"
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File size exceeds maximum allowed size of {settings.MAX_UPLOAD_SIZE} bytes",
+    )
+
+
+async def store_upload(file: UploadFile) -> StoredUpload:
+    """Stream an upload to a temporary file without buffering it in memory.
+
+    The size and SHA-256 are tracked chunk by chunk and the type is taken from
+    the first chunk's magic bytes. Raises 413/415 and removes the partial file
+    on rejection; on success the caller hands the result to ``acquire_blob``.
+    """
+    if file.size is not None and file.size > settings.MAX_UPLOAD_SIZE:
+        raise _too_large()
+
+    await aiofiles.os.makedirs(temp_dir(), exist_ok=True)
+
+    temp_path = temp_dir() / f"{uuid.uuid4().hex}.part"
+    digest = hashlib.sha256()
+    size = 0
+    mimetype = None
+
+    try:
+        async with aiofiles.open(temp_path, "wb") as out:
+            while chunk := await file.read(CHUNK_SIZE):
+                if mimetype is None:
+                    mimetype = sniff_mimetype(chunk)
+                    if mimetype is None:
+                        raise HTTPException(
+                            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                            detail=f"Unsupported file type. Allowed types: {', '.join(ALLOWED_MIME_TYPES.keys())}",
+                        )
+                size += len(chunk)
+                if size > settings.MAX_UPLOAD_SIZE:
+                    raise _too_large()
+                digest.update(chunk)
+                await out.write(chunk)
+
+        if mimetype is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Empty file",
+            )
+    except BaseException:
+        await discard_temp(temp_path)
+        raise
+
+    return StoredUpload(temp_path=temp_path, mimetype=mimetype, size=size, checksum=digest.hexdigest())
+
+
+async def discard_temp(temp_path: Path) -> None:
+    try:
+        await aiofiles.os.remove(temp_path)
+    except FileNotFoundError:
+        pass
+
+
+def _increment_refcount(db: Session, digest: str) -> bool:
+    result = db.execute(
+        update(MediaBlob)
+        .where(MediaBlob.digest == digest)
+        .values(refcount=MediaBlob.refcount + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount > 0
+
+
+def _take_reference(db: Session, digest: str, size: int) -> None:
+    if not _increment_refcount(db, digest):
+        try:
+            with db.begin_nested():
+                db.add(MediaBlob(digest=digest, size=size, refcount=1))
+        except IntegrityError:
+            # Another upload of the same content created the row first
+            _increment_refcount(db, digest)
+
+
+async def acquire_blob(db: Session, digest: str, size: int, source: Path) -> Path:
+    """Take a reference on blob ``digest`` and make sure its file exists.
+
+    ``source`` is moved into place if the blob is not on disk yet and removed
+    otherwise. Runs in the caller's transaction: the refcount row stays locked
+    until commit, so a concurrent ``release_blob`` cannot give up the file in
+    between. The statements run in the threadpool, the file moves through
+    aiofiles.
+    """
+    await run_in_threadpool(_take_reference, db, digest, size)
+
+    path = blob_path(digest)
+    if await aiofiles.os.path.exists(path):
+        await discard_temp(source)
+    else:
+        await aiofiles.os.makedirs(path.parent, exist_ok=True)
+        await aiofiles.os.replace(source, path)
+    return path
+
+
+def adopt_file(db: Session, digest: str, size: int, source: Path) -> Path:
+    """Blocking ``acquire_blob`` for scripts, which have no event loop to spare."""
+    _take_reference(db, digest, size)
+
+    path = blob_path(digest)
+    if path.exists():
+        source.unlink()
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(source, path)
+    return path
+
+
+def release_blob(db: Session, media: Media) -> Optional[Path]:
+    """Drop ``media``'s reference on its blob.
+
+    Returns the file to delete once the transaction commits, if this was the
+    last reference; the caller passes it to ``remove_released`` after
+    ``db.commit()``. Unlinking before the commit would lose the file if the
+    transaction then rolled back. Rows stored before content addressing have
+    no blob and own their file.
+    """
+    path = Path(media.filepath)
+    if media.checksum is None or path != blob_path(media.checksum):
+        return path
+
+    db.execute(
+        update(MediaBlob)
+        .where(MediaBlob.digest == media.checksum)
+        .values(refcount=MediaBlob.refcount - 1)
+        .execution_options(synchronize_session=False)
+    )
+    removed = db.execute(
+        delete(MediaBlob)
+        .where(MediaBlob.digest == media.checksum, MediaBlob.refcount <= 0)
+        .execution_options(synchronize_session=False)
+    )
+    return path if removed.rowcount else None
+
+
+def remove_released(db: Session, path: Path) -> None:
+    """Unlink a file given up by ``release_blob``, after its commit.
+
+    An upload of the same content may have recreated the blob since and found
+    the file still on disk, so the row is checked first. Locking the row, or
+    the gap where it would be, holds that upload back until the file is gone.
+    """
+    digest = path.name
+    if path == blob_path(digest):
+        recreated = db.query(MediaBlob.digest).filter(MediaBlob.digest == digest).with_for_update().first()
+        if recreated:
+            db.commit()
+            return
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        logger.warning("File %s was already missing on disk", path)
+    db.commit()
+
+
+def hash_file(path: Path) -> Tuple[str, int]:
+    """SHA-256 hex digest and size of a file, read in chunks."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def migrate_to_blobs(db: Session, batch_size: int = MIGRATE_BATCH_SIZE) -> Tuple[int, int]:
+    """Rehash files stored before content addressing and move them into blobs.
+
+    Walks media by id in batches of ``batch_size``, committing after each, so
+    it can be interrupted and rerun; rows already pointing at their blob are
+    skipped. Duplicate files collapse into one blob. Returns the number of
+    rows migrated and the number whose file is missing.
+    """
+    migrated = missing = 0
+    last_id = 0
+    while True:
+        batch = (
+            db.query(Media)
+            .filter(Media.id > last_id)
+            .order_by(Media.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        for media in batch:
+            path = Path(media.filepath)
+            if media.checksum is not None and path == blob_path(media.checksum):
+                continue
+            if not path.exists():
+                logger.warning("Media %d: file %s is missing, skipping", media.id, path)
+                missing += 1
+                continue
+            digest, size = hash_file(path)
+            media.filepath = str(adopt_file(db, digest, size, path))
+            media.checksum = digest
+            media.size = size
+            migrated += 1
+        db.commit()
+        last_id = batch[-1].id
+    return migrated, missing
@@ -0,0 +1,86 @@
+import json
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.cache import build_cache
+from app.core.config import settings
+from app.models import Post, post_categories, post_tags
+from app.schemas.post import PostResponse
+from app.services.view_counter import view_counter
+
+# Serialized PostResponse bodies are stored under "id:<id>"; "slug:<slug>"
+# entries only point at the id, so invalidating a post by id covers both.
+post_cache = build_cache(
+    settings.CACHE_BACKEND,
+    max_size=settings.POST_CACHE_MAX_SIZE,
+    ttl=settings.POST_CACHE_TTL,
+    url=settings.CACHE_URL,
+    prefix="myblog:post:",
+)
+
+
+def _id_key(post_id: int) -> str:
+    return f"id:{post_id}"
+
+
+def _slug_key(slug: str) -> str:
+    return f"slug:{slug}"
+
+
+def get_cached_post(post_id: Optional[int] = None, slug: Optional[str] = None) -> Optional[dict]:
+    """Return the cached post body as a dict, looked up by id or slug."""
+    if post_id is None:
+        cached_id = post_cache.get(_slug_key(slug))
+        if cached_id is None:
+            return None
+        post_id = int(cached_id)
+    body = post_cache.get(_id_key(post_id))
+    return json.loads(body) if body is not None else None
+
+
+def cache_post(response: PostResponse) -> dict:
+    """Store the serialized post and its slug pointer and return it as a dict."""
+    data = response.model_dump(mode="json")
+    post_cache.set(_id_key(response.id), json.dumps(data))
+    post_cache.set(_slug_key(response.slug), str(response.id))
+    return data
+
+
+def invalidate_post(post_id: int, *slugs: str) -> None:
+    keys = (_id_key(post_id), *(_slug_key(slug) for slug in slugs if slug))
+    post_cache.delete(*keys)
+
+
+def _invalidate_post_ids(post_ids: Iterable[int]) -> None:
+    post_cache.delete(*(_id_key(post_id) for post_id in post_ids))
+
+
+# Cached bodies embed view_count, so refresh them once new counts are written
+view_counter.add_flush_listener(_invalidate_post_ids)
+
+
+def invalidate_posts(posts: Iterable[Tuple[int, str]]) -> None:
+    """Invalidate ``(id, slug)`` pairs; call after the commit that changed them."""
+    for post_id, slug in posts:
+        invalidate_post(post_id, slug)
+
+
+# Posts whose cached body embeds a tag or category. Read them before a delete
+# commits (the association rows go with it) and invalidate after the commit,
+# so a concurrent read cannot cache the old body again in between.
+
+def posts_for_tag(db: Session, tag_id: int) -> List[Tuple[int, str]]:
+    return (
+        db.query(Post.id, Post.slug)
+        .join(post_tags, post_tags.c.post_id == Post.id)
+        .filter(post_tags.c.tag_id == tag_id)
+        .all()
+    )
+
+
+def posts_for_category(db: Session, category_id: int) -> List[Tuple[int, str]]:
+    return (
+        db.query(Post.id, Post.slug)
+        .join(post_categories, post_categories.c.post_id == Post.id)
+        .filter(post_categories.c.category_id == category_id)
+        .all()
+    )
@@ -0,0 +1,243 @@
+import html
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session, load_only
+from app.core.config import settings
+from app.core.query_budget import untracked_queries
+from app.models.post import Post, PostStatus
+
+# Latin words/numbers, or runs of CJK characters (indexed as bigrams)
+TOKEN_RE = re.compile(r"[0-9a-z]+|[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+CJK_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]")
+
+# Relative weight of each indexed field when computing term frequency
+FIELD_WEIGHTS = {"title": 3.0, "excerpt": 2.0, "content": 1.0}
+
+SNIPPET_LENGTH = 160
+
+
+def tokenize(value: Optional[str]) -> List[str]:
+    """Split text into index terms. CJK runs become overlapping bigrams."""
+    if not value:
+        return []
+    tokens = []
+    for match in TOKEN_RE.finditer(value.lower()):
+        token = match.group()
+        if CJK_RE.match(token) and len(token) > 1:
+            tokens.extend(token[i:i + 2] for i in range(len(token) - 1))
+        else:
+            tokens.append(token)
+    return tokens
+
+
+def highlight(value: Optional[str], query: str, length: int = SNIPPET_LENGTH) -> str:
+    """Return an HTML-escaped snippet around the first match with terms in <mark>."""
+    if not value:
+        return ""
+    terms = sorted({term for term in tokenize(query)}, key=len, reverse=True)
+    if not terms:
+        return html.escape(value[:length])
+
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+    first = pattern.search(value)
+    start = max(0, first.start() - length // 4) if first else 0
+    window = value[start:start + length]
+
+    parts = []
+    position = 0
+    for match in pattern.finditer(window):
+        parts.append(html.escape(window[position:match.start()]))
+        parts.append(f"<mark>{html.escape(match.group())}</mark>")
+        position = match.end()
+    parts.append(html.escape(window[position:]))
+
+    snippet = "".join(parts)
+    if start > 0:
+        snippet = "…" + snippet
+    if start + length < len(value):
+        snippet += "…"
+    return snippet
+
+
+@dataclass
+class SearchHit:
+    post: Post
+    score: float
+
+
+class SearchIndex:
+    """Full-text index over post title, excerpt and content."""
+
+    def index_post(self, post: Post) -> None:
+        raise NotImplementedError
+
+    def remove_post(self, post_id: int) -> None:
+        raise NotImplementedError
+
+    def search(self, db: Session, query: str, limit: int, offset: int = 0) -> Tuple[List[SearchHit], int]:
+        """Return one page of published posts ranked by relevance and the total hit count."""
+        raise NotImplementedError
+
+
+class InMemorySearchIndex(SearchIndex):
+    """In-process inverted index ranked with BM25, for SQLite and development.
+
+    Built from the database on first search and then kept current by the post
+    handlers. Each process holds its own copy, so use the MySQL index when
+    running several workers.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # term -> post_id -> field-weighted term frequency
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._doc_terms: Dict[int, Dict[str, float]] = {}
+        self._doc_lengths: Dict[int, float] = {}
+        self._total_length = 0.0
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def _add(self, post_id: int, title: str, excerpt: Optional[str], content: str) -> None:
+        frequencies: Dict[str, float] = defaultdict(float)
+        length = 0.0
+        for field, value in (("title", title), ("excerpt", excerpt), ("content", content)):
+            weight = FIELD_WEIGHTS[field]
+            for term, count in Counter(tokenize(value)).items():
+                frequencies[term] += weight * count
+                length += weight * count
+
+        self._remove(post_id)
+        for term, frequency in frequencies.items():
+            self._postings[term][post_id] = frequency
+        self._doc_terms[post_id] = dict(frequencies)
+        self._doc_lengths[post_id] = length
+        self._total_length += length
+
+    def _remove(self, post_id: int) -> None:
+        terms = self._doc_terms.pop(post_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(post_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(post_id)
+
+    def _ensure_loaded(self, db: Session) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            with untracked_queries():
+                posts = (
+                    db.query(Post)
+                    .options(load_only(Post.id, Post.title, Post.excerpt, Post.content))
+                    .filter(Post.status == PostStatus.PUBLISHED)
+                    .yield_per(500)
+                )
+                for post in posts:
+                    self._add(post.id, post.title, post.excerpt, post.content)
+            self._loaded = True
+
+    def index_post(self, post: Post) -> None:
+        with self._lock:
+            if post.status == PostStatus.PUBLISHED:
+                self._add(post.id, post.title, post.excerpt, post.content)
+            else:
+                self._remove(post.id)
+
+    def remove_post(self, post_id: int) -> None:
+        with self._lock:
+            self._remove(post_id)
+
+    def _rank(self, query: str) -> List[Tuple[int, float]]:
+        terms = set(tokenize(query))
+        with self._lock:
+            doc_count = len(self._doc_lengths)
+            if not doc_count or not terms:
+                return []
+            average_length = self._total_length / doc_count or 1.0
+            scores: Dict[int, float] = defaultdict(float)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for post_id, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[post_id] / average_length)
+                    scores[post_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+
+    def search(self, db: Session, query: str, limit: int, offset: int = 0) -> Tuple[List[SearchHit], int]:
+        self._ensure_loaded(db)
+        ranked = self._rank(query)
+        page = ranked[offset:offset + limit]
+        if not page:
+            return [], len(ranked)
+
+        posts = {
+            post.id: post
+            for post in db.query(Post).filter(Post.id.in_([post_id for post_id, _ in page]))
+        }
+        hits = [SearchHit(post=posts[post_id], score=score) for post_id, score in page if post_id in posts]
+        return hits, len(ranked)
+
+
+class MySQLFullTextSearchIndex(SearchIndex):
+    """Search backed by the ``ft_posts_search`` FULLTEXT index (ngram parser).
+
+    MySQL keeps the index current on every write, so the incremental hooks
+    are no-ops. Ranking uses InnoDB's natural-language relevance score.
+    """
+
+    MATCH = "MATCH (posts.title, posts.excerpt, posts.content) AGAINST (:q IN NATURAL LANGUAGE MODE)"
+
+    def index_post(self, post: Post) -> None:
+        pass
+
+    def remove_post(self, post_id: int) -> None:
+        pass
+
+    def search(self, db: Session, query: str, limit: int, offset: int = 0) -> Tuple[List[SearchHit], int]:
+        params = {"q": query, "status": PostStatus.PUBLISHED.name, "limit": limit, "offset": offset}
+        total = db.execute(
+            text(f"SELECT COUNT(*) FROM posts WHERE status = :status AND {self.MATCH}"),
+            params,
+        ).scalar()
+        rows = db.execute(
+            text(
+                f"SELECT posts.id, {self.MATCH} AS score FROM posts "
+                f"WHERE posts.status = :status AND {self.MATCH} "
+                "ORDER BY score DESC, posts.id DESC LIMIT :limit OFFSET :offset"
+            ),
+            params,
+        ).all()
+        if not rows:
+            return [], total
+
+        posts = {post.id: post for post in db.query(Post).filter(Post.id.in_([row.id for row in rows]))}
+        hits = [SearchHit(post=posts[row.id], score=float(row.score)) for row in rows if row.id in posts]
+        return hits, total
+
+
+def build_search_index(backend: str, database_url: str) -> SearchIndex:
+    """Create the index configured by SEARCH_BACKEND ("auto", "mysql" or "memory")."""
+    if backend == "auto":
+        backend = "mysql" if database_url.startswith("mysql") else "memory"
+    if backend == "mysql":
+        return MySQLFullTextSearchIndex()
+    if backend == "memory":
+        return InMemorySearchIndex()
+    raise ValueError(f"Unknown search backend: {backend}")
+
+
+search_index = build_search_index(settings.SEARCH_BACKEND, settings.DATABASE_URL)
@@ -0,0 +1,351 @@
+import bisect
+import heapq
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from itertools import chain, islice
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.core.query_budget import untracked_queries
+from app.models.post import Post, PostStatus
+from app.services.search import tokenize
+from app.services.taxonomy import TaxonomyCache, category_cache, tag_cache
+from app.services.view_counter import view_counter
+
+# Most suggestions returned per kind
+MAX_SUGGESTIONS = 10
+
+# Word prefixes up to this many characters keep a precomputed top list
+TOP_PREFIX_LENGTH = 3
+
+# In a multi-word query, a typed prefix matching at most this many words
+# whose postings total under FILTER_LIMIT is resolved from its own postings
+NARROW_PREFIX_WORDS = 256
+FILTER_LIMIT = 2000
+
+# Entries examined for a multi-word query before giving up
+SCAN_LIMIT = 500
+
+# An entry's distinct words, space-delimited (" a b c "), so a scan tests an
+# entry for a word or a word prefix with a single substring search
+Words = str
+
+# (-popularity, id, words): ascending order is most popular first, and
+# scans can test an entry's words without looking the entry up
+Key = Tuple[int, int, Words]
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    id: int
+    text: str
+    slug: str
+    popularity: int
+
+
+def _prefixes(words: Iterable[str]) -> Set[str]:
+    return {word[:length] for word in words for length in range(1, min(len(word), TOP_PREFIX_LENGTH) + 1)}
+
+
+def _words(text: str) -> Words:
+    return f" {' '.join(sorted(set(tokenize(text))))} "
+
+
+def _containing(keys: Iterable[Key], needles: List[str]) -> Iterator[Key]:
+    if not needles:
+        return iter(keys)
+    if len(needles) == 1:
+        needle = needles[0]
+        return (key for key in keys if needle in key[2])
+    return (key for key in keys if all(needle in key[2] for needle in needles))
+
+
+def _upper_bound(prefix: str) -> str:
+    """Smallest string greater than every string starting with ``prefix``."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class PrefixIndex:
+    """Word-prefix index over short texts, ranked by popularity.
+
+    Entries are indexed under their words (the full-text tokenizer, so CJK
+    text becomes bigrams). Each word's posting list is sorted by popularity,
+    and every prefix of up to ``TOP_PREFIX_LENGTH`` characters keeps its top
+    ``MAX_SUGGESTIONS`` entries. The short, broad prefixes typed first are a
+    dict lookup; longer ones merge the heads of a few posting lists.
+    Multi-word queries filter the postings of a narrow typed prefix, or walk
+    the rarest complete word's list in popularity order until ``limit``
+    entries match.
+    """
+
+    def __init__(self):
+        self._entries: Dict[int, Tuple[Suggestion, Words]] = {}
+        self._postings: Dict[str, List[Key]] = {}
+        self._vocabulary: List[str] = []
+        self._top: Dict[str, List[Key]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, entry_id: int) -> bool:
+        return entry_id in self._entries
+
+    def ids(self) -> List[int]:
+        return list(self._entries)
+
+    def load(self, items: Iterable[Tuple[int, str, str, int]]) -> None:
+        """Replace the contents with ``(id, text, slug, popularity)`` items."""
+        entries = {}
+        postings: Dict[str, List[Key]] = defaultdict(list)
+        for entry_id, text, slug, popularity in items:
+            words = _words(text)
+            entries[entry_id] = (Suggestion(entry_id, text, slug, popularity), words)
+            for word in words.split():
+                postings[word].append((-popularity, entry_id, words))
+        for keys in postings.values():
+            keys.sort()
+
+        top: Dict[str, List[Key]] = defaultdict(list)
+        for key in sorted((-s.popularity, s.id, words) for s, words in entries.values()):
+            for prefix in _prefixes(key[2].split()):
+                keys = top[prefix]
+                if len(keys) < MAX_SUGGESTIONS:
+                    keys.append(key)
+
+        with self._lock:
+            self._entries = entries
+            self._postings = dict(postings)
+            self._vocabulary = sorted(postings)
+            self._top = dict(top)
+
+    def upsert(self, entry_id: int, text: str, slug: str, popularity: int) -> None:
+        words = _words(text)
+        suggestion = Suggestion(entry_id, text, slug, popularity)
+        with self._lock:
+            current = self._entries.get(entry_id)
+            if current is not None:
+                old, old_words = current
+                if old_words == words and popularity >= old.popularity:
+                    self._promote(entry_id, old.popularity, popularity, words)
+                    self._entries[entry_id] = (suggestion, words)
+                    return
+                self._remove(entry_id)
+            self._add(suggestion, words)
+
+    def set_popularity(self, entry_id: int, popularity: int) -> None:
+        with self._lock:
+            current = self._entries.get(entry_id)
+            if current is not None and current[0].popularity != popularity:
+                self.upsert(entry_id, current[0].text, current[0].slug, popularity)
+
+    def remove(self, entry_id: int) -> None:
+        with self._lock:
+            if entry_id in self._entries:
+                self._remove(entry_id)
+
+    def _add(self, suggestion: Suggestion, words: Words) -> None:
+        key = (-suggestion.popularity, suggestion.id, words)
+        self._entries[suggestion.id] = (suggestion, words)
+        for word in words.split():
+            keys = self._postings.get(word)
+            if keys is None:
+                keys = self._postings[word] = []
+                bisect.insort(self._vocabulary, word)
+            bisect.insort(keys, key)
+        for prefix in _prefixes(words.split()):
+            keys = self._top.setdefault(prefix, [])
+            if len(keys) < MAX_SUGGESTIONS or key < keys[-1]:
+                bisect.insort(keys, key)
+                del keys[MAX_SUGGESTIONS:]
+
+    def _remove(self, entry_id: int) -> None:
+        suggestion, words = self._entries.pop(entry_id)
+        key = (-suggestion.popularity, entry_id, words)
+        for word in words.split():
+            keys = self._postings[word]
+            del keys[bisect.bisect_left(keys, key)]
+            if not keys:
+                del self._postings[word]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, word)]
+        for prefix in _prefixes(words.split()):
+            keys = self._top.get(prefix)
+            if keys and key in keys:
+                # Refill the freed slot from the posting lists
+                keys = self._collect(prefix, MAX_SUGGESTIONS)
+                if keys:
+                    self._top[prefix] = keys
+                else:
+                    del self._top[prefix]
+
+    def _promote(self, entry_id: int, old: int, new: int, words: Words) -> None:
+        """Raise an entry's popularity; it can only move up, so no list needs refilling."""
+        old_key, new_key = (-old, entry_id, words), (-new, entry_id, words)
+        if old_key == new_key:
+            return
+        for word in words.split():
+            keys = self._postings[word]
+            del keys[bisect.bisect_left(keys, old_key)]
+            bisect.insort(keys, new_key)
+        for prefix in _prefixes(words.split()):
+            keys = self._top.setdefault(prefix, [])
+            if old_key in keys:
+                keys.remove(old_key)
+                bisect.insort(keys, new_key)
+            elif len(keys) < MAX_SUGGESTIONS or new_key < keys[-1]:
+                bisect.insort(keys, new_key)
+                del keys[MAX_SUGGESTIONS:]
+
+    def _word_range(self, prefix: str) -> Tuple[int, int]:
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        return start, bisect.bisect_left(self._vocabulary, _upper_bound(prefix), start)
+
+    def _collect(self, prefix: str, limit: int) -> List[Key]:
+        """Most popular distinct entries having a word that starts with ``prefix``."""
+        # A list's first ``limit`` keys always contain its share of the overall top ``limit``
+        start, end = self._word_range(prefix)
+        heads = [self._postings[word][:limit] for word in self._vocabulary[start:end]]
+        keys: List[Key] = []
+        seen = set()
+        for key in heapq.merge(*heads):
+            if key[1] not in seen:
+                seen.add(key[1])
+                keys.append(key)
+                if len(keys) == limit:
+                    break
+        return keys
+
+    def _match_all(self, complete: List[str], prefix: Optional[str], limit: int) -> List[Key]:
+        """Most popular entries with every word of ``complete`` and one starting with ``prefix``."""
+        if not all(word in self._postings for word in complete):
+            return []
+        rarest = min(complete, key=lambda word: len(self._postings[word]))
+        source = self._postings[rarest]
+        # Substrings each scanned entry's words must contain
+        needles = [f" {word} " for word in complete if word != rarest]
+        if prefix is not None:
+            start, end = self._word_range(prefix)
+            if start == end:
+                return []
+            if end - start <= NARROW_PREFIX_WORDS:
+                heads = [self._postings[word] for word in self._vocabulary[start:end]]
+                if sum(map(len, heads)) < min(len(source), FILTER_LIMIT):
+                    # The typed prefix is rarer than any complete word: filter all of its postings
+                    needles = [f" {word} " for word in complete]
+                    matches = {key[1]: key for key in _containing(chain.from_iterable(heads), needles)}
+                    return heapq.nsmallest(limit, matches.values())
+            needles.append(f" {prefix}")
+        return list(islice(_containing(islice(source, SCAN_LIMIT), needles), limit))
+
+    def suggest(self, query: str, limit: int = MAX_SUGGESTIONS) -> List[Suggestion]:
+        """Entries matching every complete word of ``query`` and the prefix being typed."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        limit = min(limit, MAX_SUGGESTIONS)
+        if query[-1].isspace():
+            complete, prefix = tokens, None
+        else:
+            complete, prefix = tokens[:-1], tokens[-1]
+
+        with self._lock:
+            if complete:
+                keys = self._match_all(complete, prefix, limit)
+            elif len(prefix) <= TOP_PREFIX_LENGTH:
+                keys = self._top.get(prefix, [])[:limit]
+            else:
+                keys = self._collect(prefix, limit)
+            return [self._entries[key[1]][0] for key in keys]
+
+
+class SuggestIndex:
+    """Typeahead over tag names, category names and published post titles.
+
+    Tags and categories are ranked by published post count and follow the
+    taxonomy snapshots, resyncing whenever their version moves. Posts are
+    ranked by views, loaded from the database on first use and then kept
+    current by the post handlers and by view-count flushes.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self.tags = PrefixIndex()
+        self.categories = PrefixIndex()
+        self.posts = PrefixIndex()
+        self._taxonomy_versions: Dict[str, int] = {}
+        self._posts_loaded = False
+        self._lock = threading.Lock()
+
+    def _sync_taxonomy(self, kind: str, index: PrefixIndex, cache: TaxonomyCache) -> None:
+        snapshot = cache.get()
+        if self._taxonomy_versions.get(kind) == snapshot.version:
+            return
+        with self._lock:
+            if self._taxonomy_versions.get(kind) == snapshot.version:
+                return
+            for entry_id in index.ids():
+                if entry_id not in snapshot.by_id:
+                    index.remove(entry_id)
+            for item in snapshot.items:
+                index.upsert(item["id"], item["name"], item["slug"], item["post_count"])
+            self._taxonomy_versions[kind] = snapshot.version
+
+    def _ensure_posts_loaded(self, db: Session) -> None:
+        if self._posts_loaded:
+            return
+        with self._lock:
+            if self._posts_loaded:
+                return
+            with untracked_queries():
+                rows = (
+                    db.query(Post.id, Post.title, Post.slug, Post.view_count)
+                    .filter(Post.status == PostStatus.PUBLISHED)
+                    .yield_per(5000)
+                )
+                self.posts.load((row.id, row.title, row.slug, row.view_count or 0) for row in rows)
+            self._posts_loaded = True
+
+    def suggest(self, db: Session, query: str, limit: int, kinds: Iterable[str]) -> Dict[str, List[Suggestion]]:
+        results = {}
+        for kind in kinds:
+            if kind == "tag":
+                self._sync_taxonomy(kind, self.tags, tag_cache)
+                results["tags"] = self.tags.suggest(query, limit)
+            elif kind == "category":
+                self._sync_taxonomy(kind, self.categories, category_cache)
+                results["categories"] = self.categories.suggest(query, limit)
+            elif kind == "post":
+                self._ensure_posts_loaded(db)
+                results["posts"] = self.posts.suggest(query, limit)
+        return results
+
+    def index_post(self, post: Post) -> None:
+        if not self._posts_loaded:
+            return
+        if post.status == PostStatus.PUBLISHED:
+            self.posts.upsert(post.id, post.title, post.slug, post.view_count or 0)
+        else:
+            self.posts.remove(post.id)
+
+    def remove_post(self, post_id: int) -> None:
+        if self._posts_loaded:
+            self.posts.remove(post_id)
+
+    def refresh_views(self, post_ids: List[int]) -> None:
+        """Re-rank posts after their view counts were flushed."""
+        post_ids = [post_id for post_id in post_ids if post_id in self.posts]
+        if not post_ids:
+            return
+        db = self.session_factory()
+        try:
+            rows = db.query(Post.id, Post.view_count).filter(Post.id.in_(post_ids)).all()
+        finally:
+            db.close()
+        for post_id, view_count in rows:
+            self.posts.set_popularity(post_id, view_count or 0)
+
+
+suggest_index = SuggestIndex()
+
+view_counter.add_flush_listener(suggest_index.refresh_views)
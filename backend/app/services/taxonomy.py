@@ -0,0 +1,159 @@
+import json
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Iterable, Mapping, Optional, Tuple
+from app.core.cache import LocalSharedClient
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.query_budget import untracked_queries
+from app.models import Category, Tag
+from app.schemas.category import CategoryResponse
+from app.schemas.tag import TagResponse
+
+
+@dataclass(frozen=True)
+class TaxonomySnapshot:
+    """Immutable view of every row of one taxonomy table, ordered by name."""
+
+    version: int
+    items: Tuple[dict, ...]
+    by_id: Mapping[int, dict]
+    by_slug: Mapping[str, dict]
+    body: bytes  # JSON array of all items
+    item_bodies: Mapping[int, bytes]  # JSON object per id
+
+
+class VersionSignal:
+    """Version counter shared by all workers through a Redis-compatible client."""
+
+    def __init__(self, client, key: str):
+        self.client = client
+        self.key = key
+
+    def current(self) -> int:
+        value = self.client.get(self.key)
+        return int(value) if value is not None else 0
+
+    def bump(self) -> int:
+        return int(self.client.incr(self.key))
+
+
+class TaxonomyCache:
+    """Serves categories or tags from an in-process snapshot.
+
+    Reads return the current snapshot without touching the database. Write
+    handlers call ``invalidate`` after committing, which bumps the version
+    and swaps in a freshly loaded snapshot. With a ``signal``, other workers
+    notice the bumped version within ``check_interval`` seconds and reload
+    on their next read.
+    """
+
+    def __init__(
+        self,
+        model,
+        schema,
+        signal: Optional[VersionSignal] = None,
+        check_interval: float = 1.0,
+        session_factory=SessionLocal,
+    ):
+        self.model = model
+        self.schema = schema
+        self.signal = signal
+        self.check_interval = check_interval
+        self.session_factory = session_factory
+        self._snapshot: Optional[TaxonomySnapshot] = None
+        self._version = 0
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> TaxonomySnapshot:
+        snapshot = self._snapshot
+        if snapshot is None or self._signal_changed(snapshot):
+            return self._reload(stale=snapshot)
+        return snapshot
+
+    def invalidate(self) -> None:
+        """Publish a new version and reload; call after the change is committed."""
+        if self.signal is not None:
+            version = self.signal.bump()
+        else:
+            with self._lock:
+                self._version += 1
+                version = self._version
+        self._reload(stale=self._snapshot, version=version)
+
+    def _signal_changed(self, snapshot: TaxonomySnapshot) -> bool:
+        if self.signal is None:
+            return False
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        self._next_check = now + self.check_interval
+        return self.signal.current() != snapshot.version
+
+    def _reload(self, stale: Optional[TaxonomySnapshot], version: Optional[int] = None) -> TaxonomySnapshot:
+        with self._lock:
+            current = self._snapshot
+            if current is not stale and (version is None or current.version >= version):
+                # Another thread already reloaded while we waited
+                return current
+            if version is None:
+                version = self.signal.current() if self.signal is not None else self._version
+
+            db = self.session_factory()
+            try:
+                with untracked_queries():
+                    rows = db.query(self.model).order_by(self.model.name).all()
+                items = tuple(self.schema.model_validate(row).model_dump(mode="json") for row in rows)
+            finally:
+                db.close()
+
+            snapshot = TaxonomySnapshot(
+                version=version,
+                items=items,
+                by_id=MappingProxyType({item["id"]: item for item in items}),
+                by_slug=MappingProxyType({item["slug"]: item for item in items}),
+                body=json.dumps(items).encode(),
+                item_bodies=MappingProxyType({item["id"]: json.dumps(item).encode() for item in items}),
+            )
+            self._snapshot = snapshot
+            return snapshot
+
+
+def build_version_signal(backend: str, url: str, key: str) -> Optional[VersionSignal]:
+    """Create the cross-worker signal for ``backend`` ("none", "redis" or "local")."""
+    if backend == "none":
+        return None
+    if backend == "local":
+        return VersionSignal(LocalSharedClient(), key)
+    if backend == "redis":
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("TAXONOMY_SYNC_BACKEND=redis requires the 'redis' package") from exc
+        return VersionSignal(redis.Redis.from_url(url), key)
+    raise ValueError(f"Unknown taxonomy sync backend: {backend}")
+
+
+category_cache = TaxonomyCache(
+    Category,
+    CategoryResponse,
+    signal=build_version_signal(settings.TAXONOMY_SYNC_BACKEND, settings.CACHE_URL, "myblog:taxonomy:categories"),
+    check_interval=settings.TAXONOMY_SYNC_INTERVAL,
+)
+tag_cache = TaxonomyCache(
+    Tag,
+    TagResponse,
+    signal=build_version_signal(settings.TAXONOMY_SYNC_BACKEND, settings.CACHE_URL, "myblog:taxonomy:tags"),
+    check_interval=settings.TAXONOMY_SYNC_INTERVAL,
+)
+
+TAXONOMY_CACHES = {Category: category_cache, Tag: tag_cache}
+
+
+def invalidate_taxonomy(models: Iterable) -> None:
+    """Reload the snapshots of the given taxonomy models (e.g. after post counts changed)."""
+    for model in models:
+        TAXONOMY_CACHES[model].invalidate()
@@ -0,0 +1,339 @@
+import bisect
+import threading
+from array import array
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.core.database import SessionLocal
+from app.core.query_budget import untracked_queries
+from app.models import Post, PostStatus, post_categories, post_tags
+from app.services.taxonomy import category_cache, tag_cache
+
+
+# Ids are split into chunks of 65536 by their high bits. A chunk with at most
+# ARRAY_MAX members is a sorted array of the low 16 bits (2 bytes per id);
+# a fuller one is a 65536-bit int (8 KiB), which is smaller from there on.
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+ARRAY_MAX = 4096
+
+
+def _count(container) -> int:
+    return container.bit_count() if isinstance(container, int) else len(container)
+
+
+def _count_below(container, below: Optional[int]) -> int:
+    if below is None:
+        return _count(container)
+    if isinstance(container, int):
+        return (container & ((1 << below) - 1)).bit_count()
+    return bisect.bisect_left(container, below)
+
+
+def _to_bits(values: Iterable[int]) -> int:
+    buffer = bytearray(1 << (CHUNK_BITS - 3))
+    for value in values:
+        buffer[value >> 3] |= 1 << (value & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def _to_array(bits: int) -> array:
+    values = array("H")
+    for index, byte in enumerate(bits.to_bytes(1 << (CHUNK_BITS - 3), "little")):
+        while byte:
+            low = byte & -byte
+            values.append(index << 3 | low.bit_length() - 1)
+            byte ^= low
+    return values
+
+
+def _copy(container):
+    # Ints are immutable; arrays are changed in place by add/discard
+    return container if isinstance(container, int) else array("H", container)
+
+
+def _fit(container):
+    """The smaller representation of a chunk, or None when it is empty."""
+    if isinstance(container, int):
+        if not container:
+            return None
+        return _to_array(container) if container.bit_count() <= ARRAY_MAX else container
+    if not container:
+        return None
+    return _to_bits(container) if len(container) > ARRAY_MAX else container
+
+
+def _and(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        # Query results are short-lived, so skip converting sparse results to arrays
+        return (a & b) or None
+    if isinstance(a, int):
+        a, b = b, a
+    if isinstance(b, int):
+        return _fit(array("H", (value for value in a if b >> value & 1)))
+    small, large = (a, b) if len(a) <= len(b) else (b, a)
+    members = set(large)
+    return _fit(array("H", (value for value in small if value in members)))
+
+
+def _or(a, b):
+    if isinstance(a, int) or isinstance(b, int):
+        return (a if isinstance(a, int) else _to_bits(a)) | (b if isinstance(b, int) else _to_bits(b))
+    return _fit(array("H", sorted(set(a).union(b))))
+
+
+def _top(container, limit: int, below: Optional[int], skip: int) -> List[int]:
+    """Up to ``limit`` largest low bits under ``below``, after skipping the ``skip`` largest."""
+    if isinstance(container, int):
+        bits = container if below is None else container & ((1 << below) - 1)
+        if skip:
+            # Binary search for the cut that leaves exactly ``skip`` members above it
+            low, high = 0, bits.bit_length()
+            while low < high:
+                middle = (low + high) // 2
+                if (bits >> middle).bit_count() <= skip:
+                    high = middle
+                else:
+                    low = middle + 1
+            bits &= (1 << low) - 1
+        values = []
+        while bits and len(values) < limit:
+            value = bits.bit_length() - 1
+            values.append(value)
+            bits ^= 1 << value
+        return values
+    end = len(container) if below is None else bisect.bisect_left(container, below)
+    end -= skip
+    return [container[i] for i in range(end - 1, max(end - limit, 0) - 1, -1)]
+
+
+class IdBitmap:
+    """Compressed set of non-negative ids, in the manner of a roaring bitmap.
+
+    Ids are grouped in chunks of 65536; sparse chunks are sorted arrays and
+    dense ones are bitmaps whose AND, OR and popcount run in C over machine
+    words. Memory follows the number of members (about 2 bytes each, and
+    never more than 8 KiB per chunk) rather than the largest id, so
+    thousands of mostly small tag sets stay cheap with ids in the millions.
+    """
+
+    __slots__ = ("chunks",)
+
+    def __init__(self, chunks: Optional[Dict[int, object]] = None):
+        self.chunks: Dict[int, object] = chunks or {}
+
+    @classmethod
+    def from_ids(cls, ids: Iterable[int]) -> "IdBitmap":
+        grouped: Dict[int, List[int]] = defaultdict(list)
+        for i in ids:
+            grouped[i >> CHUNK_BITS].append(i & CHUNK_MASK)
+        chunks = {}
+        for key, values in grouped.items():
+            values = set(values)
+            chunks[key] = _to_bits(values) if len(values) > ARRAY_MAX else array("H", sorted(values))
+        return cls(chunks)
+
+    def add(self, i: int) -> None:
+        key, value = i >> CHUNK_BITS, i & CHUNK_MASK
+        container = self.chunks.get(key)
+        if isinstance(container, int):
+            self.chunks[key] = container | 1 << value
+            return
+        if container is None:
+            container = self.chunks[key] = array("H")
+        index = bisect.bisect_left(container, value)
+        if index == len(container) or container[index] != value:
+            container.insert(index, value)
+            if len(container) > ARRAY_MAX:
+                self.chunks[key] = _to_bits(container)
+
+    def discard(self, i: int) -> None:
+        key, value = i >> CHUNK_BITS, i & CHUNK_MASK
+        container = self.chunks.get(key)
+        if container is None:
+            return
+        if isinstance(container, int):
+            container = _fit(container & ~(1 << value))
+        else:
+            index = bisect.bisect_left(container, value)
+            if index < len(container) and container[index] == value:
+                del container[index]
+            container = container or None
+        if container is None:
+            del self.chunks[key]
+        else:
+            self.chunks[key] = container
+
+    def __and__(self, other: "IdBitmap") -> "IdBitmap":
+        chunks = {}
+        for key in self.chunks.keys() & other.chunks.keys():
+            container = _and(self.chunks[key], other.chunks[key])
+            if container is not None:
+                chunks[key] = container
+        return IdBitmap(chunks)
+
+    def __or__(self, other: "IdBitmap") -> "IdBitmap":
+        # Chunks only one side has are copied, so the result shares no containers
+        chunks = {key: _copy(container) for key, container in self.chunks.items()}
+        for key, container in other.chunks.items():
+            chunks[key] = _or(chunks[key], container) if key in chunks else _copy(container)
+        return IdBitmap(chunks)
+
+    def copy(self) -> "IdBitmap":
+        return IdBitmap({key: _copy(container) for key, container in self.chunks.items()})
+
+    def __len__(self) -> int:
+        return sum(_count(container) for container in self.chunks.values())
+
+    def __contains__(self, i: int) -> bool:
+        container = self.chunks.get(i >> CHUNK_BITS)
+        if container is None:
+            return False
+        value = i & CHUNK_MASK
+        if isinstance(container, int):
+            return bool(container >> value & 1)
+        index = bisect.bisect_left(container, value)
+        return index < len(container) and container[index] == value
+
+    def top(self, limit: int, below: Optional[int] = None, skip: int = 0) -> List[int]:
+        """The ``limit`` largest ids under ``below``, after skipping the ``skip`` largest."""
+        if below is not None and below <= 0:
+            return []
+        ids: List[int] = []
+        for key in sorted(self.chunks, reverse=True):
+            if len(ids) >= limit:
+                break
+            low_below = None
+            if below is not None:
+                if key > (below - 1) >> CHUNK_BITS:
+                    continue
+                if key == below >> CHUNK_BITS:
+                    low_below = below & CHUNK_MASK
+            container = self.chunks[key]
+            if skip:
+                count = _count_below(container, low_below)
+                if count <= skip:
+                    skip -= count
+                    continue
+            base = key << CHUNK_BITS
+            ids.extend(base | value for value in _top(container, limit - len(ids), low_below, skip))
+            skip = 0
+        return ids
+
+
+class TaxonomyBitmapIndex:
+    """Per-category and per-tag bitmaps of published post ids.
+
+    Built from the association tables on first use and then kept current by
+    the post handlers. Membership only changes when a published post's
+    taxonomy or status changes, which is exactly when the taxonomy snapshot
+    versions move, so with a cross-worker taxonomy signal other workers
+    rebuild when they see a version they did not produce themselves.
+    Rebuilds read the primary: a lagging replica would pin stale membership
+    until the next version change.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._categories: Dict[int, IdBitmap] = defaultdict(IdBitmap)
+        self._tags: Dict[int, IdBitmap] = defaultdict(IdBitmap)
+        # post_id -> (category ids, tag ids) for published posts
+        self._post_terms: Dict[int, Tuple[Tuple[int, ...], Tuple[int, ...]]] = {}
+        self._versions: Optional[Tuple[int, int]] = None
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _current_versions() -> Tuple[int, int]:
+        return category_cache.get().version, tag_cache.get().version
+
+    def _is_stale(self) -> bool:
+        if category_cache.signal is None and tag_cache.signal is None:
+            return False
+        return self._versions != self._current_versions()
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded and not self._is_stale():
+            return
+        with self._lock:
+            if self._loaded and not self._is_stale():
+                return
+            versions = self._current_versions()
+            terms: Dict[int, Tuple[List[int], List[int]]] = defaultdict(lambda: ([], []))
+            categories: Dict[int, List[int]] = defaultdict(list)
+            tags: Dict[int, List[int]] = defaultdict(list)
+            db = self.session_factory()
+            try:
+                with untracked_queries():
+                    for table, column, by_term, slot in (
+                        (post_categories, post_categories.c.category_id, categories, 0),
+                        (post_tags, post_tags.c.tag_id, tags, 1),
+                    ):
+                        rows = (
+                            db.query(table.c.post_id, column)
+                            .join(Post, Post.id == table.c.post_id)
+                            .filter(Post.status == PostStatus.PUBLISHED)
+                            .yield_per(5000)
+                        )
+                        for post_id, term_id in rows:
+                            by_term[term_id].append(post_id)
+                            terms[post_id][slot].append(term_id)
+            finally:
+                db.close()
+
+            self._categories = defaultdict(IdBitmap, {i: IdBitmap.from_ids(ids) for i, ids in categories.items()})
+            self._tags = defaultdict(IdBitmap, {i: IdBitmap.from_ids(ids) for i, ids in tags.items()})
+            self._post_terms = {post_id: (tuple(c), tuple(t)) for post_id, (c, t) in terms.items()}
+            self._versions = versions
+            self._loaded = True
+
+    def _remove(self, post_id: int) -> None:
+        category_ids, tag_ids = self._post_terms.pop(post_id, ((), ()))
+        for category_id in category_ids:
+            self._categories[category_id].discard(post_id)
+        for tag_id in tag_ids:
+            self._tags[tag_id].discard(post_id)
+
+    def index_post(self, post: Post) -> None:
+        """Call after commit and after the taxonomy snapshots were invalidated."""
+        with self._lock:
+            if not self._loaded:
+                return
+            self._remove(post.id)
+            if post.status == PostStatus.PUBLISHED:
+                category_ids, tag_ids = tuple(post.category_ids), tuple(post.tag_ids)
+                for category_id in category_ids:
+                    self._categories[category_id].add(post.id)
+                for tag_id in tag_ids:
+                    self._tags[tag_id].add(post.id)
+                if category_ids or tag_ids:
+                    self._post_terms[post.id] = (category_ids, tag_ids)
+            self._versions = self._current_versions()
+
+    def remove_post(self, post_id: int) -> None:
+        with self._lock:
+            if not self._loaded:
+                return
+            self._remove(post_id)
+            self._versions = self._current_versions()
+
+    def select(self, category_ids: List[int], tag_ids: List[int], match_all: bool) -> IdBitmap:
+        """Published posts in all (``match_all``) or any of the given categories and tags."""
+        self._ensure_loaded()
+        # index_post/remove_post change the live bitmaps in place, so the result
+        # is built under the lock and never shares a container with them
+        with self._lock:
+            bitmaps = [self._categories.get(i, IdBitmap()) for i in category_ids]
+            bitmaps += [self._tags.get(i, IdBitmap()) for i in tag_ids]
+            if not bitmaps:
+                return IdBitmap()
+            if len(bitmaps) == 1:
+                return bitmaps[0].copy()
+            # Start from the smallest set so intersections shrink fastest
+            bitmaps.sort(key=len)
+            result = bitmaps[0]
+            for bitmap in bitmaps[1:]:
+                result = result & bitmap if match_all else result | bitmap
+            return result
+
+
+taxonomy_index = TaxonomyBitmapIndex()
@@ -0,0 +1,131 @@
+import logging
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import case, func, update
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.post import Post
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    """Write-behind accumulator for post view counts.
+
+    Reads only bump an in-process counter; a background thread folds the
+    aggregated deltas into ``posts.view_count`` with one batched
+    ``UPDATE ... CASE`` per flush, either every ``interval`` seconds or as soon
+    as ``threshold`` increments are pending. Pending deltas are flushed on stop.
+    """
+
+    # Upper bound on ids per UPDATE statement
+    BATCH_SIZE = 500
+
+    def __init__(self, interval: float, threshold: int, session_factory=SessionLocal):
+        self.interval = interval
+        self.threshold = threshold
+        self.session_factory = session_factory
+        self._deltas: Dict[int, int] = defaultdict(int)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._listeners: List[Callable[[List[int]], None]] = []
+
+    def add_flush_listener(self, callback: Callable[[List[int]], None]) -> None:
+        """Register a callback that receives the post ids written by each flush."""
+        self._listeners.append(callback)
+
+    @property
+    def pending(self) -> int:
+        """Number of increments not yet written to the database."""
+        return self._pending
+
+    def pending_for(self, post_id: int) -> int:
+        with self._lock:
+            return self._deltas.get(post_id, 0)
+
+    def increment(self, post_id: int, amount: int = 1) -> None:
+        with self._lock:
+            self._deltas[post_id] += amount
+            self._pending += amount
+            over_threshold = self._pending >= self.threshold
+        if over_threshold:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """Write all pending deltas. Returns the number of increments flushed."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._deltas:
+                    return 0
+                deltas, self._deltas = self._deltas, defaultdict(int)
+                flushed, self._pending = self._pending, 0
+
+            try:
+                self._write(deltas)
+            except Exception:
+                logger.exception("Failed to flush %d view count increments", flushed)
+                # Put the deltas back so they are retried on the next flush
+                with self._lock:
+                    for post_id, delta in deltas.items():
+                        self._deltas[post_id] += delta
+                    self._pending += flushed
+                return 0
+
+            for callback in self._listeners:
+                callback(list(deltas))
+            return flushed
+
+    def _write(self, deltas: Dict[int, int]) -> None:
+        post_ids = list(deltas)
+        db = self.session_factory()
+        try:
+            for start in range(0, len(post_ids), self.BATCH_SIZE):
+                batch = {post_id: deltas[post_id] for post_id in post_ids[start:start + self.BATCH_SIZE]}
+                db.execute(
+                    update(Post)
+                    .where(Post.id.in_(batch))
+                    .values(
+                        view_count=func.coalesce(Post.view_count, 0) + case(batch, value=Post.id, else_=0),
+                        # Views are not edits; keep updated_at from its onupdate
+                        updated_at=Post.updated_at,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="view-counter-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stopping.set()
+            self._wakeup.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+view_counter = ViewCounter(
+    interval=settings.VIEW_COUNT_FLUSH_INTERVAL,
+    threshold=settings.VIEW_COUNT_FLUSH_THRESHOLD,
+)
@@ -0,0 +1,180 @@
+"""Throughput of sync and async database reads under high concurrency.
+
+Serves the same read from a ``def`` route on the sync session, which FastAPI
+runs in its threadpool, and from an ``async def`` route on the async session.
+Every request first waits ``--latency-ms`` inside the database, standing in
+for the network round trip to MySQL, so the difference comes from how many
+reads can be in flight at once rather than from query cost. The server runs
+in its own uvicorn process so the load generator does not share its GIL.
+
+Runs against a temporary SQLite database unless DATABASE_URL is set. aiosqlite
+hands every statement to a worker thread, so point it at MySQL to measure the
+async driver rather than that hand-off.
+
+Usage (from the backend directory):
+    python -m benchmarks.async_db [--requests 1000] [--concurrency 100] [--latency-ms 200]
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+# The server process imports this module too and must share the database
+if "ASYNC_DB_BENCH_DIR" not in os.environ:
+    os.environ["ASYNC_DB_BENCH_DIR"] = tempfile.mkdtemp(prefix="async-db-bench-")
+WORKDIR = os.environ["ASYNC_DB_BENCH_DIR"]
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{WORKDIR}/bench.db")
+os.environ.setdefault("DATABASE_POOL_SIZE", "100")
+os.environ["DEBUG"] = "false"
+
+import httpx  # noqa: E402
+from fastapi import Depends, FastAPI  # noqa: E402
+from sqlalchemy import event, select, text  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.core.database import Base, SessionLocal, async_engine, engine, get_async_db, get_db  # noqa: E402
+from app.models import Post, PostStatus, User  # noqa: E402
+
+# Simulated round trip per request
+LATENCY_MS = float(os.environ.get("ASYNC_DB_BENCH_LATENCY_MS", "0"))
+
+
+def _sqlite_sleep(dbapi_connection, connection_record) -> None:
+    dbapi_connection.create_function("bench_sleep", 1, lambda ms: time.sleep(ms / 1000) or 0)
+
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", _sqlite_sleep)
+    event.listen(async_engine.sync_engine, "connect", _sqlite_sleep)
+    PAUSE = text("SELECT bench_sleep(:ms)")
+else:
+    PAUSE = text("SELECT SLEEP(:ms / 1000)")
+
+POST_COLUMNS = (Post.id, Post.title, Post.slug, Post.view_count)
+
+bench_app = FastAPI()
+
+
+@bench_app.get("/sync/{post_id}")
+def read_sync(post_id: int, db: Session = Depends(get_db)):
+    db.execute(PAUSE, {"ms": LATENCY_MS})
+    return db.execute(select(*POST_COLUMNS).where(Post.id == post_id)).one()._asdict()
+
+
+@bench_app.get("/async/{post_id}")
+async def read_async(post_id: int, db: AsyncSession = Depends(get_async_db)):
+    await db.execute(PAUSE, {"ms": LATENCY_MS})
+    return (await db.execute(select(*POST_COLUMNS).where(Post.id == post_id))).one()._asdict()
+
+
+def seed(posts: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = User(username="bench", email="bench@example.com")
+        db.add(user)
+        db.flush()
+        db.add_all(
+            Post(
+                title=f"Post {i}",
+                slug=f"bench-post-{i}",
+                content="x" * 2000,
+                status=PostStatus.PUBLISHED,
+                author_id=user.id,
+            )
+            for i in range(posts)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, latency_ms: float, backlog: int) -> subprocess.Popen:
+    env = dict(os.environ, ASYNC_DB_BENCH_LATENCY_MS=str(latency_ms))
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "benchmarks.async_db:bench_app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--log-level", "warning", "--backlog", str(backlog), "--timeout-keep-alive", "120",
+        ],
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/sync/1", timeout=5)
+            return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("benchmark server did not start")
+
+
+async def run(base_url: str, prefix: str, requests: int, concurrency: int, posts: int) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def worker(count: int) -> None:
+            for _ in range(count):
+                started = time.perf_counter()
+                response = await client.get(f"{prefix}/{random.randint(1, posts)}")
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        share, extra = divmod(requests, concurrency)
+        await asyncio.gather(*(worker(share + (i < extra)) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "req_per_s": requests / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--posts", type=int, default=200)
+    args = parser.parse_args()
+
+    seed(args.posts)
+    port = free_port()
+    server = start_server(port, args.latency_ms, backlog=args.concurrency * 2)
+    try:
+        print(
+            f"{args.requests} requests, concurrency {args.concurrency}, "
+            f"{args.latency_ms:g} ms database latency, {engine.dialect.name}"
+        )
+        for name, prefix in (("sync", "/sync"), ("async", "/async")):
+            result = asyncio.run(run(f"http://127.0.0.1:{port}", prefix, args.requests, args.concurrency, args.posts))
+            print(
+                f"{name:<6} {result['req_per_s']:>8.1f} req/s"
+                f"   p50 {result['p50_ms']:>7.1f} ms   p99 {result['p99_ms']:>7.1f} ms"
+            )
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""Reproducible synthetic dataset for load tests.
+
+Fills an empty database with users, posts, tags, categories, comment
+threads and media rows drawn from a seeded generator, so the same seed and
+sizes always produce the same rows (up to bcrypt's salt). The distributions follow what a real
+blog looks like rather than uniform noise:
+
+- post bodies are log-normal in length (median about 3 KB, long tail to 60 KB);
+- title words, tags and categories are Zipf-distributed, so a few tags sit on
+  a large share of posts and most are rare;
+- comments pile up on a few hot posts, and replies favour the newest comment
+  of a thread, which produces long reply chains (capped at MAX_COMMENT_DEPTH);
+- a few authors write most posts and a few commenters write most comments;
+- some uploads share a checksum and so a blob.
+
+Rows go in through Core executemany in batches on one connection, with
+durability checks relaxed for the load (SQLite ``synchronous=OFF``, MySQL
+unique and foreign key checks off), which keeps millions of rows practical.
+Media rows reference blob paths but no files are written. Every user's
+password is PASSWORD, so scenarios can log in as any of them.
+
+Usage (from the backend directory):
+    python -m benchmarks.dataset [--scale small] [--users N] [--posts N] [--comments N] [--seed 1] [--reset]
+"""
+import argparse
+import math
+import random
+import string
+import time
+from dataclasses import dataclass, fields, replace
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, List
+
+from sqlalchemy import func, select, text
+
+from app.core.database import Base, engine
+from app.core.security import get_password_hash
+from app.models import (
+    Category, Comment, Media, MediaBlob, Post, PostStatus, Tag, User, UserRole, post_categories, post_tags,
+)
+from app.models.comment import MAX_COMMENT_DEPTH, path_segment
+from app.services.media_storage import blob_path
+
+PASSWORD = "benchmark-password"
+
+# Everything is dated within the three years before this instant
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+SPAN_SECONDS = 3 * 365 * 24 * 3600
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    """Row counts and seed of one dataset."""
+
+    users: int
+    posts: int
+    comments: int
+    tags: int
+    categories: int
+    media: int
+    seed: int = 1
+    published_ratio: float = 0.9
+    batch_size: int = 5000
+
+
+SCALES = {
+    "small": DatasetSpec(users=1_000, posts=5_000, comments=25_000, tags=300, categories=20, media=2_000),
+    "medium": DatasetSpec(users=20_000, posts=100_000, comments=1_000_000, tags=3_000, categories=40, media=50_000),
+    "large": DatasetSpec(users=200_000, posts=1_000_000, comments=10_000_000, tags=20_000, categories=60, media=500_000),
+}
+
+TABLES = (User, Category, Tag, Post, post_categories, post_tags, Comment, MediaBlob, Media)
+
+
+def zipf_cum_weights(count: int, exponent: float = 1.0) -> List[float]:
+    """Cumulative weights for ``rng.choices``: rank r is drawn in proportion to 1 / r**exponent."""
+    total = 0.0
+    cumulative = []
+    for rank in range(1, count + 1):
+        total += 1 / rank ** exponent
+        cumulative.append(total)
+    return cumulative
+
+
+def _vocabulary(rng: random.Random, size: int) -> List[str]:
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 11))))
+    words = sorted(words)
+    rng.shuffle(words)
+    return words
+
+
+def _corpus(rng: random.Random, vocabulary: List[str], cum_weights: List[float], length: int) -> str:
+    # Bodies are windows into one long text, far cheaper than generating each
+    sentences = []
+    size = 0
+    while size < length:
+        words = rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(6, 24))
+        sentence = " ".join(words).capitalize() + (".\n\n" if rng.random() < 0.15 else ". ")
+        sentences.append(sentence)
+        size += len(sentence)
+    return "".join(sentences)
+
+
+def batched(rows: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class DatasetGenerator:
+    """Rows of every table, generated lazily from one seeded random stream."""
+
+    def __init__(self, spec: DatasetSpec):
+        self.spec = spec
+        self.rng = random.Random(spec.seed)
+        self.vocabulary = _vocabulary(self.rng, 20_000)
+        self.word_weights = zipf_cum_weights(len(self.vocabulary))
+        self.corpus = _corpus(self.rng, self.vocabulary, self.word_weights, 256 * 1024)
+        self.password_hash = get_password_hash(PASSWORD)
+
+        # A few accounts do most of the writing
+        self.authors = max(1, spec.users // 20)
+        self.author_weights = zipf_cum_weights(self.authors, 0.8)
+        self.commenter_weights = zipf_cum_weights(spec.users, 0.7)
+        self.tag_weights = zipf_cum_weights(spec.tags, 1.1)
+        self.category_weights = zipf_cum_weights(spec.categories, 0.9)
+
+        self.published = bytearray(self.rng.random() < spec.published_ratio for _ in range(spec.posts))
+        self.comment_counts = self._comment_counts()
+        self.post_times: List[float] = sorted(self.rng.random() * SPAN_SECONDS for _ in range(spec.posts))
+        self.tag_post_counts = [0] * spec.tags
+        self.category_post_counts = [0] * spec.categories
+        self.uploads = self._uploads()
+
+    def _comment_counts(self) -> List[int]:
+        # Pareto weights: a handful of posts draw most of the discussion
+        spec = self.spec
+        weights = [self.rng.paretovariate(1.2) if published else 0.0 for published in self.published]
+        total = sum(weights) or 1.0
+        counts = [int(spec.comments * weight / total) for weight in weights]
+        open_posts = [index for index, published in enumerate(self.published) if published]
+        for _ in range(spec.comments - sum(counts)):
+            if not open_posts:
+                break
+            counts[self.rng.choice(open_posts)] += 1
+        return counts
+
+    def _at(self, seconds: float) -> datetime:
+        return EPOCH - timedelta(seconds=SPAN_SECONDS - seconds)
+
+    def users(self) -> Iterator[dict]:
+        for user_id in range(1, self.spec.users + 1):
+            created = self._at(self.rng.random() * SPAN_SECONDS)
+            if user_id == 1:
+                role = UserRole.ADMIN
+            elif user_id <= self.authors:
+                role = UserRole.AUTHOR
+            else:
+                role = UserRole.USER
+            yield {
+                "id": user_id,
+                "username": f"user{user_id}",
+                "email": f"user{user_id}@example.com",
+                "password_hash": self.password_hash,
+                "role": role,
+                "email_verified": 1,
+                "created_at": created,
+                "updated_at": created,
+            }
+
+    def posts(self) -> Iterator[dict]:
+        rng = self.rng
+        corpus_length = len(self.corpus)
+        for index in range(self.spec.posts):
+            post_id = index + 1
+            words = rng.choices(self.vocabulary, cum_weights=self.word_weights, k=rng.randint(3, 9))
+            length = min(60_000, max(200, int(rng.lognormvariate(math.log(3000), 0.8))))
+            start = rng.randrange(max(1, corpus_length - length))
+            content = self.corpus[start:start + length]
+            created = self._at(self.post_times[index])
+            published = self.published[index]
+            yield {
+                "id": post_id,
+                "title": " ".join(words).capitalize(),
+                "slug": f"{'-'.join(words)[:200]}-{post_id}",
+                "content": content,
+                "excerpt": content[:200],
+                "status": PostStatus.PUBLISHED if published else PostStatus.DRAFT,
+                "author_id": rng.choices(range(1, self.authors + 1), cum_weights=self.author_weights)[0],
+                "view_count": int(rng.paretovariate(1.1) * 10) if published else 0,
+                "comment_count": self.comment_counts[index],
+                "created_at": created,
+                "updated_at": created,
+            }
+
+    def _links(self, count: int, cum_weights: List[float], least: int, most: int, post_counts: List[int], column: str):
+        rng = self.rng
+        for index in range(self.spec.posts):
+            chosen = set(rng.choices(range(count), cum_weights=cum_weights, k=rng.randint(least, most)))
+            for item in sorted(chosen):
+                if self.published[index]:
+                    post_counts[item] += 1
+                yield {"post_id": index + 1, column: item + 1}
+
+    def post_tags(self) -> Iterator[dict]:
+        return self._links(self.spec.tags, self.tag_weights, 0, 6, self.tag_post_counts, "tag_id")
+
+    def post_categories(self) -> Iterator[dict]:
+        return self._links(self.spec.categories, self.category_weights, 1, 2, self.category_post_counts, "category_id")
+
+    def tags(self) -> Iterator[dict]:
+        # Called after post_tags, once the per-tag counts are known
+        for index in range(self.spec.tags):
+            name = f"{self.vocabulary[index]}-{index + 1}"
+            yield {"id": index + 1, "name": name, "slug": name, "post_count": self.tag_post_counts[index]}
+
+    def categories(self) -> Iterator[dict]:
+        for index in range(self.spec.categories):
+            name = f"{self.vocabulary[-(index + 1)].capitalize()} {index + 1}"
+            yield {
+                "id": index + 1,
+                "name": name,
+                "slug": name.lower().replace(" ", "-"),
+                "post_count": self.category_post_counts[index],
+                "description": self.corpus[index * 100:index * 100 + 100],
+            }
+
+    def comments(self) -> Iterator[dict]:
+        rng = self.rng
+        users = range(1, self.spec.users + 1)
+        comment_id = 0
+        for index, count in enumerate(self.comment_counts):
+            post_time = self.post_times[index]
+            step = (SPAN_SECONDS - post_time) / (count + 1)
+            thread: List[tuple] = []  # (id, path, depth) of this post's comments
+            for position in range(count):
+                comment_id += 1
+                parent = None
+                if thread and rng.random() < 0.7:
+                    # Replies mostly continue the newest exchange, which builds deep chains
+                    parent = thread[-1] if rng.random() < 0.6 else rng.choice(thread)
+                    if parent[2] + 1 >= MAX_COMMENT_DEPTH:
+                        parent = None
+                path = (parent[1] if parent else "") + path_segment(comment_id)
+                depth = parent[2] + 1 if parent else 0
+                thread.append((comment_id, path, depth))
+                created = self._at(post_time + step * (position + 1))
+                length = min(4000, max(10, int(rng.lognormvariate(math.log(200), 0.9))))
+                start = rng.randrange(len(self.corpus) - length)
+                yield {
+                    "id": comment_id,
+                    "post_id": index + 1,
+                    "user_id": rng.choices(users, cum_weights=self.commenter_weights)[0],
+                    "content": self.corpus[start:start + length],
+                    "parent_id": parent[0] if parent else None,
+                    "path": path,
+                    "depth": depth,
+                    "created_at": created,
+                    "updated_at": created,
+                }
+
+    def _uploads(self) -> List[tuple]:
+        rng = self.rng
+        uploads = []
+        for _ in range(self.spec.media):
+            if uploads and rng.random() < 0.1:
+                # Re-uploads of an earlier file
+                uploads.append(rng.choice(uploads))
+                continue
+            kind = rng.choices(("jpg", "png", "webp", "gif"), weights=(60, 25, 10, 5))[0]
+            size = min(10 * 1024 * 1024, max(1024, int(rng.lognormvariate(math.log(300 * 1024), 1.0))))
+            uploads.append((f"{rng.getrandbits(256):064x}", size, kind))
+        return uploads
+
+    def media(self) -> Iterator[dict]:
+        mimetypes = {"jpg": "image/jpeg", "png": "image/png", "webp": "image/webp", "gif": "image/gif"}
+        for media_id, (digest, size, kind) in enumerate(self.uploads, 1):
+            yield {
+                "id": media_id,
+                "filename": f"image-{media_id}.{kind}",
+                "filepath": str(blob_path(digest)),
+                "mimetype": mimetypes[kind],
+                "size": size,
+                "checksum": digest,
+                "user_id": self.rng.choices(range(1, self.spec.users + 1), cum_weights=self.commenter_weights)[0],
+                "created_at": self._at(self.rng.random() * SPAN_SECONDS),
+            }
+
+    def media_blobs(self) -> Iterator[dict]:
+        refcounts: Dict[str, list] = {}
+        for digest, size, _ in self.uploads:
+            refcounts.setdefault(digest, [size, 0])[1] += 1
+        for digest, (size, refcount) in refcounts.items():
+            yield {"digest": digest, "size": size, "refcount": refcount, "created_at": EPOCH}
+
+    def tables(self) -> Iterator[tuple]:
+        """(table, rows) in an order that satisfies every foreign key."""
+        yield User.__table__, self.users()
+        yield Post.__table__, self.posts()
+        yield post_tags, self.post_tags()
+        yield post_categories, self.post_categories()
+        yield Tag.__table__, self.tags()
+        yield Category.__table__, self.categories()
+        yield Comment.__table__, self.comments()
+        yield MediaBlob.__table__, self.media_blobs()
+        yield Media.__table__, self.media()
+
+
+def _relax_checks(conn) -> None:
+    if conn.dialect.name == "sqlite":
+        conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+    elif conn.dialect.name == "mysql":
+        conn.exec_driver_sql("SET unique_checks=0, foreign_key_checks=0")
+
+
+def row_counts(bind=engine) -> Dict[str, int]:
+    with bind.connect() as conn:
+        return {
+            table.name: conn.scalar(select(func.count()).select_from(table))
+            for table in (getattr(model, "__table__", model) for model in TABLES)
+        }
+
+
+def load(spec: DatasetSpec, bind=engine, progress: Callable[[str, int, float], None] = None) -> Dict[str, int]:
+    """Insert ``spec``'s rows into empty tables and return the row count per table.
+
+    Posts and tags reference each other's counts, so the association rows are
+    inserted before the tag and category rows they point at; foreign key
+    checks are off for the load and every reference is valid once it ends.
+    """
+    Base.metadata.create_all(bind=bind)
+    if row_counts(bind)["users"]:
+        raise RuntimeError("The database already has users; load into an empty database or pass --reset")
+
+    generator = DatasetGenerator(spec)
+    inserted = {}
+    with bind.connect() as conn:
+        _relax_checks(conn)
+        conn.commit()
+        for table, rows in generator.tables():
+            started = time.perf_counter()
+            count = 0
+            for batch in batched(rows, spec.batch_size):
+                conn.execute(table.insert(), batch)
+                conn.commit()
+                count += len(batch)
+            inserted[table.name] = count
+            if progress is not None:
+                progress(table.name, count, time.perf_counter() - started)
+        if conn.dialect.name == "sqlite":
+            conn.execute(text("ANALYZE"))
+            conn.commit()
+        # Drop the relaxed connection rather than return it to the app's pool
+        conn.invalidate()
+    return inserted
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    for field in fields(DatasetSpec):
+        if field.type is int:
+            parser.add_argument(f"--{field.name.replace('_', '-')}", type=int, help=f"override the scale's {field.name}")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate every table first")
+    args = parser.parse_args()
+
+    overrides = {
+        field.name: getattr(args, field.name)
+        for field in fields(DatasetSpec)
+        if field.type is int and getattr(args, field.name) is not None
+    }
+    spec = replace(SCALES[args.scale], **overrides)
+
+    if args.reset:
+        Base.metadata.drop_all(bind=engine)
+
+    print(f"Loading {spec} into {engine.dialect.name}")
+    started = time.perf_counter()
+    load(spec, progress=lambda table, count, seconds: print(
+        f"{table:<16} {count:>10} rows {seconds:>8.1f}s {count / seconds if seconds else 0:>10.0f} rows/s"
+    ))
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
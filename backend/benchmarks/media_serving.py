@@ -0,0 +1,139 @@
+"""Throughput of the media download route against plain static file serving.
+
+Starts uvicorn on a local port with the API mounted next to a Starlette
+``StaticFiles`` mount of the same upload directory, then downloads one file
+repeatedly from several threads through each path.
+
+Usage (from the backend directory):
+    python -m benchmarks.media_serving [--size-mb 8] [--requests 200] [--concurrency 8]
+"""
+import argparse
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+WORKDIR = tempfile.mkdtemp(prefix="media-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR}/bench.db"
+os.environ["UPLOAD_DIR"] = f"{WORKDIR}/uploads"
+os.environ["DEBUG"] = "false"
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from starlette.applications import Starlette  # noqa: E402
+from starlette.routing import Mount  # noqa: E402
+from starlette.staticfiles import StaticFiles  # noqa: E402
+
+from main import app as api  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.database import SessionLocal  # noqa: E402
+from app.models import Media, User  # noqa: E402
+from app.services.media_storage import adopt_file, blob_path, hash_file  # noqa: E402
+
+
+def seed(size_mb: int) -> Media:
+    """Store one random blob of ``size_mb`` MiB and return its media row."""
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    source = os.path.join(settings.UPLOAD_DIR, "seed.bin")
+    with open(source, "wb") as f:
+        for _ in range(size_mb):
+            f.write(os.urandom(1024 * 1024))
+    digest, size = hash_file(source)
+
+    db = SessionLocal()
+    try:
+        user = User(username="bench", email="bench@example.com")
+        db.add(user)
+        db.flush()
+        path = adopt_file(db, digest, size, Path(source))
+        media = Media(
+            filename="seed.bin",
+            filepath=str(path),
+            mimetype="application/octet-stream",
+            size=size,
+            checksum=digest,
+            user_id=user.id,
+        )
+        db.add(media)
+        db.commit()
+        db.refresh(media)
+        db.expunge(media)
+        return media
+    finally:
+        db.close()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run(base_url: str, path: str, requests: int, concurrency: int, headers=None) -> dict:
+    def fetch(client: httpx.Client) -> int:
+        received = 0
+        with client.stream("GET", path, headers=headers) as response:
+            response.raise_for_status()
+            for chunk in response.iter_raw():
+                received += len(chunk)
+        return received
+
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        fetch(client)  # warm up
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            received = sum(pool.map(lambda _: fetch(client), range(requests)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "req_per_s": requests / elapsed,
+        "mib_per_s": received / elapsed / (1024 * 1024),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    media = seed(args.size_mb)
+    relative = blob_path(media.checksum).relative_to(settings.UPLOAD_DIR).as_posix()
+
+    bench_app = Starlette(routes=[
+        Mount("/static", app=StaticFiles(directory=settings.UPLOAD_DIR)),
+        Mount("/", app=api),
+    ])
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(bench_app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{port}"
+    prefix = settings.API_V1_PREFIX
+    scenarios = [
+        ("static files", f"/static/{relative}", None),
+        ("media by id", f"{prefix}/media/{media.id}/file", None),
+        ("media by digest", f"{prefix}/media/blobs/{media.checksum}", None),
+        ("range 1 MiB", f"{prefix}/media/{media.id}/file", {"Range": "bytes=0-1048575"}),
+    ]
+    try:
+        print(f"{args.size_mb} MiB file, {args.requests} requests, concurrency {args.concurrency}")
+        for name, path, headers in scenarios:
+            result = run(base_url, path, args.requests, args.concurrency, headers)
+            print(f"{name:<16} {result['req_per_s']:>9.1f} req/s {result['mib_per_s']:>9.1f} MiB/s")
+    finally:
+        server.should_exit = True
+        thread.join()
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
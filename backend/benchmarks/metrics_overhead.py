@@ -0,0 +1,86 @@
+"""Per-request cost of the /metrics request instrumentation.
+
+Drives a minimal ASGI endpoint directly, with and without
+RequestMetricsMiddleware in front, so the difference is the middleware's
+own work: wrapping send, reading the status and Content-Length, and
+recording into the per-thread shard. Also times rendering /metrics once
+many route series exist.
+
+Usage (from the backend directory):
+    python -m benchmarks.metrics_overhead [--requests 200000] [--routes 50] [--rounds 5]
+"""
+import argparse
+import asyncio
+import time
+
+from app.core.metrics import MetricsRegistry, RequestMetricsMiddleware
+
+BODY = b'{"ok":true}'
+START = {
+    "type": "http.response.start",
+    "status": 200,
+    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(BODY)).encode())],
+}
+
+
+class Route:
+    def __init__(self, path: str):
+        self.path = path
+
+
+async def endpoint(scope, receive, send):
+    # Stands in for the router, which records the matched route in the scope
+    scope["route"] = scope["bench_route"]
+    await send(START)
+    await send({"type": "http.response.body", "body": BODY})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+async def drive(app, scopes: list) -> float:
+    started = time.perf_counter()
+    for scope in scopes:
+        await app(dict(scope), receive, send)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--routes", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    routes = [Route(f"/api/v1/resource{i}/{{item_id}}") for i in range(args.routes)]
+    scopes = [
+        {"type": "http", "method": "GET", "path": f"/x/{i}", "bench_route": routes[i % len(routes)]}
+        for i in range(args.requests)
+    ]
+    registry = MetricsRegistry()
+    instrumented = RequestMetricsMiddleware(endpoint, registry)
+
+    # Best of several rounds, alternating so both see the same machine state
+    bare_best = wrapped_best = float("inf")
+    for _ in range(args.rounds):
+        bare_best = min(bare_best, asyncio.run(drive(endpoint, scopes)))
+        wrapped_best = min(wrapped_best, asyncio.run(drive(instrumented, scopes)))
+
+    per_request = (wrapped_best - bare_best) / args.requests * 1e6
+    print(f"{args.requests} requests over {args.routes} routes, best of {args.rounds} rounds")
+    print(f"bare endpoint        {bare_best / args.requests * 1e6:>7.2f} us/request")
+    print(f"with metrics         {wrapped_best / args.requests * 1e6:>7.2f} us/request")
+    print(f"middleware overhead  {per_request:>7.2f} us/request")
+
+    started = time.perf_counter()
+    text = registry.render()
+    print(f"render /metrics      {(time.perf_counter() - started) * 1000:>7.2f} ms ({len(text) // 1024} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""Throughput and latency percentiles of the main API flows.
+
+Drives main.app in-process through httpx's ASGI transport, with every
+middleware and the lifespan running, so the numbers cover the application
+and database without a server or network in between. Each scenario runs
+``--concurrency`` clients that pick targets from a Zipf distribution over a
+sample of the dataset, so a few hot posts take most of the traffic as they
+would in production. Scenarios:
+
+- list_posts: pages of the published listing, mostly the first few.
+- list_posts_by_tag: the listing filtered by one tag, popular tags first.
+- get_post_by_slug: one post by slug.
+- list_post_comments: the full comment tree of a post that has comments.
+- auth: log in, fetch /auth/me, refresh the token and log out.
+- upload: upload a freshly encoded JPEG of about 150 KB.
+
+Auth and upload are much slower per operation and run a tenth of
+``--requests``. The ASGI transport waits for background tasks, so image
+variants are switched off by default (MEDIA_VARIANT_WIDTHS=[]) to time
+what a client waits for.
+
+Runs against a temporary SQLite database unless DATABASE_URL is set. A
+database without users is first filled by benchmarks.dataset at ``--scale``;
+for MySQL or larger datasets, load it once with benchmarks.dataset and
+reuse it. Results are printed and, with ``--output``, saved as JSON;
+``--compare`` prints the change against an earlier results file.
+
+Usage (from the backend directory):
+    python -m benchmarks.scenarios [--scenario list_posts ...] [--requests 2000] [--concurrency 16]
+        [--scale small] [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+WORKDIR = tempfile.mkdtemp(prefix="scenario-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{WORKDIR}/bench.db")
+os.environ.setdefault("UPLOAD_DIR", f"{WORKDIR}/uploads")
+os.environ.setdefault("MEDIA_VARIANT_WIDTHS", "[]")
+os.environ["DEBUG"] = "false"
+
+import httpx  # noqa: E402
+from PIL import Image  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+
+from main import app  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.database import SessionLocal, engine  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.models import Post, PostStatus, Tag, User  # noqa: E402
+from benchmarks.dataset import PASSWORD, SCALES, load, row_counts, zipf_cum_weights  # noqa: E402
+
+API = settings.API_V1_PREFIX
+
+SCENARIOS = ("list_posts", "list_posts_by_tag", "get_post_by_slug", "list_post_comments", "auth", "upload")
+
+
+@dataclass
+class Targets:
+    """What the scenarios request, sampled from the dataset in popularity order."""
+
+    slugs: List[str]
+    commented_posts: List[int]
+    tags: List[str]
+    usernames: List[str]
+
+    @classmethod
+    def sample(cls, rng: random.Random, size: int) -> "Targets":
+        db = SessionLocal()
+        try:
+            max_post = db.scalar(select(Post.id).order_by(Post.id.desc()).limit(1)) or 0
+            ids = sorted(set(rng.randint(1, max_post) for _ in range(size))) if max_post else []
+            rows = []
+            for start in range(0, len(ids), 500):
+                rows += db.execute(
+                    select(Post.slug, Post.id, Post.comment_count)
+                    .where(Post.id.in_(ids[start:start + 500]), Post.status == PostStatus.PUBLISHED)
+                ).all()
+            # Popularity is unrelated to id
+            rng.shuffle(rows)
+            tags = db.scalars(select(Tag.slug).order_by(Tag.post_count.desc()).limit(size)).all()
+            users = db.scalar(select(func.max(User.id))) or 0
+        finally:
+            db.close()
+        return cls(
+            slugs=[row.slug for row in rows],
+            commented_posts=[row.id for row in rows if row.comment_count],
+            tags=list(tags),
+            usernames=[f"user{user_id}" for user_id in range(1, users + 1)],
+        )
+
+
+class Picker:
+    """Draws items with Zipf-distributed popularity, the first item most often."""
+
+    def __init__(self, items: list):
+        if not items:
+            raise RuntimeError("The dataset has nothing for this scenario to request")
+        self.items = items
+        self.cum_weights = zipf_cum_weights(len(items))
+
+    def __call__(self, rng: random.Random):
+        return rng.choices(self.items, cum_weights=self.cum_weights)[0]
+
+
+def make_jpeg(rng: random.Random) -> bytes:
+    # Noise barely compresses, which keeps the file near a photo's size
+    image = Image.frombytes("RGB", (480, 360), rng.randbytes(480 * 360 * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+Operation = Callable[[httpx.AsyncClient, random.Random], Awaitable[int]]
+
+
+def _status(response: httpx.Response) -> int:
+    return response.status_code
+
+
+def build_scenarios(targets: Targets, rng: random.Random) -> Dict[str, tuple]:
+    """Scenario name -> (operation, share of --requests it runs)."""
+    slugs = Picker(targets.slugs)
+    commented = Picker(targets.commented_posts)
+    tags = Picker(targets.tags)
+    pages = Picker(list(range(1, 21)))
+    # Bytes after the JPEG end marker make every upload a new blob
+    photos = [make_jpeg(rng) for _ in range(8)]
+
+    async def list_posts(client, rng):
+        return _status(await client.get(f"{API}/posts", params={"page": pages(rng), "size": 10}))
+
+    async def list_posts_by_tag(client, rng):
+        return _status(await client.get(f"{API}/posts", params={"tag": tags(rng), "size": 10}))
+
+    async def get_post_by_slug(client, rng):
+        return _status(await client.get(f"{API}/posts/slug/{slugs(rng)}"))
+
+    async def list_post_comments(client, rng):
+        return _status(await client.get(f"{API}/comments/post/{commented(rng)}"))
+
+    async def auth(client, rng):
+        username = rng.choice(targets.usernames)
+        response = await client.post(f"{API}/auth/login", data={"username": username, "password": PASSWORD})
+        if response.status_code != 200:
+            return response.status_code
+        tokens = response.json()
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        response = await client.get(f"{API}/auth/me", headers=headers)
+        if response.status_code != 200:
+            return response.status_code
+        response = await client.post(f"{API}/auth/refresh", params={"refresh_token": tokens["refresh_token"]})
+        if response.status_code != 200:
+            return response.status_code
+        tokens = response.json()
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        return _status(await client.post(
+            f"{API}/auth/logout", headers=headers, params={"refresh_token": tokens["refresh_token"]},
+        ))
+
+    # Uploads are timed without the login in front of them
+    upload_headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 1})}"}
+
+    async def upload(client, rng):
+        body = rng.choice(photos) + rng.randbytes(16)
+        return _status(await client.post(
+            f"{API}/media/upload", headers=upload_headers, files={"file": ("photo.jpg", body, "image/jpeg")},
+        ))
+
+    return {
+        "list_posts": (list_posts, 1.0),
+        "list_posts_by_tag": (list_posts_by_tag, 1.0),
+        "get_post_by_slug": (get_post_by_slug, 1.0),
+        "list_post_comments": (list_post_comments, 1.0),
+        "auth": (auth, 0.1),
+        "upload": (upload, 0.1),
+    }
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, operation: Operation, requests: int, concurrency: int, warmup: int, seed: int
+) -> dict:
+    warm_rng = random.Random(seed)
+    for _ in range(warmup):
+        await operation(client, warm_rng)
+
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    remaining = requests
+
+    async def worker(rng: random.Random) -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            code = await operation(client, rng)
+            latencies.append(time.perf_counter() - started)
+            statuses[code] = statuses.get(code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(random.Random(seed * 1000 + i)) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": sum(count for code, count in statuses.items() if code >= 400),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "seconds": round(elapsed, 3),
+        "req_per_s": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2),
+    }
+
+
+async def run(args, scenarios: Dict[str, tuple]) -> Dict[str, dict]:
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+            for name in args.scenario:
+                operation, share = scenarios[name]
+                requests = max(1, int(args.requests * share))
+                warmup = min(args.warmup, requests)
+                results[name] = await run_scenario(
+                    client, operation, requests, args.concurrency, warmup, args.seed,
+                )
+                print_row(name, results[name])
+    return results
+
+
+def print_row(name: str, result: dict) -> None:
+    print(
+        f"{name:<20} {result['req_per_s']:>9.1f} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+        f"{result['p99_ms']:>9.2f} {result['errors']:>7}"
+    )
+
+
+def compare(baseline: dict, results: Dict[str, dict]) -> None:
+    print(f"\nAgainst {baseline['started_at']} ({baseline.get('commit') or 'unknown commit'}):")
+    print(f"{'scenario':<20} {'req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, result in results.items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        changes = [
+            f"{(result[key] - before[key]) / before[key] * 100:>+8.1f}%" if before[key] else f"{'n/a':>9}"
+            for key in ("req_per_s", "p50_ms", "p95_ms", "p99_ms")
+        ]
+        print(f"{name:<20} {' '.join(changes)}")
+
+
+def current_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=50, help="untimed operations before each scenario")
+    parser.add_argument("--targets", type=int, default=5000, help="posts and tags sampled as request targets")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small", help="dataset to load into an empty database")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="print the change against this earlier results file")
+    args = parser.parse_args()
+
+    try:
+        if not row_counts()["users"]:
+            print(f"Loading the {args.scale} dataset")
+            load(SCALES[args.scale])
+        dataset = row_counts()
+
+        rng = random.Random(args.seed)
+        scenarios = build_scenarios(Targets.sample(rng, args.targets), rng)
+
+        print(f"{engine.dialect.name}, {dataset['posts']} posts, {dataset['comments']} comments, "
+              f"concurrency {args.concurrency}")
+        print(f"{'scenario':<20} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        results = asyncio.run(run(args, scenarios))
+
+        report = {
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": current_commit(),
+            "database": engine.dialect.name,
+            "python": platform.python_version(),
+            "machine": {"platform": platform.platform(), "cpus": os.cpu_count()},
+            "options": {
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "warmup": args.warmup,
+                "targets": args.targets,
+                "seed": args.seed,
+            },
+            "dataset": dataset,
+            "scenarios": results,
+        }
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"Saved results to {args.output}")
+        if args.compare:
+            with open(args.compare) as f:
+                compare(json.load(f), results)
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Latency of typeahead lookups on a synthetic corpus of post titles.
+
+Builds a PrefixIndex over generated titles (Zipf-distributed words, random
+popularity) and times single-word prefixes of every length as well as
+multi-word queries, then reports percentiles per query type.
+
+Usage (from the backend directory):
+    python -m benchmarks.suggest [--titles 100000] [--queries 20000] [--seed 1]
+"""
+import argparse
+import random
+import string
+import time
+
+from app.services.suggest import PrefixIndex
+
+
+def make_vocabulary(rng: random.Random, size: int) -> list:
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10))))
+    return sorted(words)
+
+
+def make_titles(rng: random.Random, vocabulary: list, count: int) -> list:
+    # Zipf-like weights: a few very common words, a long tail of rare ones
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    return [" ".join(rng.choices(vocabulary, weights=weights, k=rng.randint(3, 9))) for _ in range(count)]
+
+
+def make_queries(rng: random.Random, titles: list, count: int) -> dict:
+    queries = {"prefix 1-3": [], "prefix 4+": [], "multi-word": []}
+    while min(len(q) for q in queries.values()) < count // 3:
+        words = rng.choice(titles).split()
+        word = rng.choice(words)
+        cut = rng.randint(1, len(word))
+        kind = "prefix 1-3" if cut <= 3 else "prefix 4+"
+        queries[kind].append(word[:cut])
+        start = rng.randrange(len(words) - 1)
+        last = words[start + 1]
+        queries["multi-word"].append(f"{words[start]} {last[:rng.randint(1, len(last))]}")
+    return {kind: values[:count // 3] for kind, values in queries.items()}
+
+
+def percentile(samples: list, fraction: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--titles", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    titles = make_titles(rng, make_vocabulary(rng, 50_000), args.titles)
+
+    index = PrefixIndex()
+    started = time.perf_counter()
+    index.load((i, title, f"post-{i}", rng.randint(0, 100_000)) for i, title in enumerate(titles, 1))
+    print(f"Indexed {len(titles)} titles in {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    for i in range(1, 1001):
+        index.upsert(i, titles[-i], f"post-{i}", rng.randint(0, 100_000))
+    print(f"1000 incremental updates: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    print(f"{'query':<12} {'p50 us':>8} {'p99 us':>8} {'max us':>8}")
+    for kind, queries in make_queries(rng, titles, args.queries).items():
+        samples = []
+        for query in queries:
+            started = time.perf_counter_ns()
+            index.suggest(query, 10)
+            samples.append((time.perf_counter_ns() - started) / 1000)
+        samples.sort()
+        print(f"{kind:<12} {percentile(samples, 0.5):>8.1f} {percentile(samples, 0.99):>8.1f} {samples[-1]:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
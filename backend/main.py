@@ -1,12 +1,36 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from app.core.auth_cache import token_cache, user_cache
 from app.core.config import settings
-from app.core.database import Base, engine
-from app.api.v1 import auth, posts, comments, categories, tags, media
+from app.core.database import Base, async_engine, engine
+from app.core.metrics import CONTENT_TYPE, RequestMetricsMiddleware, metrics_registry
+from app.core.query_budget import QueryBudgetMiddleware
+from app.core.replicas import ReadYourWritesMiddleware, replica_router
+from app.core.security import PasswordHasherBusy, password_hasher
+from app.api.v1 import admin, auth, posts, comments, categories, tags, media, suggest
+from app.api.v1.posts import post_count_cache
+from app.services.image_variants import variant_pipeline
+from app.services.post_cache import post_cache
+from app.services.view_counter import view_counter
 
 # Create tables
 Base.metadata.create_all(bind=engine)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    view_counter.start()
+    replica_router.start()
+    yield
+    # Flush buffered view counts before the process exits
+    view_counter.stop()
+    variant_pipeline.shutdown()
+    await replica_router.stop()
+    await async_engine.dispose()
+
+
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
@@ -14,6 +38,7 @@ app = FastAPI(
     openapi_url=f"{settings.API_V1_PREFIX}/openapi.json",
     docs_url=f"{settings.API_V1_PREFIX}/docs",
     redoc_url=f"{settings.API_V1_PREFIX}/redoc",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -25,6 +50,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Keep a client's reads on the primary briefly after it writes
+app.add_middleware(ReadYourWritesMiddleware, router=replica_router)
+
+# Count queries per request, flag N+1 patterns and routes over their budget
+app.add_middleware(
+    QueryBudgetMiddleware,
+    mode=settings.QUERY_BUDGET_MODE,
+    default_budget=settings.QUERY_BUDGET_DEFAULT,
+    repeat_threshold=settings.QUERY_REPEAT_THRESHOLD,
+)
+
+# Request metrics wrap everything else, so they see the final status and size
+if settings.METRICS_ENABLED:
+    app.add_middleware(RequestMetricsMiddleware, registry=metrics_registry)
+
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Authentication service is busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+
 # Include routers
 app.include_router(auth.router, prefix=f"{settings.API_V1_PREFIX}/auth", tags=["auth"])
 app.include_router(posts.router, prefix=f"{settings.API_V1_PREFIX}/posts", tags=["posts"])
@@ -32,6 +82,8 @@ app.include_router(comments.router, prefix=f"{settings.API_V1_PREFIX}/comments",
 app.include_router(categories.router, prefix=f"{settings.API_V1_PREFIX}/categories", tags=["categories"])
 app.include_router(tags.router, prefix=f"{settings.API_V1_PREFIX}/tags", tags=["tags"])
 app.include_router(media.router, prefix=f"{settings.API_V1_PREFIX}/media", tags=["media"])
+app.include_router(suggest.router, prefix=f"{settings.API_V1_PREFIX}/suggest", tags=["suggest"])
+app.include_router(admin.router, prefix=f"{settings.API_V1_PREFIX}/admin", tags=["admin"])
 
 
 @app.get("/")
@@ -43,9 +95,38 @@ def root():
     }
 
 
+# Sources reported on /metrics besides requests and the database pools
+metrics_registry.add_cache("post", post_cache)
+metrics_registry.add_cache("post_count", post_count_cache)
+metrics_registry.add_cache("auth_token", token_cache)
+metrics_registry.add_cache("auth_user", user_cache)
+metrics_registry.add_collector(replica_router.collect)
+metrics_registry.add_value(
+    "view_counter_pending_increments", "gauge", "Post views not yet written to the database.",
+    lambda: view_counter.pending,
+)
+metrics_registry.add_value(
+    "password_hash_rejected_total", "counter", "Hash operations refused because the queue was full.",
+    lambda: password_hasher.rejected,
+)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+    return Response(metrics_registry.render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "pending_view_increments": view_counter.pending,
+        "post_cache": post_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "read_replicas": replica_router.stats(),
+    }
 
 
 if __name__ == "__main__":
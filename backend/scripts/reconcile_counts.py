@@ -0,0 +1,24 @@
+"""Recompute denormalized counters (posts.comment_count, tag/category post_count).
+
+Usage (from the backend directory):
+    python -m scripts.reconcile_counts
+"""
+from app.core.database import SessionLocal
+from app.services.counters import reconcile_counts
+from app.services.taxonomy import category_cache, tag_cache
+
+
+def main() -> None:
+    db = SessionLocal()
+    try:
+        reconcile_counts(db)
+    finally:
+        db.close()
+    # Lets running workers pick up the new counts when TAXONOMY_SYNC_BACKEND is shared
+    category_cache.invalidate()
+    tag_cache.invalidate()
+    print("Counters reconciled")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""Move media stored under per-upload filenames into content-addressed blobs.
+
+Usage (from the backend directory):
+    python -m scripts.rehash_media
+"""
+from app.core.database import SessionLocal
+from app.services.media_storage import migrate_to_blobs
+
+
+def main() -> None:
+    db = SessionLocal()
+    try:
+        migrated, missing = migrate_to_blobs(db)
+    finally:
+        db.close()
+    print(f"Migrated {migrated} media files, {missing} missing")
+
+
+if __name__ == "__main__":
+    main()
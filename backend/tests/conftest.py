@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+# Settings are read at import, so the test environment goes in first
+WORKDIR = tempfile.mkdtemp(prefix="myblog-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{WORKDIR}/test.db",
+    UPLOAD_DIR=f"{WORKDIR}/uploads",
+    DEBUG="false",
+    BCRYPT_ROUNDS="4",
+    QUERY_BUDGET_MODE="raise",
+    MEDIA_VARIANT_WIDTHS="[]",
+    VIEW_COUNT_FLUSH_INTERVAL="3600",
+)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from main import app  # noqa: E402
+from app.api.v1.posts import post_count_cache  # noqa: E402
+from app.core.auth_cache import token_cache, user_cache  # noqa: E402
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.core.query_budget import capture_queries  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.models import Category, Post, PostStatus, Tag, User, UserRole  # noqa: E402
+from app.services.post_cache import post_cache  # noqa: E402
+from app.services.taxonomy import category_cache, tag_cache  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
+    shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def clean_database():
+    """Empty every table and drop what the caches remember of earlier tests."""
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    for cache in (post_cache, token_cache, user_cache):
+        cache.clear()
+    post_count_cache.invalidate()
+    category_cache.invalidate()
+    tag_cache.invalidate()
+    yield
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def max_queries():
+    """Fails the test if the block runs more statements than ``limit``::
+
+        with max_queries(3) as queries:
+            client.get("/api/v1/posts")
+
+    Counts what every engine runs, including the app's async engine.
+    """
+
+    @contextmanager
+    def check(limit: int):
+        with capture_queries() as queries:
+            yield queries
+        assert queries.count <= limit, (
+            f"{queries.count} queries, expected at most {limit}:\n" + "\n".join(queries.shapes)
+        )
+
+    return check
+
+
+def _author(db) -> User:
+    author = db.query(User).filter(User.username == "author").first()
+    if author is None:
+        author = User(username="author", email="author@example.com", role=UserRole.AUTHOR)
+        db.add(author)
+        db.commit()
+    return author
+
+
+@pytest.fixture
+def author_headers(db):
+    """Bearer token of the author that ``make_posts`` writes as."""
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': _author(db).id})}"}
+
+
+@pytest.fixture
+def make_posts(db):
+    """Creates published posts by one author, each with two categories and three tags."""
+
+    def make(count: int) -> list:
+        author = _author(db)
+        categories, tags = db.query(Category).all(), db.query(Tag).all()
+        if not categories:
+            categories = [Category(name=f"Category {i}", slug=f"category-{i}") for i in range(2)]
+            tags = [Tag(name=f"Tag {i}", slug=f"tag-{i}") for i in range(3)]
+            db.add_all([*categories, *tags])
+        start = db.query(Post).count()
+        posts = [
+            Post(
+                title=f"Post {i}",
+                slug=f"post-{i}",
+                content="Body",
+                status=PostStatus.PUBLISHED,
+                author=author,
+                categories=categories,
+                tags=tags,
+            )
+            for i in range(start, start + count)
+        ]
+        db.add_all(posts)
+        db.commit()
+        post_count_cache.invalidate()
+        category_cache.invalidate()
+        tag_cache.invalidate()
+        return posts
+
+    return make
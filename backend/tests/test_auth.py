@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+
+from app.api.v1 import auth as auth_api
+from app.core import deps
+from app.core.auth_cache import user_cache
+from app.core.revocation import InMemoryRevocationStore
+from app.core.security import PasswordHasher, PasswordHasherBusy
+from app.models import User, UserRole
+
+
+def test_register_then_login(client):
+    credentials = {"username": "reader", "email": "reader@example.com", "password": "secret123"}
+    registered = client.post("/api/v1/auth/register", json=credentials)
+    assert registered.status_code == 200, registered.text
+
+    logged_in = client.post("/api/v1/auth/login", data={"username": "reader", "password": "secret123"})
+    wrong = client.post("/api/v1/auth/login", data={"username": "reader", "password": "wrong"})
+
+    assert logged_in.status_code == 200
+    assert logged_in.json()["user"]["username"] == "reader"
+    assert wrong.status_code == 401
+
+
+def _register(client, username: str = "reader") -> dict:
+    credentials = {"username": username, "email": f"{username}@example.com", "password": "secret123"}
+    return client.post("/api/v1/auth/register", json=credentials).json()
+
+
+def test_updating_a_user_row_evicts_the_cached_principal(client, db):
+    tokens = _register(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    user_id = tokens["user"]["id"]
+
+    assert client.get("/api/v1/auth/me", headers=headers).json()["role"] == "user"
+    assert user_cache.get(str(user_id)) is not None
+
+    user = db.get(User, user_id)
+    user.role = UserRole.AUTHOR
+    db.commit()
+
+    assert user_cache.get(str(user_id)) is None
+    assert client.get("/api/v1/auth/me", headers=headers).json()["role"] == "author"
+
+    db.delete(user)
+    db.commit()
+
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 401
+
+
+def test_reusing_a_refresh_token_revokes_every_session_of_the_user(client, monkeypatch):
+    # A fresh store, so the user-wide cutoff does not outlive this test
+    store = InMemoryRevocationStore()
+    monkeypatch.setattr(auth_api, "revocation_store", store)
+    monkeypatch.setattr(deps, "revocation_store", store)
+
+    first = _register(client)
+    other_session = client.post("/api/v1/auth/login", data={"username": "reader", "password": "secret123"}).json()
+
+    rotated = client.post("/api/v1/auth/refresh", params={"refresh_token": first["refresh_token"]})
+    assert rotated.status_code == 200
+    rotated = rotated.json()
+
+    reused = client.post("/api/v1/auth/refresh", params={"refresh_token": first["refresh_token"]})
+    assert reused.status_code == 401
+    assert reused.json()["detail"] == "Refresh token reuse detected"
+
+    for tokens in (first, other_session, rotated):
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        assert client.get("/api/v1/auth/me", headers=headers).status_code == 401
+        refreshed = client.post("/api/v1/auth/refresh", params={"refresh_token": tokens["refresh_token"]})
+        assert refreshed.status_code == 401
+
+    # Signing in again afterwards works
+    fresh = client.post("/api/v1/auth/login", data={"username": "reader", "password": "secret123"}).json()
+    headers = {"Authorization": f"Bearer {fresh['access_token']}"}
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+
+
+def test_hasher_rejects_beyond_its_slots_and_frees_them_when_done():
+    hasher = PasswordHasher(workers=1, max_pending=0)
+    release = threading.Event()
+    busy = hasher._run("hash", release.wait)
+
+    with pytest.raises(PasswordHasherBusy):
+        hasher._run("hash", release.wait)
+    release.set()
+    busy.result()
+
+    assert hasher._run("hash", lambda: "done").result() == "done"
+    assert hasher.stats()["rejected"] == 1
@@ -0,0 +1,124 @@
+import pytest
+
+from app.api.v1 import tags
+from app.core import cache as cache_module
+from app.core.cache import LocalSharedClient, LRUCache, SharedCache
+from app.core.database import SessionLocal
+from app.core.security import create_access_token
+from app.models import Tag, User, UserRole
+from app.services.post_cache import get_cached_post, invalidate_posts, post_cache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    return clock
+
+
+def _caches():
+    return [LRUCache(max_size=10, ttl=30), SharedCache(LocalSharedClient(), ttl=30, prefix="test:")]
+
+
+@pytest.mark.parametrize("cache", _caches(), ids=["lru", "shared"])
+def test_entries_expire_after_their_ttl(cache, clock):
+    cache.set("default", "a")
+    cache.set("short", "b", ttl=5)
+
+    clock.now += 10
+    assert cache.get("short") is None
+    assert cache.get("default") == "a"
+
+    clock.now += 30
+    assert cache.get("default") is None
+
+
+@pytest.mark.parametrize("cache", _caches(), ids=["lru", "shared"])
+def test_hits_and_misses_are_counted(cache, clock):
+    cache.set("key", "value")
+    cache.get("key")
+    cache.get("key")
+    cache.get("missing")
+
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_lru_evicts_the_least_recently_used_entry(clock):
+    cache = LRUCache(max_size=2, ttl=30)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats() == {"hits": 3, "misses": 1, "evictions": 1, "size": 2}
+
+
+def test_lru_counts_expired_entries_as_evictions(clock):
+    cache = LRUCache(max_size=2, ttl=30)
+    cache.set("a", 1)
+    clock.now += 60
+
+    assert cache.get("a") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_shared_cache_delete_and_clear_stay_within_its_prefix():
+    client = LocalSharedClient()
+    cache, other = SharedCache(client, ttl=30, prefix="one:"), SharedCache(client, ttl=30, prefix="two:")
+    for shared in (cache, other):
+        shared.set("a", "1")
+        shared.set("b", "2")
+
+    cache.delete("a")
+    assert (cache.get("a"), cache.get("b"), other.get("a")) == (None, "2", "1")
+    cache.clear()
+    assert (cache.get("b"), other.get("b")) == (None, "2")
+
+
+def test_post_edits_invalidate_by_id_and_slug(client, make_posts, author_headers):
+    post = make_posts(1)[0]
+    post_id, old_slug = post.id, post.slug
+    client.get(f"/api/v1/posts/slug/{old_slug}")
+    assert get_cached_post(slug=old_slug)["id"] == post_id
+
+    response = client.put(f"/api/v1/posts/{post_id}", json={"title": "Renamed"}, headers=author_headers)
+    new_slug = response.json()["slug"]
+
+    assert get_cached_post(post_id=post_id) is None
+    assert post_cache.get(f"slug:{old_slug}") is None
+    assert client.get(f"/api/v1/posts/slug/{old_slug}").status_code == 404
+    assert client.get(f"/api/v1/posts/slug/{new_slug}").json()["title"] == "Renamed"
+
+
+def test_deleting_a_tag_invalidates_its_posts_after_the_commit(client, db, make_posts, monkeypatch):
+    post_id = make_posts(1)[0].id
+    tag_id = db.query(Tag.id).filter(Tag.slug == "tag-0").scalar()
+    admin = User(username="admin", email="admin@example.com", role=UserRole.ADMIN)
+    db.add(admin)
+    db.commit()
+    client.get(f"/api/v1/posts/{post_id}")
+    assert get_cached_post(post_id=post_id) is not None
+
+    committed = []
+
+    def invalidate(posts):
+        with SessionLocal() as session:
+            committed.append(session.get(Tag, tag_id) is None)
+        invalidate_posts(posts)
+
+    monkeypatch.setattr(tags, "invalidate_posts", invalidate)
+    token = create_access_token(data={"sub": admin.id})
+    client.delete(f"/api/v1/tags/{tag_id}", headers={"Authorization": f"Bearer {token}"})
+
+    assert committed == [True]
+    assert get_cached_post(post_id=post_id) is None
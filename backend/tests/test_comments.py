@@ -0,0 +1,94 @@
+from app.core.query_budget import capture_queries
+from app.models import Comment, Post
+from app.models.comment import path_segment
+
+
+def _auth(client) -> dict:
+    response = client.post(
+        "/api/v1/auth/register",
+        json={"username": "commenter", "email": "commenter@example.com", "password": "secret123"},
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def _thread(client, post_id: int, headers: dict) -> dict:
+    """Two top-level comments; the older one has replies three levels deep."""
+
+    def comment(parent_id=None) -> int:
+        body = {"post_id": post_id, "content": "Text", "parent_id": parent_id}
+        return client.post("/api/v1/comments", json=body, headers=headers).json()["id"]
+
+    ids = {"old": comment()}
+    ids["reply"] = comment(ids["old"])
+    ids["second_reply"] = comment(ids["old"])
+    ids["nested"] = comment(ids["reply"])
+    ids["deepest"] = comment(ids["nested"])
+    ids["new"] = comment()
+    return ids
+
+
+def _shape(nodes: list) -> list:
+    return [(node["id"], _shape(node["replies"])) for node in nodes]
+
+
+def test_comment_tree_is_one_query_at_any_depth(client, make_posts):
+    post_id = make_posts(1)[0].id
+    ids = _thread(client, post_id, _auth(client))
+
+    with capture_queries() as queries:
+        tree = client.get(f"/api/v1/comments/post/{post_id}").json()
+
+    assert queries.count == 1, queries.shapes
+    # Newest thread first, replies oldest first
+    assert _shape(tree) == [
+        (ids["new"], []),
+        (ids["old"], [
+            (ids["reply"], [(ids["nested"], [(ids["deepest"], [])])]),
+            (ids["second_reply"], []),
+        ]),
+    ]
+
+
+def test_comment_tree_stops_at_max_depth(client, make_posts):
+    post_id = make_posts(1)[0].id
+    ids = _thread(client, post_id, _auth(client))
+
+    def tree(**params) -> list:
+        return _shape(client.get(f"/api/v1/comments/post/{post_id}", params=params).json())
+
+    assert tree(max_depth=0) == [(ids["new"], []), (ids["old"], [])]
+    assert tree(max_depth=1) == [
+        (ids["new"], []),
+        (ids["old"], [(ids["reply"], []), (ids["second_reply"], [])]),
+    ]
+    assert tree(max_depth=1, size=1, page=2) == [(ids["old"], [(ids["reply"], []), (ids["second_reply"], [])])]
+
+    replies = client.get(f"/api/v1/comments/{ids['old']}/replies", params={"max_depth": 2}).json()
+    assert [item["id"] for item in replies["items"]] == [ids["reply"], ids["nested"], ids["second_reply"]]
+
+
+def test_deleting_a_comment_keeps_its_replies_as_top_level_threads(client, db, make_posts):
+    post_id = make_posts(1)[0].id
+    headers = _auth(client)
+
+    def comment(parent_id=None) -> int:
+        body = {"post_id": post_id, "content": "Text", "parent_id": parent_id}
+        return client.post("/api/v1/comments", json=body, headers=headers).json()["id"]
+
+    root = comment()
+    reply = comment(root)
+    nested = comment(reply)
+
+    assert client.delete(f"/api/v1/comments/{root}", headers=headers).status_code == 204
+
+    assert db.get(Comment, root) is None
+    promoted, child = db.get(Comment, reply), db.get(Comment, nested)
+    assert (promoted.parent_id, promoted.depth, promoted.path) == (None, 0, path_segment(reply))
+    assert (child.parent_id, child.depth, child.path) == (reply, 1, path_segment(reply) + path_segment(nested))
+    assert db.get(Post, post_id).comment_count == 2
+
+    tree = client.get(f"/api/v1/comments/post/{post_id}").json()
+    assert [node["id"] for node in tree] == [reply]
+    assert [node["id"] for node in tree[0]["replies"]] == [nested]
+    replies = client.get(f"/api/v1/comments/{reply}/replies").json()
+    assert [item["id"] for item in replies["items"]] == [nested]
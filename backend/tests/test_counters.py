@@ -0,0 +1,78 @@
+from datetime import datetime
+
+from sqlalchemy import update
+
+from app.models import Category, Post, Tag
+from app.services.counters import reconcile_counts
+
+EDITED_AT = datetime(2020, 1, 1)
+
+
+def _counts(db, model) -> dict:
+    db.expire_all()
+    return {row.slug: row.post_count for row in db.query(model)}
+
+
+def test_post_counts_follow_publish_unpublish_and_taxonomy_changes(client, db, make_posts, author_headers):
+    make_posts(1)
+    category = db.query(Category).filter(Category.slug == "category-0").one()
+    assert _counts(db, Category) == {"category-0": 0, "category-1": 0}  # make_posts bypasses the API
+
+    draft = client.post(
+        "/api/v1/posts",
+        json={"title": "Draft", "content": "Body", "category_ids": [category.id], "tag_ids": []},
+        headers=author_headers,
+    ).json()
+    assert _counts(db, Category)["category-0"] == 0
+
+    client.put(f"/api/v1/posts/{draft['id']}", json={"status": "published"}, headers=author_headers)
+    assert _counts(db, Category)["category-0"] == 1
+
+    tag = db.query(Tag).filter(Tag.slug == "tag-0").one()
+    client.put(f"/api/v1/posts/{draft['id']}", json={"category_ids": [], "tag_ids": [tag.id]}, headers=author_headers)
+    assert _counts(db, Category)["category-0"] == 0
+    assert _counts(db, Tag)["tag-0"] == 1
+
+    client.put(f"/api/v1/posts/{draft['id']}", json={"status": "draft"}, headers=author_headers)
+    assert _counts(db, Tag)["tag-0"] == 0
+
+
+def test_deleting_a_comment_decrements_the_post_count(client, db, make_posts, author_headers):
+    post_id = make_posts(1)[0].id
+    ids = [
+        client.post("/api/v1/comments", json={"post_id": post_id, "content": "Text"}, headers=author_headers).json()["id"]
+        for _ in range(2)
+    ]
+    assert db.get(Post, post_id).comment_count == 2
+
+    client.delete(f"/api/v1/comments/{ids[0]}", headers=author_headers)
+
+    db.expire_all()
+    assert db.get(Post, post_id).comment_count == 1
+
+
+def test_reconcile_fixes_drifted_counters(client, db, make_posts, author_headers):
+    post_id = make_posts(1)[0].id
+    client.post("/api/v1/comments", json={"post_id": post_id, "content": "Text"}, headers=author_headers)
+    db.execute(update(Post).values(comment_count=7))
+    db.execute(update(Tag).values(post_count=5))
+    db.commit()
+
+    reconcile_counts(db)
+
+    db.expire_all()
+    assert db.get(Post, post_id).comment_count == 1
+    assert set(_counts(db, Tag).values()) == {1}
+
+
+def test_counter_updates_keep_updated_at(client, db, make_posts, author_headers):
+    post_id = make_posts(1)[0].id
+    db.execute(update(Post).values(updated_at=EDITED_AT))
+    db.commit()
+
+    comment = client.post("/api/v1/comments", json={"post_id": post_id, "content": "Text"}, headers=author_headers)
+    client.delete(f"/api/v1/comments/{comment.json()['id']}", headers=author_headers)
+    reconcile_counts(db)
+
+    db.expire_all()
+    assert db.get(Post, post_id).updated_at.replace(tzinfo=None) == EDITED_AT
@@ -0,0 +1,151 @@
+import asyncio
+import io
+import os
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+
+from app.core.config import settings
+from app.models.media import Media, MediaBlob, MediaVariant
+from app.services.image_variants import VariantPipeline, variant_pipeline
+from app.services.media_storage import CHUNK_SIZE, blob_path, release_blob, store_upload, temp_dir
+
+PNG = b"\x89PNG\r\n\x1a\n" + os.urandom(1024)
+
+
+def _auth(client) -> dict:
+    response = client.post(
+        "/api/v1/auth/register",
+        json={"username": "uploader", "email": "uploader@example.com", "password": "secret123"},
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def _upload(client, headers) -> dict:
+    response = client.post("/api/v1/media/upload", headers=headers, files={"file": ("a.png", PNG, "image/png")})
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_duplicate_uploads_share_one_blob_until_both_are_deleted(client, db):
+    headers = _auth(client)
+    first, second = _upload(client, headers), _upload(client, headers)
+
+    path = Path(first["filepath"])
+    assert second["filepath"] == first["filepath"] == str(blob_path(first["checksum"]))
+    assert db.get(MediaBlob, first["checksum"]).refcount == 2
+
+    assert client.delete(f"/api/v1/media/{first['id']}", headers=headers).status_code == 204
+    assert path.exists()
+
+    assert client.delete(f"/api/v1/media/{second['id']}", headers=headers).status_code == 204
+    assert not path.exists()
+    assert db.get(MediaBlob, first["checksum"]) is None
+
+
+def test_released_blob_survives_a_rolled_back_delete(client, db):
+    uploaded = _upload(client, _auth(client))
+    media = db.get(Media, uploaded["id"])
+
+    orphan = release_blob(db, media)
+    db.rollback()
+
+    assert orphan == Path(uploaded["filepath"])
+    assert orphan.exists()
+    assert db.get(MediaBlob, uploaded["checksum"]).refcount == 1
+
+
+def _png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 32), "red").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_uploads_of_the_same_image_share_their_variants(client, db, monkeypatch):
+    monkeypatch.setattr(variant_pipeline, "widths", [16])
+    monkeypatch.setattr(variant_pipeline, "formats", ["png"])
+    loops = []
+    find = VariantPipeline._find
+
+    def recording_find(*args):
+        try:
+            loops.append(asyncio.get_running_loop())
+        except RuntimeError:
+            loops.append(None)
+        return find(*args)
+
+    monkeypatch.setattr(VariantPipeline, "_find", staticmethod(recording_find))
+    headers = _auth(client)
+    image = _png()
+    first, second = (
+        client.post("/api/v1/media/upload", headers=headers, files={"file": ("a.png", image, "image/png")}).json()
+        for _ in range(2)
+    )
+
+    variants = [
+        client.get(f"/api/v1/media/{media['id']}/variants/16", headers=headers).json() for media in (first, second)
+    ]
+
+    assert variants[0] == variants[1]
+    assert variants[0]["height"] == 8
+    assert db.query(MediaVariant).count() == 1
+    assert set(loops) == {None}
+    assert client.get(variants[0]["url"]).content == Path(variants[0]["filepath"]).read_bytes()
+
+    client.delete(f"/api/v1/media/{first['id']}", headers=headers)
+    assert Path(variants[0]["filepath"]).exists()
+    client.delete(f"/api/v1/media/{second['id']}", headers=headers)
+    assert not Path(variants[0]["filepath"]).exists()
+    assert db.query(MediaVariant).count() == 0
+
+
+def test_new_encoder_settings_rerender_the_variant_under_a_new_etag(client, monkeypatch):
+    monkeypatch.setattr(variant_pipeline, "widths", [16])
+    monkeypatch.setattr(variant_pipeline, "formats", ["png"])
+    headers = _auth(client)
+    media = client.post("/api/v1/media/upload", headers=headers, files={"file": ("a.png", _png(), "image/png")}).json()
+    url = f"/api/v1/media/{media['id']}/variants/16/file"
+    before = client.get(url)
+
+    monkeypatch.setattr(variant_pipeline, "encoding", "r1q50")
+    after = client.get(url, headers={"If-None-Match": before.headers["etag"]})
+
+    assert after.status_code == 200
+    assert after.headers["etag"] != before.headers["etag"]
+    assert "r1q50" in after.headers["etag"]
+
+
+def test_srcset_describes_rendered_widths(client, monkeypatch):
+    monkeypatch.setattr(variant_pipeline, "widths", [16, 128, 256])
+    monkeypatch.setattr(variant_pipeline, "formats", ["png"])
+    headers = _auth(client)
+    uploaded = client.post("/api/v1/media/upload", headers=headers, files={"file": ("a.png", _png(), "image/png")})
+
+    media = client.get(f"/api/v1/media/{uploaded.json()['id']}", headers=headers).json()
+
+    assert [variant["rendered_width"] for variant in media["variants"]] == [16, 64, 64]
+    entries = media["srcset"]["png"].split(", ")
+    assert [entry.rsplit(" ", 1)[1] for entry in entries] == ["16w", "64w"]
+    assert "/variants/128/" in entries[1]
+
+
+def test_upload_over_the_limit_is_rejected_mid_stream_without_a_leftover_part_file(client, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", CHUNK_SIZE + 1)
+    # No declared size, so only the streamed byte count can catch it
+    stream = io.BytesIO(PNG[:8] + os.urandom(3 * CHUNK_SIZE))
+    upload = UploadFile(file=stream, filename="big.png")
+
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(store_upload(upload))
+
+    assert rejected.value.status_code == 413
+    assert stream.tell() == 2 * CHUNK_SIZE  # stopped at the chunk that crossed the limit
+    assert not list(temp_dir().glob("*.part"))
+
+    response = client.post(
+        "/api/v1/media/upload", headers=_auth(client), files={"file": ("big.png", stream.getvalue(), "image/png")}
+    )
+    assert response.status_code == 413
+    assert not list(temp_dir().glob("*.part"))
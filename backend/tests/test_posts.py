@@ -0,0 +1,99 @@
+from typing import Optional, Tuple
+
+from app.core.query_budget import capture_queries
+
+RELATION_FIELDS = "id,author,categories,tags,category_ids,tag_ids"
+
+
+def _list_queries(client, size: int, fields: Optional[str] = None) -> Tuple[int, list]:
+    """Queries run to list one page of ``size`` posts, and the page."""
+    params = {"size": size}
+    if fields:
+        params["fields"] = fields
+    with capture_queries() as queries:
+        response = client.get("/api/v1/posts", params=params)
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert len(items) == size
+    return queries.count, items
+
+
+def test_list_posts_query_count_is_flat_in_page_size(client, make_posts):
+    make_posts(10)
+    small, items = _list_queries(client, 10, RELATION_FIELDS)
+    make_posts(90)
+    large, _ = _list_queries(client, 100, RELATION_FIELDS)
+
+    assert small == large
+    assert items[0]["author"]["username"] == "author"
+    assert len(items[0]["categories"]) == 2
+    assert len(items[0]["tag_ids"]) == 3
+
+
+def test_list_posts_default_fields_query_count_is_flat(client, make_posts):
+    make_posts(10)
+    small, _ = _list_queries(client, 10)
+    make_posts(90)
+    large, _ = _list_queries(client, 100)
+
+    assert small == large
+
+
+def test_post_detail_includes_author_and_taxonomy(client, make_posts, max_queries):
+    post_id = make_posts(1)[0].id
+
+    with max_queries(4):
+        post = client.get(f"/api/v1/posts/{post_id}").json()
+
+    assert post["author"]["username"] == "author"
+    assert sorted(post["category_ids"]) == [1, 2]
+    assert [tag["slug"] for tag in post["tags"]] == ["tag-0", "tag-1", "tag-2"]
+
+
+def test_list_posts_runs_four_queries_at_any_page_size(client, make_posts):
+    make_posts(100)
+    client.get("/api/v1/posts")  # caches the total
+
+    # The page itself, then one batched load each for author, categories and tags
+    assert _list_queries(client, 10, RELATION_FIELDS)[0] == 4
+    assert _list_queries(client, 100, RELATION_FIELDS)[0] == 4
+
+
+def test_update_without_taxonomy_ids_keeps_categories_and_tags(client, make_posts, author_headers):
+    post_id = make_posts(1)[0].id
+
+    response = client.put(f"/api/v1/posts/{post_id}", json={"content": "Edited"}, headers=author_headers)
+
+    post = client.get(f"/api/v1/posts/{post_id}").json()
+    assert response.status_code == 200
+    assert post["content"] == "Edited"
+    assert len(post["category_ids"]) == 2
+    assert len(post["tag_ids"]) == 3
+
+
+def test_list_posts_returns_only_the_requested_fields(client, make_posts):
+    make_posts(2)
+
+    with capture_queries() as queries:
+        items = client.get("/api/v1/posts", params={"fields": "id,title"}).json()["items"]
+
+    assert [sorted(item) for item in items] == [["id", "title"], ["id", "title"]]
+    # Unselected columns are not read either
+    assert not any("posts.content" in shape for shape in queries.shapes)
+
+
+def test_list_posts_leaves_content_out_by_default(client, make_posts):
+    make_posts(1)
+
+    default = client.get("/api/v1/posts").json()["items"][0]
+    with_content = client.get("/api/v1/posts", params={"fields": "id,content"}).json()["items"][0]
+
+    assert "content" not in default and "title" in default
+    assert with_content == {"id": default["id"], "content": "Body"}
+
+
+def test_list_posts_rejects_unknown_fields(client):
+    response = client.get("/api/v1/posts", params={"fields": "id,password_hash"})
+
+    assert response.status_code == 400
+    assert "Unknown fields: password_hash" in response.json()["detail"]
@@ -0,0 +1,81 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.core.database import SessionLocal
+from app.core.query_budget import QueryBudgetMiddleware, query_budget
+from app.models import Comment
+from app.models.comment import path_segment
+
+
+def test_post_endpoints_stay_within_their_budgets(client, db, make_posts, max_queries):
+    post = make_posts(3)[0]
+    parent = Comment(post_id=post.id, content="First", path="")
+    db.add(parent)
+    db.flush()
+    parent.path = path_segment(parent.id)
+    reply = Comment(post_id=post.id, content="Reply", parent_id=parent.id, depth=1, path="")
+    db.add(reply)
+    db.flush()
+    reply.path = parent.path + path_segment(reply.id)
+    db.commit()
+    post_id, slug = post.id, post.slug
+
+    with max_queries(5):
+        assert client.get("/api/v1/posts").status_code == 200
+    with max_queries(4):
+        assert client.get(f"/api/v1/posts/slug/{slug}").status_code == 200
+    with max_queries(1):
+        response = client.get(f"/api/v1/comments/post/{post_id}")
+    assert response.status_code == 200
+    assert response.json()[0]["replies"][0]["content"] == "Reply"
+
+
+def test_taxonomy_reads_run_no_queries(client, make_posts, max_queries):
+    make_posts(1)
+    client.get("/api/v1/tags")  # loads the snapshot
+
+    with max_queries(0):
+        assert len(client.get("/api/v1/tags").json()) == 3
+        assert len(client.get("/api/v1/categories").json()) == 2
+
+
+def test_responses_report_their_queries(client, make_posts):
+    make_posts(1)
+
+    response = client.get("/api/v1/posts")
+
+    assert response.headers["server-timing"].startswith("db;dur=")
+
+
+def _budget_app(mode: str) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(QueryBudgetMiddleware, mode=mode)
+
+    @app.get("/two-queries")
+    @query_budget(1)
+    def two_queries():
+        db = SessionLocal()
+        try:
+            db.execute(text("SELECT 1"))
+            db.execute(text("SELECT 2"))
+        finally:
+            db.close()
+        return {"ok": True}
+
+    return app
+
+
+def test_raise_mode_fails_a_route_over_its_budget():
+    response = TestClient(_budget_app("raise")).get("/two-queries")
+
+    assert response.status_code == 500
+    assert response.json()["detail"] == "GET /two-queries ran 2 queries, over its budget of 1"
+
+
+def test_warn_mode_only_logs_an_overrun(caplog):
+    response = TestClient(_budget_app("warn")).get("/two-queries")
+
+    assert response.status_code == 200
+    assert "over its budget of 1" in caplog.text
+    assert 'desc="2 queries' in response.headers["server-timing"]
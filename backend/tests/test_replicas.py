@@ -0,0 +1,67 @@
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+
+from app.core.replicas import STICKY_COOKIE, ReadYourWritesMiddleware, ReplicaRouter, not_a_write
+
+
+def _request(cookie: str = "") -> Request:
+    headers = [(b"cookie", cookie.encode())] if cookie else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def _app(router: ReplicaRouter) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware, router=router)
+
+    @app.post("/posts")
+    def write():
+        return {}
+
+    @app.post("/login")
+    @not_a_write
+    def login():
+        return {}
+
+    return app
+
+
+def test_only_the_writing_client_reads_from_the_primary(tmp_path):
+    router = ReplicaRouter([f"sqlite:///{tmp_path}/replica.db"])
+    writer = TestClient(_app(router))
+
+    response = writer.post("/posts")
+
+    cookie = response.headers["set-cookie"]
+    assert cookie.startswith(f"{STICKY_COOKIE}=")
+    assert router.is_sticky(_request(cookie.split(";")[0]))
+    assert not router.is_sticky(_request())
+
+
+def test_login_does_not_pin_reads_to_the_primary(tmp_path):
+    router = ReplicaRouter([f"sqlite:///{tmp_path}/replica.db"])
+
+    response = TestClient(_app(router)).post("/login")
+
+    assert "set-cookie" not in response.headers
+
+
+def test_request_that_finds_the_replica_down_reads_from_the_primary(tmp_path):
+    router = ReplicaRouter([f"sqlite:///{tmp_path}/missing/replica.db"])
+    app = FastAPI()
+
+    async def get_db(request: Request):
+        async with router.session(request) as db:
+            yield db
+
+    @app.get("/ping")
+    async def ping(db: AsyncSession = Depends(get_db)):
+        return {"value": await db.scalar(text("SELECT 1"))}
+
+    response = TestClient(app).get("/ping")
+
+    assert response.status_code == 200
+    assert response.json() == {"value": 1}
+    assert not router.replicas[0].healthy
@@ -0,0 +1,83 @@
+import pytest
+
+from app.api.v1 import posts as posts_api
+from app.services.search import InMemorySearchIndex, highlight, tokenize
+
+
+@pytest.fixture
+def index(monkeypatch):
+    """A fresh in-memory index, so ids from earlier tests' posts are not ranked."""
+    index = InMemorySearchIndex()
+    monkeypatch.setattr(posts_api, "search_index", index)
+    return index
+
+
+def _publish(client, headers, **posts) -> dict:
+    """Creates published posts through the API, so the index hooks run too."""
+    ids = {}
+    for key, (title, content) in posts.items():
+        response = client.post(
+            "/api/v1/posts", json={"title": title, "content": content, "status": "published"}, headers=headers
+        )
+        assert response.status_code == 201, response.text
+        ids[key] = response.json()["id"]
+    return ids
+
+
+def _search(client, q: str) -> dict:
+    response = client.get("/api/v1/posts/search", params={"q": q})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_tokenize_splits_cjk_runs_into_bigrams():
+    assert tokenize("全文搜索 with BM25") == ["全文", "文搜", "搜索", "with", "bm25"]
+    assert tokenize("搜") == ["搜"]
+
+
+def test_search_ranks_title_matches_and_rare_terms_higher(client, author_headers, index):
+    ids = _publish(
+        client,
+        author_headers,
+        title=("Python tips", "Notes on tooling."),
+        content=("Tooling notes", "Some python in the body."),
+        rare=("Tooling", "Python and asyncio together."),
+        other=("Unrelated", "Nothing to see."),
+    )
+
+    result = _search(client, "python")
+    assert result["total"] == 3
+    assert result["items"][0]["id"] == ids["title"]
+
+    result = _search(client, "python asyncio")
+    assert result["items"][0]["id"] == ids["rare"]
+    assert [item["score"] for item in result["items"]] == sorted(
+        (item["score"] for item in result["items"]), reverse=True
+    )
+
+
+def test_search_matches_cjk_bigrams(client, author_headers, index):
+    ids = _publish(client, author_headers, search=("全文搜索", "倒排索引的实现"), other=("搜集", "别的内容"))
+
+    assert [item["id"] for item in _search(client, "搜索")["items"]] == [ids["search"]]
+    assert [item["id"] for item in _search(client, "索引")["items"]] == [ids["search"]]
+
+
+def test_search_snippet_is_escaped_and_marks_terms(client, author_headers, index):
+    _publish(client, author_headers, xss=("Escaping", '<script>alert("python")</script> & python'))
+
+    snippet = _search(client, "python")["items"][0]["snippet"]
+
+    assert "<script>" not in snippet
+    assert snippet == (
+        "&lt;script&gt;alert(&quot;<mark>python</mark>&quot;)&lt;/script&gt; &amp; <mark>python</mark>"
+    )
+
+
+def test_highlight_windows_long_text_around_the_first_match():
+    value = "x" * 200 + " needle " + "y" * 200
+
+    snippet = highlight(value, "needle", length=40)
+
+    assert snippet.startswith("…") and snippet.endswith("…")
+    assert "<mark>needle</mark>" in snippet
@@ -0,0 +1,21 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.core.sql_metrics import SQLMetrics
+
+
+def test_failed_statements_leave_no_timing_state_on_the_connection():
+    engine = create_engine("sqlite://")
+    metrics = SQLMetrics(slow_threshold_ms=10_000, max_statements=10, slow_log_size=10)
+    metrics.instrument(engine, "test")
+
+    with engine.connect() as conn:
+        info = dict(conn.info)
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing"))
+        conn.execute(text("SELECT 1"))
+
+        assert conn.info == info
+    assert metrics.totals()[0] == 1
@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from app.services.search import tokenize
+from app.services.suggest import MAX_SUGGESTIONS, PrefixIndex
+
+VOCABULARY = ["python", "pytest", "pydantic", "rust", "ruby", "web", "website", "async", "api", "go"]
+
+
+def _index(entries: dict) -> PrefixIndex:
+    index = PrefixIndex()
+    index.load((entry_id, text, f"slug-{entry_id}", popularity) for entry_id, (text, popularity) in entries.items())
+    return index
+
+
+def _ids(index: PrefixIndex, query: str, limit: int = MAX_SUGGESTIONS) -> list:
+    return [suggestion.id for suggestion in index.suggest(query, limit)]
+
+
+def _expected(entries: dict, query: str, limit: int) -> list:
+    tokens = tokenize(query)
+    complete, prefix = (tokens, None) if query[-1].isspace() else (tokens[:-1], tokens[-1])
+    matches = [
+        (-popularity, entry_id)
+        for entry_id, (text, popularity) in entries.items()
+        if set(complete) <= set(tokenize(text))
+        and (prefix is None or any(word.startswith(prefix) for word in tokenize(text)))
+    ]
+    return [entry_id for _, entry_id in sorted(matches)[:limit]]
+
+
+def test_prefixes_rank_by_popularity():
+    index = _index({
+        1: ("Python tips", 5),
+        2: ("Pytest fixtures", 50),
+        3: ("Pydantic models", 20),
+        4: ("Rust", 100),
+    })
+
+    assert _ids(index, "p") == [2, 3, 1]
+    assert _ids(index, "py", limit=2) == [2, 3]
+    assert _ids(index, "pyth") == [1]  # longer than the precomputed prefixes
+
+    index.set_popularity(1, 80)
+    assert _ids(index, "py") == [1, 2, 3]
+
+    index.remove(2)
+    index.upsert(5, "Pytest plugins", "pytest-plugins", 30)
+    assert _ids(index, "py") == [1, 5, 3]
+    assert _ids(index, "p", limit=1) == [1]
+
+
+def test_multi_word_queries_need_every_complete_word_and_the_prefix():
+    index = _index({
+        1: ("Python web apps", 10),
+        2: ("Python async", 30),
+        3: ("Web scraping in Python", 20),
+        4: ("Async web", 40),
+    })
+
+    assert _ids(index, "python we") == [3, 1]
+    assert _ids(index, "python web ") == [3, 1]
+    assert _ids(index, "web as") == [4]
+    assert _ids(index, "python go") == []
+    assert _ids(index, "kotlin we") == []
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_suggestions_match_a_brute_force_scan(seed):
+    rng = random.Random(seed)
+    # Popular and rare words, so both the narrow-prefix and scan paths run
+    entries = {
+        entry_id: (" ".join(rng.choices(VOCABULARY, weights=range(10, 0, -1), k=rng.randint(1, 4))), rng.randrange(1000))
+        for entry_id in range(1, 300)
+    }
+    index = _index(entries)
+
+    for _ in range(30):
+        words = rng.sample(VOCABULARY, rng.randint(1, 3))
+        query = " ".join(words)
+        query = query[:rng.randint(len(query) - len(words[-1]) + 1, len(query))] + rng.choice(["", " "])
+        limit = rng.randint(1, MAX_SUGGESTIONS)
+        assert _ids(index, query, limit) == _expected(entries, query, limit), query
@@ -0,0 +1,47 @@
+from app.core.cache import LocalSharedClient
+from app.core.query_budget import capture_queries
+from app.models import Tag
+from app.schemas.tag import TagResponse
+from app.services.taxonomy import TaxonomyCache, VersionSignal, tag_cache
+
+
+def test_tag_write_bumps_the_snapshot_version_and_reloads_it(client, author_headers):
+    tag_cache.get()  # a loaded snapshot, so reads below cost nothing
+    with capture_queries() as queries:
+        before = client.get("/api/v1/tags").json()
+    version = tag_cache.get().version
+    assert queries.count == 0
+    assert before == []
+
+    created = client.post("/api/v1/tags", json={"name": "Python"}, headers=author_headers).json()
+
+    assert tag_cache.get().version == version + 1
+    with capture_queries() as queries:
+        listed = client.get("/api/v1/tags").json()
+        single = client.get(f"/api/v1/tags/{created['id']}").json()
+    assert queries.count == 0
+    assert [tag["name"] for tag in listed] == ["Python"]
+    assert single["slug"] == created["slug"]
+
+    client.put(f"/api/v1/tags/{created['id']}", json={"name": "Rust"}, headers=author_headers)
+
+    assert tag_cache.get().version == version + 2
+    assert [tag["name"] for tag in client.get("/api/v1/tags").json()] == ["Rust"]
+
+
+def test_other_workers_reload_when_the_signal_moves(db):
+    client = LocalSharedClient()
+    writer, reader = (
+        TaxonomyCache(Tag, TagResponse, signal=VersionSignal(client, "tags"), check_interval=0)
+        for _ in range(2)
+    )
+    assert reader.get().items == ()
+
+    db.add(Tag(name="Go", slug="go"))
+    db.commit()
+    writer.invalidate()
+
+    snapshot = reader.get()
+    assert snapshot.version == writer.get().version == 1
+    assert [tag["slug"] for tag in snapshot.items] == ["go"]
+    assert reader.get() is snapshot  # unchanged version, no reload
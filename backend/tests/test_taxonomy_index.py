@@ -0,0 +1,112 @@
+import asyncio
+import random
+
+import pytest
+
+from app.core.database import SessionLocal
+from app.models import Tag
+from app.services.taxonomy_index import ARRAY_MAX, IdBitmap, taxonomy_index
+
+
+def _random_ids(rng: random.Random) -> set:
+    # Sparse sets over a wide range, and dense ones that fill whole chunks
+    if rng.random() < 0.5:
+        return set(rng.sample(range(3_000_000), rng.randint(0, 50)))
+    return set(rng.sample(range(200_000), rng.randint(0, 30_000)))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_bitmap_matches_set_semantics(seed):
+    rng = random.Random(seed)
+    a_ids, b_ids = _random_ids(rng), _random_ids(rng)
+    a, b = IdBitmap.from_ids(a_ids), IdBitmap.from_ids(b_ids)
+
+    for bitmap, expected in ((a & b, a_ids & b_ids), (a | b, a_ids | b_ids)):
+        assert len(bitmap) == len(expected)
+        newest_first = sorted(expected, reverse=True)
+        for _ in range(10):
+            below = rng.choice([None, rng.randrange(3_000_000)])
+            skip, limit = rng.randrange(len(expected) + 2), rng.randint(1, 30)
+            wanted = [i for i in newest_first if below is None or i < below][skip:skip + limit]
+            assert bitmap.top(limit, below=below, skip=skip) == wanted
+
+
+def test_add_and_discard_switch_chunk_representation():
+    bitmap = IdBitmap.from_ids([5_000_000])
+    for i in range(ARRAY_MAX + 10):
+        bitmap.add(i)
+    assert isinstance(bitmap.chunks[0], int)
+
+    for i in range(100):
+        bitmap.discard(i)
+    assert not isinstance(bitmap.chunks[0], int)
+    assert len(bitmap) == ARRAY_MAX - 90 + 1
+    assert 100 in bitmap and 99 not in bitmap and 5_000_000 in bitmap
+    assert bitmap.top(2) == [5_000_000, ARRAY_MAX + 9]
+
+
+def test_filtered_listing_pages_through_bitmap(client, make_posts):
+    make_posts(25)
+
+    first = client.get("/api/v1/posts", params={"tag": ["tag-0", "tag-2"], "size": 10}).json()
+    second = client.get("/api/v1/posts", params={"tag": "tag-1", "size": 10, "after": first["next_cursor"]}).json()
+
+    assert first["total"] == 25
+    assert [item["id"] for item in first["items"]] == list(range(25, 15, -1))
+    assert [item["id"] for item in second["items"]] == list(range(15, 5, -1))
+
+
+def test_filtered_listing_loads_the_index_off_the_event_loop(client, make_posts, monkeypatch):
+    make_posts(3)
+    loops = []
+
+    def session_factory():
+        try:
+            loops.append(asyncio.get_running_loop())
+        except RuntimeError:
+            loops.append(None)
+        return SessionLocal()
+
+    monkeypatch.setattr(taxonomy_index, "session_factory", session_factory)
+    monkeypatch.setattr(taxonomy_index, "_loaded", False)
+
+    assert client.get("/api/v1/posts", params={"tag": "tag-0"}).json()["total"] == 3
+    assert loops == [None]
+
+
+def test_selections_do_not_share_containers_with_the_live_index(db, make_posts, monkeypatch):
+    posts = make_posts(3)
+    monkeypatch.setattr(taxonomy_index, "_loaded", False)
+    tag_ids = [tag.id for tag in posts[0].tags]
+
+    single = taxonomy_index.select([], tag_ids[:1], match_all=False)
+    union = taxonomy_index.select([], tag_ids, match_all=False)
+    both = taxonomy_index.select([], tag_ids, match_all=True)
+    for post in posts:
+        taxonomy_index.remove_post(post.id)
+
+    ids = sorted(post.id for post in posts)
+    assert sorted(single.top(10)) == sorted(union.top(10)) == sorted(both.top(10)) == ids
+    assert len(taxonomy_index.select([], tag_ids, match_all=False)) == 0
+
+
+def test_filters_follow_post_writes_and_match_modes(client, db, make_posts, author_headers, monkeypatch):
+    first, second, third, fourth = (post.id for post in make_posts(4))
+    tag_0 = db.query(Tag).filter(Tag.slug == "tag-0").one().id
+    monkeypatch.setattr(taxonomy_index, "_loaded", False)
+
+    def ids(**params) -> list:
+        return [item["id"] for item in client.get("/api/v1/posts", params=params).json()["items"]]
+
+    assert ids(tag="tag-1") == [fourth, third, second, first]
+
+    client.put(f"/api/v1/posts/{first}", json={"tag_ids": [tag_0]}, headers=author_headers)
+    client.put(f"/api/v1/posts/{second}", json={"status": "draft"}, headers=author_headers)
+    client.delete(f"/api/v1/posts/{third}", headers=author_headers)
+
+    assert ids(tag="tag-1") == [fourth]
+    assert ids(tag=["tag-0", "tag-1"], mode="any") == [fourth, first]
+    assert ids(tag="tag-0", category="category-0") == [fourth, first]
+    assert ids(tag=["tag-0", "missing"]) == []
+    assert ids(tag=["tag-0", "missing"], mode="any") == [fourth, first]
+    assert ids(tag="tag-0", size=1, page=2) == [first]
@@ -0,0 +1,74 @@
+import time
+from datetime import datetime
+
+from sqlalchemy import update
+
+from app.core.database import SessionLocal
+from app.core.query_budget import capture_queries
+from app.models import Post
+from app.services.view_counter import ViewCounter
+
+EDITED_AT = datetime(2020, 1, 1)
+
+
+def _view_counts(db, post_ids) -> list:
+    db.expire_all()
+    return [db.get(Post, post_id).view_count for post_id in post_ids]
+
+
+def test_flush_writes_aggregated_deltas_in_one_statement(db, make_posts):
+    post_ids = [post.id for post in make_posts(3)]
+    db.execute(update(Post).values(updated_at=EDITED_AT))
+    db.commit()
+    counter = ViewCounter(interval=3600, threshold=1000)
+    flushed_ids = []
+    counter.add_flush_listener(flushed_ids.extend)
+    for _ in range(3):
+        counter.increment(post_ids[0])
+    counter.increment(post_ids[1], amount=2)
+
+    with capture_queries() as queries:
+        assert counter.flush() == 5
+
+    assert sum(shape.startswith("UPDATE posts") for shape in queries.shapes) == 1
+    assert _view_counts(db, post_ids) == [3, 2, 0]
+    assert sorted(flushed_ids) == sorted(post_ids[:2])
+    assert counter.pending == 0
+    assert db.get(Post, post_ids[0]).updated_at.replace(tzinfo=None) == EDITED_AT
+
+
+def test_failed_flush_keeps_deltas_for_the_next_one(db, make_posts):
+    post_id = make_posts(1)[0].id
+    attempts = []
+
+    def session_factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("database unavailable")
+        return SessionLocal()
+
+    counter = ViewCounter(interval=3600, threshold=1000, session_factory=session_factory)
+    counter.increment(post_id, amount=4)
+
+    assert counter.flush() == 0
+    assert counter.pending_for(post_id) == 4
+    counter.increment(post_id)
+
+    assert counter.flush() == 5
+    assert _view_counts(db, [post_id]) == [5]
+
+
+def test_reaching_the_threshold_wakes_the_flush_thread(db, make_posts):
+    post_id = make_posts(1)[0].id
+    counter = ViewCounter(interval=3600, threshold=3)
+    counter.start()
+    try:
+        for _ in range(3):
+            counter.increment(post_id)
+        deadline = time.monotonic() + 5
+        while counter.pending and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        counter.stop()
+
+    assert _view_counts(db, [post_id]) == [3]